@@ -1,7 +1,10 @@
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, ttk, simpledialog, filedialog
-from gpt4all import GPT4All
-import pyttsx3
+from orbit_ai import ModelLoader, STATE_DISPLAY
+from orbit_asr import DEFAULT_VOSK_MODEL, NotUnderstood, ServiceUnavailable, make_recognizer
+from orbit_audio import AudioCache
+from orbit_listen import Listener, MicrophoneSource
+from orbit_speech import SpeechWorker
 import datetime
 import math
 import threading
@@ -41,25 +44,45 @@ class ORBITAssistant:
         self.start_background_tasks()
     
     def setup_ai(self):
-        """Initialize the AI model with error handling"""
-        try:
-            # Using a larger model - adjust based on your system capabilities
-            self.ai_model = GPT4All("llama-2-7b-gguf-q4_0.gguf", device="cpu")
-            self.ai_ready = True
-        except Exception as e:
-            messagebox.showerror("AI Error", f"Failed to load AI model: {str(e)}")
-            self.ai_ready = False
+        """Start loading the AI model in the background once the window is showing"""
+        # Using a larger model - adjust based on your system capabilities
+        self.ai = ModelLoader(
+            "llama-2-7b-gguf-q4_0.gguf", device="cpu",
+            on_state=lambda state: self.root.after(0, self.show_ai_state, state)
+        )
+        self.root.after(100, self.ai.start)
+    
+    @property
+    def ai_state(self):
+        """'loading', 'ready' or 'failed'"""
+        return self.ai.state
+    
+    @property
+    def ai_ready(self):
+        """Whether AI queries are accepted; while the model loads they are queued"""
+        return self.ai.state != 'failed'
+    
+    def show_ai_state(self, state):
+        """Reflect the model loader's state in the status bar"""
+        text, color = STATE_DISPLAY[state]
+        self.ai_status.config(text=text, fg=color)
+        if state == 'loading':
+            self.status_label.config(text="Loading AI model...", fg='#f39c12')
+        elif self.status_label.cget('text') == "Loading AI model...":
+            self.status_label.config(text="✓ Ready", fg='#2ecc71')
+        if state == 'failed':
+            messagebox.showerror("AI Error", f"Failed to load AI model: {str(self.ai.error)}")
     
     def setup_voice(self):
-        """Initialize text-to-speech engine"""
-        try:
-            self.engine = pyttsx3.init()
-            voices = self.engine.getProperty('voices')
-            self.engine.setProperty('voice', voices[0].id)
-            self.engine.setProperty('rate', 180)
-            self.voice_enabled = True
-        except:
-            self.voice_enabled = False
+        """Start the speech worker, the one thread that owns the text-to-speech engine"""
+        self.speech = SpeechWorker(voice=0, rate=180, audio_cache=AudioCache().load()).start()
+        # The engine is created on the worker thread; wait for it so voice_enabled is accurate
+        self.voice_enabled = self.speech.ready.wait(5) and self.speech.error is None
+        # Clips of the phrases ORBIT says most are rendered whenever it has nothing to say
+        self.speech.prerender()
+        # The microphone is opened the first time voice input is used
+        self.listener = None
+        self.recognizer = None
     
     def load_settings(self):
         """Load user settings from file"""
@@ -72,6 +95,8 @@ class ORBITAssistant:
             'documents_path': os.path.expanduser('~/Documents'),
             'downloads_path': os.path.expanduser('~/Downloads'),
             'voice_rate': 180,
+            'speech_engine': 'google',
+            'vosk_model': DEFAULT_VOSK_MODEL,
             'startup_greeting': True
         }
         
@@ -186,8 +211,8 @@ class ORBITAssistant:
         
         self.ai_status = tk.Label(
             self.status_frame, 
-            text="AI: Online" if self.ai_ready else "AI: Offline", 
-            fg='#2ecc71' if self.ai_ready else '#e74c3c', 
+            text=STATE_DISPLAY[self.ai_state][0], 
+            fg=STATE_DISPLAY[self.ai_state][1], 
             bg=self.bg_color
         )
         self.ai_status.pack(side=tk.LEFT, padx=5)
@@ -227,6 +252,7 @@ class ORBITAssistant:
         )
         self.user_input.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         self.user_input.bind('<Return>', self.process_input)
+        self.user_input.bind('<Key>', self.interrupt_speech, add='+')
         self.user_input.focus_set()
         
         # Voice button
@@ -298,36 +324,66 @@ class ORBITAssistant:
             self.speak(text.replace("ORBIT: ", ""))
     
     def speak(self, text):
-        """Speak text using TTS"""
-        def _speak():
-            self.engine.say(text)
-            self.engine.runAndWait()
-        
-        threading.Thread(target=_speak, daemon=True).start()
+        """Queue text for the speech worker a sentence at a time; overlapping messages are spoken in turn"""
+        return self.speech.say_sentences(text)
+    
+    def interrupt_speech(self, event=None):
+        """Stop talking as soon as the user starts typing or speaking"""
+        if self.voice_enabled:
+            self.speech.interrupt()
     
     def start_voice_input(self):
         """Start voice input in a separate thread"""
+        self.interrupt_speech()
         threading.Thread(target=self.take_voice_command, daemon=True).start()
     
+    def get_listener(self):
+        """The always-on microphone listener, opened once on first use and kept running"""
+        # A listener whose device failed is replaced, so unplugging a headset isn't permanent
+        if self.listener is None or self.listener.finished.is_set():
+            if self.recognizer is None:
+                # An offline model is loaded once and stays resident for every later command
+                engine = self.settings.get('speech_engine', 'google')
+                options = {'model_path': self.settings.get('vosk_model', DEFAULT_VOSK_MODEL)} if engine == 'vosk' else {}
+                self.recognizer = make_recognizer(engine, **options).load()
+            # ORBIT's own voice is not a command
+            self.listener = Listener(MicrophoneSource(), gate=lambda: not self.speech.busy,
+                                     recognizer=self.recognizer, on_partial=self.show_partial_speech).start()
+        return self.listener
+    
+    def show_partial_speech(self, text):
+        """Show the words recognized so far while the user is still speaking"""
+        def show():
+            self.user_input.delete(0, tk.END)
+            self.user_input.insert(0, text)
+            self.status_label.config(text="🎤 Hearing...", fg='#f39c12')
+        
+        self.root.after(0, show)
+    
     def take_voice_command(self):
         """Capture voice command using microphone"""
         self.status_label.config(text="🎤 Listening...", fg='#f39c12')
         self.voice_btn.config(state=tk.DISABLED)
         
+        transcript = None
         try:
-            import speech_recognition as sr
-            r = sr.Recognizer()
-            with sr.Microphone() as source:
-                audio = r.listen(source, timeout=5)
+            listener = self.get_listener()
+            # Speech from before the press was not meant for ORBIT; speech under way still counts
+            listener.flush()
+            segment = listener.listen(timeout=5)
             
             try:
-                query = r.recognize_google(audio)
+                if segment is None:
+                    # Nobody spoke within the timeout
+                    raise NotUnderstood()
+                transcript = self.recognizer.recognize(segment)
                 self.user_input.delete(0, tk.END)
-                self.user_input.insert(0, query)
+                self.user_input.insert(0, transcript.text)
                 self.process_input()
-            except sr.UnknownValueError:
+            except NotUnderstood:
+                self.user_input.delete(0, tk.END)
                 self.add_message("ORBIT: Sorry, I didn't catch that", 'orbit')
-            except sr.RequestError:
+            except ServiceUnavailable:
                 self.add_message("ORBIT: Speech service unavailable", 'orbit')
         
         except ImportError:
@@ -335,7 +391,11 @@ class ORBITAssistant:
         except Exception as e:
             self.add_message(f"ORBIT: Voice error: {str(e)}", 'orbit')
         
-        self.status_label.config(text="✓ Ready", fg='#2ecc71')
+        if transcript is not None:
+            self.status_label.config(text=f"✓ Ready (speech recognized in {transcript.latency:.2f} s, {transcript.engine})",
+                                     fg='#2ecc71')
+        else:
+            self.status_label.config(text="✓ Ready", fg='#2ecc71')
         self.voice_btn.config(state=tk.NORMAL)
     
     def process_input(self, event=None):
@@ -400,23 +460,30 @@ class ORBITAssistant:
             self.add_message(f"ORBIT: Calculation error: {str(e)}", 'orbit')
     
     def generate_ai_response(self, prompt):
-        """Generate response from AI model"""
+        """Generate response from AI model, queued while the model is still loading"""
         if not self.ai_ready:
             self.add_message("ORBIT: AI is currently unavailable", 'orbit')
             return
         
-        def generate_response():
+        def generate_response(model):
             self.status_label.config(text="AI: Thinking...", fg='#f39c12')
             try:
-                with self.ai_model.chat_session():
-                    response = self.ai_model.generate(prompt, max_tokens=400, temp=0.7)
+                with model.chat_session():
+                    response = model.generate(prompt, max_tokens=400, temp=0.7)
                     self.add_message(f"ORBIT: {response}", 'orbit')
             except Exception as e:
                 self.add_message(f"ORBIT: AI error: {str(e)}", 'orbit')
             finally:
                 self.status_label.config(text="✓ Ready", fg='#2ecc71')
         
-        threading.Thread(target=generate_response, daemon=True).start()
+        def start_response(model):
+            if model is None:
+                self.add_message("ORBIT: AI is currently unavailable", 'orbit')
+                return
+            threading.Thread(target=generate_response, args=(model,), daemon=True).start()
+        
+        if self.ai.submit(start_response) == 'loading':
+            self.add_message("ORBIT: The AI model is still loading, I'll answer as soon as it's ready", 'orbit')
     
     def show_calculator(self):
         """Show advanced calculator window"""
@@ -783,7 +850,7 @@ class ORBITAssistant:
         
         # Update voice rate if changed
         if self.voice_enabled:
-            self.engine.setProperty('rate', self.settings['voice_rate'])
+            self.speech.set_property('rate', self.settings['voice_rate'])
         
         # Update theme if changed
         if new_settings['theme'] != self.settings['theme']:
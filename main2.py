@@ -1,5 +1,3 @@
-import pyttsx3
-import speech_recognition as sr
 import datetime
 import wikipedia
 import webbrowser
@@ -13,14 +11,40 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, PhotoImage
 from PIL import Image, ImageTk
 import threading
+import time
 import json
 import requests
-from gpt4all import GPT4All
+from orbit_intents import IntentMatcher
+from orbit_ai import ContextBuilder, ModelLoader, ResponseStream, STATE_DISPLAY, ThroughputEstimator, reply_options
+from orbit_cache import ResponseCache, strip_fresh
+from orbit_model_server import remote_factory
+from orbit_asr import DEFAULT_VOSK_MODEL, NotUnderstood, ServiceUnavailable, make_recognizer
+from orbit_audio import AudioCache
+from orbit_listen import Listener, MicrophoneSource
+from orbit_speech import SpeechWorker
 
 os.environ["GPT4ALL_NO_CUDA"] = "1"
 
-# Initialize GPT4All model
-gpt4all_model = GPT4All("orca-mini-3b-gguf2-q4_0.gguf")  # Newer Orca model
+# Command phrases in precedence order, compiled into one automaton
+COMMANDS = IntentMatcher([
+    ('search_web', ['search in browser']),
+    ('search_youtube', ['search in youtube']),
+    ('search_wikipedia', ['search in wikipedia']),
+    ('open_youtube', ['open youtube']),
+    ('play_youtube', ['play in youtube']),
+    ('open_google', ['open google']),
+    ('open_stackoverflow', ['open stackoverflow']),
+    ('open_vierp', ['open vierp']),
+    ('play_music', ['play music']),
+    ('get_time', ['what is the time']),
+    ('open_vs_code', ['open vs code']),
+    ('open_whatsapp', ['open whatsapp']),
+    ('send_email', ['email to']),
+    ('set_reminder', ['set reminder', 'set a reminder']),
+    ('introduce', ['introduce yourself']),
+    ('new_conversation', ['new conversation']),
+    ('ask_ai', ['ask ai'])
+])
 
 class ORBITAssistant:
     def __init__(self, root):
@@ -30,11 +54,18 @@ class ORBITAssistant:
         self.root.resizable(True, True)
         self.root.configure(bg='#1e1e2e')
         
-        # Initialize speech engine
-        self.engine = pyttsx3.init('sapi5')
-        self.voices = self.engine.getProperty('voices')
-        self.engine.setProperty('voice', self.voices[0].id)
-        self.engine.setProperty('rate', 180)
+        # The speech worker owns the engine, so talking never blocks the window
+        self.speech = SpeechWorker(driver='sapi5', voice=0, rate=180, audio_cache=AudioCache().load()).start()
+        self.speech.prerender()
+        
+        # One recognizer, and a microphone kept open while voice input is on.
+        # Each listening loop has its own stop event, so a quick off and on stops only the old loop.
+        self.recognizer = None
+        self.listen_stop = None
+        
+        # A question ORBIT asked and the function taking its answer, from voice or the text box
+        self.pending_reply = None
+        self.reply_lock = threading.Lock()
         
         # State variables
         self.task_mode = False
@@ -44,15 +75,40 @@ class ORBITAssistant:
             'word_of_day': True,
             'voice_enabled': True,
             'email': '',
-            'password': ''
+            'password': '',
+            # 'vosk' recognizes offline with the model in vosk_model
+            'speech_engine': 'google',
+            'vosk_model': DEFAULT_VOSK_MODEL,
+            # Seconds an AI answer may take (0 for no limit); replies are sized to this machine's speed
+            'ai_max_tokens': 200,
+            'ai_latency_budget': 0
         }
         
         # Load settings if available
         self.load_settings()
+        # Starts from the speed measured in earlier runs, then follows warm-up and every reply
+        self.ai_throughput = ThroughputEstimator(
+            self.settings.get('ai_tokens_per_second'),
+            self.settings.get('ai_first_token_seconds')
+        )
+        
+        # Answers to earlier AI questions, reused for repeats and near-duplicates
+        self.response_cache = ResponseCache('ai_cache.json')
+        self.response_cache.load()
+        # Recent AI turns verbatim plus a summary of older ones, so follow-ups make sense
+        self.ai_context = ContextBuilder(keep_turns=4, summary_tokens=256, max_prompt_tokens=1024)
         
         # Setup GUI
         self.setup_gui()
         
+        # Use the shared model server, starting it in the background if no window has yet
+        self.ai = ModelLoader(
+            "orca-mini-3b-gguf2-q4_0.gguf", device=None,  # Newer Orca model
+            on_state=lambda state: self.root.after(0, self.show_ai_state, state),
+            factory=remote_factory(), warmup_tokens=0
+        )
+        self.root.after(100, self.ai.start)
+        
         # Initial operations
         self.wish_me(True)
         if self.settings['word_of_day']:
@@ -110,6 +166,15 @@ class ORBITAssistant:
         )
         self.task_mode_status.pack(side=tk.LEFT, padx=5)
         
+        self.ai_status = tk.Label(
+            self.status_frame, 
+            text=STATE_DISPLAY['loading'][0], 
+            font=('Helvetica', 10), 
+            fg=STATE_DISPLAY['loading'][1], 
+            bg='#1e1e2e'
+        )
+        self.ai_status.pack(side=tk.LEFT, padx=5)
+        
         # Content area
         self.conversation_text = scrolledtext.ScrolledText(
             self.content_frame,
@@ -137,6 +202,7 @@ class ORBITAssistant:
         )
         self.input_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         self.input_entry.bind('<Return>', self.process_text_input)
+        self.input_entry.bind('<Key>', self.interrupt_speech, add='+')
         
         self.voice_button = tk.Button(
             self.input_frame,
@@ -196,8 +262,11 @@ class ORBITAssistant:
             self.speak(text)
     
     def speak(self, audio):
-        self.engine.say(audio)
-        self.engine.runAndWait()
+        # Sentence by sentence, so a long message like the introduction starts playing at once
+        return self.speech.say_sentences(audio)
+    
+    def interrupt_speech(self, event=None):
+        self.speech.interrupt()
     
     def wish_me(self, start):
         hour = datetime.datetime.now().hour
@@ -218,37 +287,109 @@ class ORBITAssistant:
                 self.add_to_conversation("Have a good night!")
     
     def start_voice_input(self):
-        threading.Thread(target=self.take_command, daemon=True).start()
-    
-    def take_command(self):
+        # Pressing the mic button talks over ORBIT, so it stops speaking
+        self.interrupt_speech()
+        if self.listen_stop is not None and not self.listen_stop.is_set():
+            # A second press turns the microphone off again
+            self.listen_stop.set()
+            return
+        self.listen_stop = threading.Event()
+        threading.Thread(target=self.listen_loop, args=(self.listen_stop,), daemon=True).start()
+    
+    def listen_loop(self, stop):
+        # Keeps listening after each command, so task mode needs no click per command.
+        # ORBIT's own voice is gated out rather than waited for.
+        try:
+            if self.recognizer is None:
+                engine = self.settings['speech_engine']
+                options = {'model_path': self.settings['vosk_model']} if engine == 'vosk' else {}
+                if engine == 'google':
+                    options['language'] = 'en-IN'
+                self.recognizer = make_recognizer(engine, **options).load()
+            listener = Listener(MicrophoneSource(), gate=lambda: not self.speech.busy, recognizer=self.recognizer,
+                                on_partial=self.show_partial_speech).start()
+        except Exception as e:
+            stop.set()
+            self.add_to_conversation(f"Could not start voice input: {e}")
+            return
         self.mic_status.config(text="🎤 Listening...", fg='#f9e2af')
-        self.root.update()
-        
-        r = sr.Recognizer()
-        with sr.Microphone() as source:
-            r.pause_threshold = 1
-            audio = r.listen(source)
-        
         try:
-            self.mic_status.config(text="🎤 Recognizing...", fg='#f9e2af')
-            self.root.update()
-            
-            query = r.recognize_google(audio, language='en-in')
-            self.add_to_conversation(query, "user")
-            
-            if 'hey orbit' in query.lower() and not self.task_mode:
-                self.enter_task_mode()
-            elif 'thank you orbit' in query.lower() and self.task_mode:
-                self.exit_task_mode()
-            elif 'goodbye orbit' in query.lower():
-                self.close_assistant()
-            elif self.task_mode:
-                self.process_query(query.lower())
-            
+            while not stop.is_set():
+                query = self.take_command(listener, timeout=1)
+                if query is None:
+                    continue
+                if self.answer_pending(query):
+                    if query:
+                        self.add_to_conversation(query, "user")
+                    continue
+                if not query:
+                    if self.task_mode:
+                        self.add_to_conversation("Could not understand audio. Please try again.")
+                    continue
+                
+                lowered = query.lower()
+                if 'hey orbit' in lowered and not self.task_mode:
+                    self.add_to_conversation(query, "user")
+                    self.enter_task_mode()
+                elif 'thank you orbit' in lowered and self.task_mode:
+                    self.add_to_conversation(query, "user")
+                    self.exit_task_mode()
+                elif 'goodbye orbit' in lowered:
+                    self.add_to_conversation(query, "user")
+                    self.close_assistant()
+                elif self.task_mode:
+                    # Outside task mode, talk in the room is not for ORBIT and isn't shown
+                    self.add_to_conversation(query, "user")
+                    self.process_query(lowered)
         except Exception as e:
-            self.add_to_conversation("Could not understand audio. Please try again.")
+            self.add_to_conversation(f"Voice input stopped: {e}")
         finally:
-            self.mic_status.config(text="🎤 Ready", fg='#a6e3a1')
+            stop.set()
+            listener.stop()
+            # A newer loop may already own the microphone and its status
+            if self.listen_stop is stop:
+                self.mic_status.config(text="🎤 Ready", fg='#a6e3a1')
+    
+    def take_command(self, listener, timeout=1):
+        """The next thing said: its text, '' if it couldn't be understood, or None if nothing was said
+
+        Only the listening loop calls this, so the window never waits on the microphone.
+        """
+        segment = listener.listen(timeout=timeout)
+        if segment is None:
+            return None
+        self.mic_status.config(text="🎤 Recognizing...", fg='#f9e2af')
+        status = "🎤 Listening..."
+        try:
+            transcript = self.recognizer.recognize(segment)
+            status = f"🎤 Listening... (last heard in {transcript.latency:.2f} s)"
+            return transcript.text
+        except NotUnderstood:
+            return ''
+        except ServiceUnavailable:
+            self.add_to_conversation("Speech service unavailable")
+            return ''
+        finally:
+            self.mic_status.config(text=status, fg='#f9e2af')
+    
+    def ask(self, question, on_reply, timeout=30):
+        """Ask a follow-up question; on_reply gets the next thing said or typed, '' if not understood"""
+        with self.reply_lock:
+            self.pending_reply = (on_reply, time.time() + timeout)
+        self.add_to_conversation(question)
+    
+    def answer_pending(self, reply):
+        """Hand reply to the question being waited on; False if there is none, or it expired"""
+        with self.reply_lock:
+            pending, self.pending_reply = self.pending_reply, None
+        if pending is None or time.time() > pending[1]:
+            return False
+        pending[0](reply)
+        return True
+    
+    def show_partial_speech(self, text):
+        # Words so far, while the speaker is still talking
+        self.root.after(0, lambda: self.mic_status.config(text=f"🎤 {text}...", fg='#f9e2af'))
     
     def process_text_input(self, event=None):
         query = self.input_entry.get()
@@ -256,6 +397,8 @@ class ORBITAssistant:
             self.add_to_conversation(query, "user")
             self.input_entry.delete(0, tk.END)
             
+            if self.answer_pending(query):
+                return
             if 'hey orbit' in query.lower() and not self.task_mode:
                 self.enter_task_mode()
             elif 'thank you orbit' in query.lower() and self.task_mode:
@@ -276,38 +419,44 @@ class ORBITAssistant:
         self.add_to_conversation("You're welcome! Let me know if you need anything else.")
     
     def process_query(self, query):
-        # Process all commands
-        if 'search in browser' in query:
+        # Process all commands; every phrase is found in a single pass, table order breaks ties
+        matches = COMMANDS.match(query)
+        command = matches[0].intent if matches else None
+        
+        if command == 'search_web':
             self.search_web(query.replace('search in browser', '').strip())
-        elif 'search in youtube' in query:
+        elif command == 'search_youtube':
             self.search_youtube(query.replace('search in youtube', '').strip())
-        elif 'search in wikipedia' in query:
+        elif command == 'search_wikipedia':
             self.search_wikipedia(query.replace('search in wikipedia', '').strip())
-        elif 'open youtube' in query:
+        elif command == 'open_youtube':
             self.open_website("youtube.com")
-        elif 'play in youtube' in query:
+        elif command == 'play_youtube':
             self.play_youtube(query.replace('play in youtube', '').strip())
-        elif 'open google' in query:
+        elif command == 'open_google':
             self.open_website("google.com")
-        elif 'open stackoverflow' in query:
+        elif command == 'open_stackoverflow':
             self.open_website("stackoverflow.com")
-        elif 'open vierp' in query:
+        elif command == 'open_vierp':
             self.open_website("learner.vierp.in/home")
-        elif 'play music' in query:
+        elif command == 'play_music':
             self.play_music()
-        elif 'what is the time' in query:
+        elif command == 'get_time':
             self.get_time()
-        elif 'open vs code' in query:
+        elif command == 'open_vs_code':
             self.open_app("C:\\Users\\omkar\\AppData\\Local\\Programs\\Microsoft VS Code\\Code.exe")
-        elif 'open whatsapp' in query:
+        elif command == 'open_whatsapp':
             self.open_app("C:\\Users\\omkar\\AppData\\Local\\WhatsApp\\WhatsApp.exe")
-        elif 'email to' in query:
+        elif command == 'send_email':
             self.send_email(query.replace('email to', '').strip())
-        elif 'set reminder' in query or 'set a reminder' in query:
+        elif command == 'set_reminder':
             self.set_reminder()
-        elif 'introduce yourself' in query:
+        elif command == 'introduce':
             self.introduce()
-        elif 'ask ai' in query:
+        elif command == 'new_conversation':
+            self.ai_context.clear()
+            self.add_to_conversation("Okay, let's start a new conversation.")
+        elif command == 'ask_ai':
             self.ask_ai(query.replace('ask ai', '').strip())
         else:
             self.add_to_conversation("I'm not sure how to help with that. Try being more specific.")
@@ -375,13 +524,16 @@ class ORBITAssistant:
             self.add_to_conversation("Could not open the application. Please check the path.")
     
     def send_email(self, recipient):
-        try:    
-            if not self.settings['email'] or not self.settings['password']:
-                self.add_to_conversation("Email credentials not set. Please configure in settings.")
+        if not self.settings['email'] or not self.settings['password']:
+            self.add_to_conversation("Email credentials not set. Please configure in settings.")
+            return
+        self.ask("What should I say?", lambda content: self.send_email_content(recipient, content))
+    
+    def send_email_content(self, recipient, content):
+        try:
+            if not content:
+                self.add_to_conversation("Sorry, I didn't catch that")
                 return
-                
-            self.add_to_conversation("What should I say?")
-            content = self.take_command()
             
             server = smtplib.SMTP('smtp.gmail.com', 587)
             server.ehlo()
@@ -394,11 +546,11 @@ class ORBITAssistant:
             self.add_to_conversation(f"Sorry, could not send the email. Error: {str(e)}")
     
     def set_reminder(self):
-        self.add_to_conversation("At what time do you want me to remind you?")
-        reminder_time = self.take_command().lower()
-        self.add_to_conversation('What do you want me to remind you of?')
-        content = self.take_command()
-        
+        self.ask("At what time do you want me to remind you?",
+                 lambda reminder_time: self.ask('What do you want me to remind you of?',
+                                                lambda content: self.add_reminder(reminder_time.lower(), content)))
+    
+    def add_reminder(self, reminder_time, content):
         try:
             reminder_time = reminder_time.replace(':', ' ').split()
             hour = int(reminder_time[0])
@@ -492,13 +644,62 @@ To get started, say "Hey ORBIT" to enter task mode, then give me a command.
 When finished, say "Thank you ORBIT" to exit task mode."""
         self.add_to_conversation(intro)
     
+    @property
+    def ai_state(self):
+        """'loading', 'ready' or 'failed'"""
+        return self.ai.state
+    
+    def show_ai_state(self, state):
+        """Reflect the model loader's state in the status bar"""
+        text, color = STATE_DISPLAY[state]
+        self.ai_status.config(text=text, fg=color)
+        if state == 'ready':
+            warmup = self.ai.warmup_metrics or getattr(self.ai.model, 'warmup_metrics', None)
+            if warmup:
+                self.ai_throughput.update(warmup, warmup=True)
+    
     def ask_ai(self, query):
-        try:
-            self.add_to_conversation("Thinking...")
-            response = gpt4all_model.generate(query, max_tokens=200)
-            self.add_to_conversation(response)
-        except Exception as e:
-            self.add_to_conversation(f"Sorry, I couldn't process that request. Error: {str(e)}")
+        # "ask ai fresh ..." skips the cache
+        query, fresh = strip_fresh(query)
+        cached = self.response_cache.get(query, bypass=fresh)
+        if cached:
+            self.ai_context.add_turn(query, cached[0])
+            self.add_to_conversation(cached[0])
+            return
+        
+        # The budget counts from now, so time spent waiting for the model is part of it
+        started = time.perf_counter()
+        
+        def answer(model):
+            if model is None:
+                self.add_to_conversation(f"Sorry, the AI model couldn't be loaded. Error: {str(self.ai.error)}")
+                return
+            try:
+                self.add_to_conversation("Thinking...")
+                options, budget = reply_options(self.settings, self.ai_throughput, started=started)
+                stream = ResponseStream()
+                stream.feed(model, self.ai_context.build(query), budget=budget, **options)
+                if stream.error:
+                    raise stream.error
+                response = stream.final_text
+                self.record_throughput(stream.metrics())
+                self.ai_context.add_turn(query, response)
+                self.add_to_conversation(response)
+                self.response_cache.put(query, response)
+            except Exception as e:
+                self.add_to_conversation(f"Sorry, I couldn't process that request. Error: {str(e)}")
+        
+        # Queued while the model is loading, answered on the loader thread once it's ready
+        if self.ai.submit(answer) == 'loading':
+            self.add_to_conversation("The AI model is still loading, I'll answer as soon as it's ready.")
+    
+    def record_throughput(self, metrics):
+        """Fold a reply's speed into the estimate and persist it, so the next launch starts calibrated"""
+        if metrics['tokens'] > 1:
+            self.ai_throughput.update(metrics)
+            self.settings['ai_tokens_per_second'] = self.ai_throughput.tokens_per_second
+            self.settings['ai_first_token_seconds'] = self.ai_throughput.first_token_seconds
+            self.save_settings_to_file()
     
     # GUI-specific methods
     def open_browser(self):
@@ -716,22 +917,19 @@ When finished, say "Thank you ORBIT" to exit task mode."""
     def load_settings(self):
         try:
             with open('orbit_settings.json', 'r') as f:
-                self.settings = json.load(f)
+                # Saved values override the defaults; settings added since the file was written keep theirs
+                self.settings.update(json.load(f))
         except:
-            # Default settings
-            self.settings = {
-                'water_reminder': True,
-                'word_of_day': True,
-                'voice_enabled': True,
-                'email': '',
-                'password': ''
-            }
+            # Keep the default settings
+            pass
     
     def save_settings_to_file(self):
         with open('orbit_settings.json', 'w') as f:
             json.dump(self.settings, f)
     
     def close_assistant(self):
+        if self.listen_stop is not None:
+            self.listen_stop.set()
         self.wish_me(False)
         self.root.after(2000, self.root.destroy)
 
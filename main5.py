@@ -1,7 +1,5 @@
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, ttk, simpledialog, filedialog
-from gpt4all import GPT4All
-import pyttsx3
 import datetime
 import math
 import threading
@@ -16,25 +14,26 @@ from PIL import Image, ImageTk
 import platform
 import calendar as cal
 import psutil
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer, PorterStemmer
-from nltk import pos_tag, ne_chunk
-from nltk.tree import Tree
-from textblob import TextBlob
-import nltk
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+import time
+import queue
+from nltk.stem import PorterStemmer
 import re
-
-# Download required NLTK data
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('maxent_ne_chunker')
-nltk.download('words')
+from orbit_kb import KnowledgeBaseIndex, iter_knowledge_batches
+from orbit_nlp import Annotation, TextPreprocessor
+from orbit_resources import NLTKResources
+from orbit_entities import EntityExtractor
+from orbit_intents import IntentMatcher, ORBIT_INTENTS
+from orbit_classifier import IntentClassifier
+from orbit_ai import (ChatSession, HIGH, InferenceWorker, ModelLoader, ResponseStream, STATE_DISPLAY,
+                      ThroughputEstimator, reply_options)
+from orbit_cache import ResponseCache, strip_fresh
+from orbit_docs import DocumentIndex, DocumentIndexer, build_context
+from orbit_asr import DEFAULT_VOSK_MODEL, NotUnderstood, ServiceUnavailable, make_recognizer
+from orbit_audio import AudioCache
+from orbit_listen import Listener, MicrophoneSource
+from orbit_speech import SentenceSplitter, SpeechWorker, split_sentences
+from orbit_model_server import remote_factory
+import orbit_sentiment
 
 class ORBITAssistant:
     def __init__(self, root):
@@ -42,78 +41,110 @@ class ORBITAssistant:
         self.root.title("ORBIT Desktop Assistant v4.0 (NLP Enhanced)")
         self.root.geometry("1100x750")
         self.root.minsize(900, 600)
+        self.startup_timings = {}
+        
+        # Settings first, NLP setup reads them
+        self.run_startup_stage('settings', self.load_settings)
         
         # Initialize NLP components
-        self.setup_nlp()
+        self.run_startup_stage('nlp', self.setup_nlp)
         
         # Initialize other components
-        self.setup_ai()
-        self.setup_voice()
-        self.load_settings()
+        self.run_startup_stage('ai', self.setup_ai)
+        self.run_startup_stage('voice', self.setup_voice)
         
         # Task manager data
         self.tasks = self.load_tasks()
         
         # Knowledge base for question answering
         self.knowledge_base = self.load_knowledge_base()
-        self.setup_tfidf_vectorizer()
+        self.run_startup_stage('knowledge base', self.setup_tfidf_vectorizer)
         
         # Setup GUI
-        self.setup_gui()
+        self.run_startup_stage('gui', self.setup_gui)
         
         # Initial greeting
         self.greet_user()
         
         # Start background tasks
         self.start_background_tasks()
+        
+        # Includes interpreter start-up and module imports
+        self.launch_seconds = time.time() - psutil.Process().create_time()
+    
+    def run_startup_stage(self, name, func):
+        """Run one start-up step, recording how long it took"""
+        start = time.perf_counter()
+        result = func()
+        self.startup_timings[name] = time.perf_counter() - start
+        return result
     
     def setup_nlp(self):
         """Initialize NLP components using NLTK and TextBlob"""
-        # Initialize NLTK components
-        self.stop_words = set(stopwords.words('english'))
-        self.lemmatizer = WordNetLemmatizer()
+        # NLTK data is only looked up and loaded when a feature first needs it, and never
+        # downloaded unless the user turned that on
+        self.nlp_resources = NLTKResources(allow_download=self.settings.get('nltk_download', False))
+        self.root.after(0, self.offer_nltk_download)
         self.stemmer = PorterStemmer()
+        self.preprocessor = TextPreprocessor(resources=self.nlp_resources)
+        self.entity_extractor = EntityExtractor(
+            mode=self.settings.get('entity_mode', 'fast'),
+            contacts=self.settings.get('contacts', []),
+            places=self.settings.get('places', [])
+        )
+        # Whole-word keyword automaton behind the is_*_query checks
+        self.intent_matcher = IntentMatcher(ORBIT_INTENTS)
         
-        # Initialize text similarity components
-        self.vectorizer = TfidfVectorizer()
+        # Trained intent model (python orbit_classifier.py train); keyword rules cover low confidence
+        self.intent_classifier = None
+        model_path = self.settings.get('intent_model', 'intent_model.npz')
+        if os.path.exists(model_path):
+            try:
+                self.intent_classifier = IntentClassifier.load(model_path)
+            except Exception:
+                self.intent_classifier = None
+
     
-    def extract_entities(self, text):
+    def offer_nltk_download(self):
+        """Say which NLTK data is missing and how to opt in to downloading it"""
+        if self.nlp_resources.allow_download:
+            return
+        missing = self.nlp_resources.missing()
+        if missing:
+            self.add_message(f"ORBIT: Some language data is not installed ({', '.join(missing)}), so features "
+                             "that need it are unavailable. Turn on 'Download missing language data' in "
+                             "Settings > Startup to fetch it.", 'orbit')
+    
+    def annotate(self, text):
+        """Create the shared, lazily computed annotation for one utterance"""
+        return Annotation(text, self.nlp_resources, self.entity_extractor, self.preprocessor)
+    
+    def extract_entities(self, text, annotation=None):
         """Extract named entities from text using NLTK"""
-        entities = []
-        blob = TextBlob(text)
-        for word, pos in blob.tags:
-            if pos in ['NNP', 'NNPS']:  # Proper nouns
-                entities.append((word, 'PERSON'))
-        
-        # Additional entity extraction using NLTK's ne_chunk
-        tokenized = word_tokenize(text)
-        tagged = pos_tag(tokenized)
-        chunks = ne_chunk(tagged)
-        
-        for chunk in chunks:
-            if isinstance(chunk, Tree):
-                entity = ' '.join([c[0] for c in chunk])
-                label = chunk.label()
-                entities.append((entity, label))
-        
-        return list(set(entities))  # Remove duplicates
-    
-    def analyze_sentiment(self, text):
+        return (annotation or self.annotate(text)).entities
+    
+    def analyze_sentiment(self, text, annotation=None):
         """Sentiment analysis using TextBlob"""
-        analysis = TextBlob(text)
-        polarity = analysis.sentiment.polarity
-        
-        if polarity > 0.1:
-            return 'positive'
-        elif polarity < -0.1:
-            return 'negative'
-        else:
-            return 'neutral'
+        return (annotation or self.annotate(text)).sentiment
+
+    def analyze_sentiment_batch(self, texts, processes=None):
+        """Score many messages at once; returns (polarity array, labels, summary statistics)"""
+        polarity = orbit_sentiment.score_batch(texts, processes=processes)
+        return polarity, orbit_sentiment.label_batch(polarity), orbit_sentiment.summarize(polarity)
 
     def setup_tfidf_vectorizer(self):
-        """Setup TF-IDF vectorizer with knowledge base"""
+        """Setup TF-IDF vectorizer with knowledge base, reusing the persisted matrix when unchanged"""
+        self.kb_index = KnowledgeBaseIndex(
+            'knowledge_base.index',
+            backend=self.settings.get('kb_index', 'exact'),
+            n_probe=self.settings.get('kb_n_probe', 8),
+            refit_drift=self.settings.get('kb_refit_drift', 0.2)
+        )
+        self.kb_save_lock = threading.Lock()
+        self.kb_saved_count = 0
         documents = [q['question'] for q in self.knowledge_base]
-        self.vectorizer.fit(documents)
+        # Entries learned since the last full save were never in the persisted index
+        self.kb_index.build(documents, indexed=len(documents) - self.kb_learned)
     
     def load_knowledge_base(self):
         """Load question-answer knowledge base"""
@@ -142,64 +173,227 @@ class ORBITAssistant:
         
         try:
             with open('knowledge_base.json', 'r') as f:
-                return json.load(f)
+                knowledge_base = json.load(f)
         except:
-            return default_kb
+            knowledge_base = default_kb
+        
+        # Entries learned since the last full save, one JSON object per line
+        self.kb_learned = 0
+        try:
+            with open('knowledge_base.learned.jsonl', 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        knowledge_base.append(json.loads(line))
+                        self.kb_learned += 1
+                    except ValueError:
+                        # A line cut short by a crash mid-write
+                        continue
+        except OSError:
+            pass
+        return knowledge_base
     
     def save_knowledge_base(self):
-        """Save knowledge base to file"""
-        with open('knowledge_base.json', 'w') as f:
-            json.dump(self.knowledge_base, f, indent=4)
+        """Save the whole knowledge base to file, folding in the learned entries"""
+        with self.kb_save_lock:
+            with self.kb_index.lock:
+                snapshot = list(self.knowledge_base)
+            with open('knowledge_base.json.tmp', 'w') as f:
+                json.dump(snapshot, f, indent=4)
+            os.replace('knowledge_base.json.tmp', 'knowledge_base.json')
+            open('knowledge_base.learned.jsonl', 'w').close()
+            self.kb_saved_count = len(snapshot)
+            self.kb_index.save()
     
-    def preprocess_text(self, text):
-        """Preprocess text for NLP tasks"""
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters and numbers
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        
-        # Tokenize
-        tokens = word_tokenize(text)
+    def append_learned_entry(self, position, entry):
+        """Append one learned entry to the log instead of rewriting the knowledge base"""
+        with self.kb_save_lock:
+            if position < self.kb_saved_count:
+                # A full save already wrote it
+                return
+            with open('knowledge_base.learned.jsonl', 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+    
+    def learn(self, question, answer, tags=None):
+        """Add a question-answer pair at runtime without refitting the vectorizer"""
+        entry = {"question": question, "answer": answer, "tags": tags or []}
+        with self.kb_index.lock:
+            self.knowledge_base.append(entry)
+            self.kb_index.add([question])
+            position = len(self.knowledge_base) - 1
+        threading.Thread(target=self.append_learned_entry, args=(position, entry), daemon=True).start()
+        return entry
+    
+    def import_knowledge_base(self, path, batch_size=1000):
+        """Stream question-answer pairs from a JSONL or CSV file in the background"""
+        def _import():
+            count = 0
+            try:
+                for batch in iter_knowledge_batches(path, batch_size):
+                    # Entries and their rows change together so a lookup never sees one without the other
+                    with self.kb_index.lock:
+                        self.knowledge_base.extend(batch)
+                        self.kb_index.add([entry['question'] for entry in batch], refit=False)
+                    count += len(batch)
+                    self.root.after(0, lambda c=count: self.status_label.config(text=f"Importing... {c}", fg='#f39c12'))
+                
+                if self.kb_index.needs_refit():
+                    self.kb_index.refit_async()
+                self.save_knowledge_base()
+                self.root.after(0, lambda: self.add_message(f"ORBIT: Imported {count} knowledge base entries", 'orbit'))
+            except Exception as e:
+                self.root.after(0, lambda msg=str(e): self.add_message(f"ORBIT: Import error: {msg}", 'orbit'))
+            finally:
+                self.root.after(0, lambda: self.status_label.config(text="✓ Ready", fg='#2ecc71'))
         
-        # Remove stopwords and lemmatize
-        tokens = [self.lemmatizer.lemmatize(token) for token in tokens if token not in self.stop_words]
+        threading.Thread(target=_import, daemon=True).start()
+    
+    def import_knowledge_dialog(self):
+        """Pick a JSONL or CSV file of question-answer pairs to import"""
+        file_path = filedialog.askopenfilename(
+            title="Select knowledge base file",
+            filetypes=(("Knowledge files", "*.jsonl *.csv"),
+                      ("All files", "*.*"))
+        )
         
-        return ' '.join(tokens)
+        if file_path:
+            self.add_message(f"ORBIT: Importing knowledge from {os.path.basename(file_path)}", 'orbit')
+            self.import_knowledge_base(file_path)
+    
+    def preprocess_text(self, text):
+        """Preprocess text for NLP tasks (lowercase, strip, tokenize, lemmatize), memoized"""
+        return self.preprocessor.preprocess(text)
+    
+    def preprocess_many(self, texts):
+        """Preprocess a batch of texts, e.g. when replaying logs"""
+        return self.preprocessor.preprocess_many(texts)
+    
+    def find_similar_questions(self, query):
+        """Find the top-k knowledge base entries above the similarity threshold"""
+        with self.kb_index.lock:
+            results = self.kb_index.search(
+                query,
+                top_k=self.settings.get('kb_top_k', 3),
+                threshold=self.settings.get('kb_threshold', 0.6)
+            )
+            return [(self.knowledge_base[idx], score) for idx, score in results]
     
     def find_most_similar_question(self, query):
         """Find the most similar question in knowledge base using TF-IDF and cosine similarity"""
-        query_vec = self.vectorizer.transform([query])
-        doc_vecs = self.vectorizer.transform([q['question'] for q in self.knowledge_base])
-        
-        similarities = cosine_similarity(query_vec, doc_vecs)
-        most_similar_idx = np.argmax(similarities)
+        matches = self.find_similar_questions(query)
         
         # Only return if similarity is above threshold
-        if similarities[0, most_similar_idx] > 0.6:
-            return self.knowledge_base[most_similar_idx]['answer']
+        if matches:
+            return matches[0][0]['answer']
         return None
     
     def setup_ai(self):
-        """Initialize the AI model with error handling"""
-        try:
-            # Using a larger model - adjust based on your system capabilities
-            self.ai_model = GPT4All("orca-mini-3b-gguf2-q4_0.gguf", device="cpu")
-            self.ai_ready = True
-        except Exception as e:
-            messagebox.showerror("AI Error", f"Failed to load AI model: {str(e)}")
-            self.ai_ready = False
+        """Start loading the AI model in the background once the window is showing"""
+        # Using a larger model - adjust based on your system capabilities
+        # With the 'server' backend every ORBIT window shares one model process, started on demand
+        use_server = self.settings.get('ai_backend', 'server') == 'server'
+        self.ai = ModelLoader(
+            "orca-mini-3b-gguf2-q4_0.gguf", device="cpu",
+            on_state=lambda state: self.root.after(0, self.show_ai_state, state),
+            factory=remote_factory(self.settings.get('ai_server_port', 8765)) if use_server else None,
+            warmup_tokens=0 if use_server else 8
+        )
+        self.root.after(100, self.ai.start)
+        # The worker thread is the only caller of the model
+        self.ai_worker = InferenceWorker(self.ai, max_queue=self.settings.get('ai_queue_size', 4))
+        self.chat_session = ChatSession(n_ctx=self.settings.get('ai_context_tokens', 2048))
+        self.response_cache = ResponseCache(
+            'ai_cache.json',
+            max_entries=self.settings.get('ai_cache_size', 500),
+            ttl=self.settings.get('ai_cache_ttl_hours', 168) * 3600,
+            threshold=self.settings.get('ai_cache_threshold', 0.85)
+        )
+        self.response_cache.load()
+        self.ai_metrics = []
+        # Starts from the speed measured in earlier runs, then follows warm-up and every reply
+        self.ai_throughput = ThroughputEstimator(
+            self.settings.get('ai_tokens_per_second'),
+            self.settings.get('ai_first_token_seconds')
+        )
+        self.setup_documents()
+    
+    def setup_documents(self):
+        """Index the documents folder in the background so AI answers can draw on the user's files"""
+        self.documents = DocumentIndex('documents.index')
+        self.doc_indexer = DocumentIndexer(
+            self.documents,
+            self.settings['documents_path'],
+            duty=self.settings.get('docs_duty', 0.2),
+            load=True
+        )
+        # Reading the user's files is opt-in, from Settings > Paths
+        if self.settings.get('docs_enabled', False):
+            # Leave the first seconds after launch to the UI and the model
+            self.root.after(5000, self.doc_indexer.start)
+    
+    def update_document_indexing(self):
+        """Start or stop the background indexer to follow the docs_enabled setting"""
+        self.doc_indexer.root = self.settings['documents_path']
+        if not self.settings.get('docs_enabled', False):
+            self.doc_indexer.stop()
+            return
+        if self.doc_indexer.stop_event.is_set():
+            # A stopped indexer cannot be restarted; its replacement loads the index unless it already ran
+            self.doc_indexer = DocumentIndexer(
+                self.documents,
+                self.settings['documents_path'],
+                duty=self.settings.get('docs_duty', 0.2),
+                load=self.doc_indexer.thread is None
+            )
+        self.doc_indexer.start()
+    
+    def find_document_context(self, prompt):
+        """Prompt preamble quoting the user's files most relevant to prompt, and the files used"""
+        if not self.settings.get('docs_enabled', False):
+            return None, []
+        results = self.documents.search(
+            prompt,
+            top_k=self.settings.get('docs_top_k', 3),
+            threshold=self.settings.get('docs_threshold', 0.25)
+        )
+        if not results:
+            return None, []
+        return build_context(results), sorted({os.path.basename(path) for _, path, _ in results})
+    
+    @property
+    def ai_state(self):
+        """'loading', 'ready' or 'failed'"""
+        return self.ai.state
+    
+    @property
+    def ai_ready(self):
+        """Whether AI queries are accepted; while the model loads they are queued"""
+        return self.ai.state != 'failed'
+    
+    def show_ai_state(self, state):
+        """Reflect the model loader's state in the status bar"""
+        text, color = STATE_DISPLAY[state]
+        self.ai_status.config(text=text, fg=color)
+        if state == 'ready':
+            warmup = self.ai.warmup_metrics or getattr(self.ai.model, 'warmup_metrics', None)
+            if warmup:
+                self.ai_throughput.update(warmup, warmup=True)
+        if state == 'loading':
+            self.status_label.config(text="Loading AI model...", fg='#f39c12')
+        elif self.status_label.cget('text') == "Loading AI model...":
+            self.status_label.config(text="✓ Ready", fg='#2ecc71')
+        if state == 'failed':
+            messagebox.showerror("AI Error", f"Failed to load AI model: {str(self.ai.error)}")
     
     def setup_voice(self):
-        """Initialize text-to-speech engine"""
-        try:
-            self.engine = pyttsx3.init()
-            voices = self.engine.getProperty('voices')
-            self.engine.setProperty('voice', voices[0].id)
-            self.engine.setProperty('rate', 180)
-            self.voice_enabled = True
-        except:
-            self.voice_enabled = False
+        """Start the speech worker, the one thread that owns the text-to-speech engine"""
+        self.speech = SpeechWorker(voice=0, rate=180, audio_cache=AudioCache().load()).start()
+        # The engine is created on the worker thread; wait for it so voice_enabled is accurate
+        self.voice_enabled = self.speech.ready.wait(5) and self.speech.error is None
+        # Clips of the phrases ORBIT says most are rendered whenever it has nothing to say
+        self.speech.prerender()
+        # The microphone is opened the first time voice input is used
+        self.listener = None
+        self.recognizer = None
     
     def load_settings(self):
         """Load user settings from file"""
@@ -212,7 +406,40 @@ class ORBITAssistant:
             'documents_path': os.path.expanduser('~/Documents'),
             'downloads_path': os.path.expanduser('~/Downloads'),
             'voice_rate': 180,
-            'startup_greeting': True
+            'speech_engine': 'google',
+            'vosk_model': DEFAULT_VOSK_MODEL,
+            'startup_greeting': True,
+            'kb_index': 'exact',
+            'kb_top_k': 3,
+            'kb_threshold': 0.6,
+            'kb_n_probe': 8,
+            'kb_refit_drift': 0.2,
+            'nltk_download': False,
+            'show_nlp_timings': False,
+            'entity_mode': 'fast',
+            'log_entities': False,
+            'contacts': [],
+            'places': [],
+            'intent_model': 'intent_model.npz',
+            'intent_threshold': 0.6,
+            'ai_streaming': True,
+            'ai_queue_size': 4,
+            'ai_context_tokens': 2048,
+            'ai_cache': True,
+            'ai_cache_size': 500,
+            'ai_cache_ttl_hours': 168,
+            'ai_cache_threshold': 0.85,
+            'ai_backend': 'server',
+            'ai_server_port': 8765,
+            'ai_max_tokens': 400,
+            'ai_temperature': 0.7,
+            'ai_latency_budget': 0,
+            'ai_tokens_per_second': None,
+            'ai_first_token_seconds': None,
+            'docs_enabled': False,
+            'docs_top_k': 3,
+            'docs_threshold': 0.25,
+            'docs_duty': 0.2
         }
         
         try:
@@ -274,6 +501,7 @@ class ORBITAssistant:
         file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="Open File", command=self.open_file_dialog)
         file_menu.add_command(label="Open Folder", command=self.open_folder_dialog)
+        file_menu.add_command(label="Import Knowledge...", command=self.import_knowledge_dialog)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         menubar.add_cascade(label="File", menu=file_menu)
@@ -285,6 +513,8 @@ class ORBITAssistant:
         tools_menu.add_command(label="Task Manager", command=self.show_task_manager)
         tools_menu.add_command(label="Calculator", command=self.show_calculator)
         tools_menu.add_command(label="Calendar", command=self.show_calendar)
+        tools_menu.add_command(label="Startup Report", command=self.show_startup_report)
+        tools_menu.add_command(label="AI Metrics", command=self.show_ai_metrics)
         menubar.add_cascade(label="Tools", menu=tools_menu)
         
         # Settings menu
@@ -329,8 +559,8 @@ class ORBITAssistant:
         
         self.ai_status = tk.Label(
             self.status_frame, 
-            text="AI: Online" if self.ai_ready else "AI: Offline", 
-            fg='#2ecc71' if self.ai_ready else '#e74c3c', 
+            text=STATE_DISPLAY[self.ai_state][0], 
+            fg=STATE_DISPLAY[self.ai_state][1], 
             bg=self.bg_color
         )
         self.ai_status.pack(side=tk.LEFT, padx=5)
@@ -370,6 +600,8 @@ class ORBITAssistant:
         )
         self.user_input.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         self.user_input.bind('<Return>', self.process_input)
+        self.user_input.bind('<Key>', self.interrupt_speech, add='+')
+        self.root.bind('<Escape>', self.stop_ai)
         self.user_input.focus_set()
         
         # Voice button
@@ -441,36 +673,69 @@ class ORBITAssistant:
             self.speak(text.replace("ORBIT: ", ""))
     
     def speak(self, text):
-        """Speak text using TTS"""
-        def _speak():
-            self.engine.say(text)
-            self.engine.runAndWait()
-        
-        threading.Thread(target=_speak, daemon=True).start()
+        """Queue text for the speech worker a sentence at a time; overlapping messages are spoken in turn"""
+        return self.speech.say_sentences(text)
+    
+    def interrupt_speech(self, event=None):
+        """Stop talking as soon as the user starts typing or speaking"""
+        if self.voice_enabled:
+            self.speech.interrupt()
     
     def start_voice_input(self):
         """Start voice input in a separate thread"""
+        self.interrupt_speech()
         threading.Thread(target=self.take_voice_command, daemon=True).start()
     
+    def get_listener(self):
+        """The always-on microphone listener, opened once on first use and kept running"""
+        # A listener whose device failed is replaced, so unplugging a headset isn't permanent
+        if self.listener is None or self.listener.finished.is_set():
+            if self.recognizer is None:
+                # An offline model is loaded once and stays resident for every later command
+                engine = self.settings.get('speech_engine', 'google')
+                options = {'model_path': self.settings.get('vosk_model', DEFAULT_VOSK_MODEL)} if engine == 'vosk' else {}
+                self.recognizer = make_recognizer(engine, **options).load()
+            # ORBIT's own voice is not a command
+            self.listener = Listener(MicrophoneSource(), gate=lambda: not self.speech.busy,
+                                     recognizer=self.recognizer, on_partial=self.show_partial_speech).start()
+        return self.listener
+    
+    def show_partial_speech(self, text):
+        """Show the words recognized so far while the user is still speaking"""
+        def show():
+            self.user_input.delete(0, tk.END)
+            self.user_input.insert(0, text)
+            # Intents are matched on the partial text, so the likely command shows before speech ends
+            match = self.intent_matcher.best(text)
+            self.status_label.config(text=f"🎤 Hearing... ({match.intent})" if match else "🎤 Hearing...",
+                                     fg='#f39c12')
+        
+        self.root.after(0, show)
+    
     def take_voice_command(self):
         """Capture voice command using microphone"""
         self.status_label.config(text="🎤 Listening...", fg='#f39c12')
         self.voice_btn.config(state=tk.DISABLED)
         
+        transcript = None
         try:
-            import speech_recognition as sr
-            r = sr.Recognizer()
-            with sr.Microphone() as source:
-                audio = r.listen(source, timeout=5)
+            listener = self.get_listener()
+            # Speech from before the press was not meant for ORBIT; speech under way still counts
+            listener.flush()
+            segment = listener.listen(timeout=5)
             
             try:
-                query = r.recognize_google(audio)
+                if segment is None:
+                    # Nobody spoke within the timeout
+                    raise NotUnderstood()
+                transcript = self.recognizer.recognize(segment)
                 self.user_input.delete(0, tk.END)
-                self.user_input.insert(0, query)
+                self.user_input.insert(0, transcript.text)
                 self.process_input()
-            except sr.UnknownValueError:
+            except NotUnderstood:
+                self.user_input.delete(0, tk.END)
                 self.add_message("ORBIT: Sorry, I didn't catch that", 'orbit')
-            except sr.RequestError:
+            except ServiceUnavailable:
                 self.add_message("ORBIT: Speech service unavailable", 'orbit')
         
         except ImportError:
@@ -478,7 +743,11 @@ class ORBITAssistant:
         except Exception as e:
             self.add_message(f"ORBIT: Voice error: {str(e)}", 'orbit')
         
-        self.status_label.config(text="✓ Ready", fg='#2ecc71')
+        if transcript is not None:
+            self.status_label.config(text=f"✓ Ready (speech recognized in {transcript.latency:.2f} s, {transcript.engine})",
+                                     fg='#2ecc71')
+        else:
+            self.status_label.config(text="✓ Ready", fg='#2ecc71')
         self.voice_btn.config(state=tk.NORMAL)
     
     def process_input(self, event=None):
@@ -490,18 +759,44 @@ class ORBITAssistant:
         self.add_message(f"You: {query}", 'user')
         self.user_input.delete(0, tk.END)
         
+        if query.lower() in ('stop', 'cancel', 'stop talking'):
+            self.stop_ai()
+            return
+        if query.lower() in ('new conversation', 'reset conversation', 'forget this conversation'):
+            self.new_conversation()
+            return
+        
+        # Teach a new answer: "learn: question => answer"
+        learn_match = re.match(r'^learn:\s*(.+?)\s*=>\s*(.+)$', query, re.IGNORECASE)
+        if learn_match:
+            question, answer = learn_match.groups()
+            self.learn(question, answer)
+            self.add_message(f"ORBIT: Got it. I'll answer '{question}' with that from now on.", 'orbit')
+            return
+        
+        # Tokens, tags, entities and sentiment are computed at most once per message
+        annotation = self.annotate(query)
+        try:
+            self.route_query(query, annotation)
+        finally:
+            if self.settings.get('show_nlp_timings', False):
+                self.add_message(f"System: NLP timings - {annotation.timing_report()}", 'system')
+    
+    def route_query(self, query, annotation):
+        """Answer or dispatch a query using its shared annotation"""
         # Preprocess the query
-        processed_query = self.preprocess_text(query)
+        processed_query = annotation.processed
         
         # Analyze sentiment
-        sentiment = self.analyze_sentiment(query)
+        sentiment = self.analyze_sentiment(query, annotation)
         if sentiment == 'negative':
             self.add_message("ORBIT: I'm sorry you're feeling that way. How can I help?", 'orbit')
         
-        # Extract entities
-        entities = self.extract_entities(query)
-        if entities:
-            self.log_entities(entities)
+        # Extract entities only when they are displayed
+        if self.settings.get('log_entities', False):
+            entities = self.extract_entities(query, annotation)
+            if entities:
+                self.log_entities(entities)
         
         # First try to find answer in knowledge base
         kb_answer = self.find_most_similar_question(processed_query)
@@ -510,62 +805,64 @@ class ORBITAssistant:
             return
         
         # Process commands with enhanced NLP understanding
-        if self.is_calculation_query(query):
+        intent = self.classify_intent(query)
+        if intent == 'calculate':
             self.calculate(query)
-        elif self.is_task_query(query):
-            self.handle_task_query(query)
-        elif self.is_reminder_query(query):
-            self.handle_reminder_query(query)
-        elif self.is_information_query(query):
-            self.handle_information_query(query)
-        elif self.is_application_query(query):
-            self.handle_application_query(query)
-        elif self.ai_ready and len(query.split()) > 3:  # Only use AI for complex queries
+        elif intent == 'task':
+            self.handle_task_query(query, annotation)
+        elif intent == 'reminder':
+            self.handle_reminder_query(query, annotation)
+        elif intent == 'information':
+            self.handle_information_query(query, annotation)
+        elif intent == 'application':
+            self.handle_application_query(query, annotation)
+        elif intent == 'ai' and self.ai_ready:
+            self.generate_ai_response(query)
+        elif intent is None and self.ai_ready and len(query.split()) > 3:  # Only use AI for complex queries
             self.generate_ai_response(query)
         else:
             self.add_message("ORBIT: I'm not sure how to help with that. Can you rephrase?", 'orbit')
     
+    def classify_intent(self, query):
+        """Pick an intent with the trained classifier, falling back to keyword rules below the threshold"""
+        if self.intent_classifier is not None:
+            intent, confidence = self.intent_classifier.predict(query)
+            if confidence >= self.settings.get('intent_threshold', 0.6):
+                return intent
+        
+        # One automaton pass finds every keyword intent; table order is precedence
+        intents = self.intent_matcher.intents_in(query)
+        return intents[0] if intents else None
+    
     def is_calculation_query(self, query):
         """Determine if query is a calculation request using NLP"""
-        calc_keywords = ['calculate', 'compute', 'solve', 'what is', 'math', '+', '-', '*', '/']
-        return any(keyword in query.lower() for keyword in calc_keywords)
+        return 'calculate' in self.intent_matcher.intents_in(query)
     
     def is_task_query(self, query):
         """Determine if query is about tasks using NLP"""
-        task_keywords = ['task', 'todo', 'reminder', 'remember', 'add', 'new']
-        return any(keyword in query.lower() for keyword in task_keywords)
+        return 'task' in self.intent_matcher.intents_in(query)
     
     def is_reminder_query(self, query):
         """Determine if query is about reminders using NLP"""
-        reminder_keywords = ['remind', 'alert', 'notify', 'remember']
-        time_keywords = ['at', 'in', 'on', 'tomorrow', 'today', 'after']
-        return (any(keyword in query.lower() for keyword in reminder_keywords) and
-                any(keyword in query.lower() for keyword in time_keywords))
+        return 'reminder' in self.intent_matcher.intents_in(query)
     
     def is_information_query(self, query):
         """Determine if query is requesting information using NLP"""
-        info_keywords = ['what', 'when', 'where', 'who', 'why', 'how', 'tell me', 'explain']
-        return any(keyword in query.lower() for keyword in info_keywords)
+        return 'information' in self.intent_matcher.intents_in(query)
     
     def is_application_query(self, query):
         """Determine if query is about opening applications using NLP"""
-        app_keywords = ['open', 'launch', 'start', 'run']
-        app_names = ['notepad', 'calculator', 'browser', 'chrome', 'firefox', 'word', 'excel']
-        return (any(keyword in query.lower() for keyword in app_keywords) and
-                any(name in query.lower() for name in app_names))
+        return 'application' in self.intent_matcher.intents_in(query)
     
-    def handle_task_query(self, query):
+    def handle_task_query(self, query, annotation=None):
         """Handle task-related queries with NLP"""
-        # Using TextBlob for parsing instead of spaCy
-        blob = TextBlob(query.lower())
+        annotation = annotation or self.annotate(query)
         
         # Extract task description - simple approach
         task = ""
-        for sentence in blob.sentences:
-            words = sentence.words
-            if 'add' in words or 'create' in words or 'new' in words:
-                task = ' '.join([word for word in words if word not in ['add', 'task', 'create', 'new']])
-                break
+        words = annotation.words
+        if 'add' in words or 'create' in words or 'new' in words:
+            task = ' '.join([word for word in words if word not in ['add', 'task', 'create', 'new']])
         
         if not task:
             # Fallback to simple string replacement
@@ -578,11 +875,12 @@ class ORBITAssistant:
         else:
             self.add_message("ORBIT: Please specify a task to add", 'orbit')
     
-    def handle_reminder_query(self, query):
+    def handle_reminder_query(self, query, annotation=None):
         """Handle reminder queries with NLP"""
-        # Using NLTK for time entity extraction
-        tokens = word_tokenize(query.lower())
-        tagged = pos_tag(tokens)
+        # Using the shared NLTK tags for time entity extraction
+        annotation = annotation or self.annotate(query)
+        tokens = annotation.lower_tokens
+        tagged = annotation.lower_pos_tags
         
         # Extract time information (simple approach)
         time_entity = None
@@ -621,15 +919,14 @@ class ORBITAssistant:
         else:
             self.add_message("ORBIT: Please specify both the reminder and time (e.g. 'remind me in 5 minutes to take a break')", 'orbit')
     
-    def handle_information_query(self, query):
+    def handle_information_query(self, query, annotation=None):
         """Handle information requests with NLP"""
-        # Using TextBlob for question analysis
-        blob = TextBlob(query.lower())
+        annotation = annotation or self.annotate(query)
         
         # Identify question type
         question_type = "general"
         wh_words = ['what', 'when', 'where', 'who', 'why', 'how']
-        for word in blob.words:
+        for word in annotation.words:
             if word in wh_words:
                 question_type = word
                 break
@@ -650,11 +947,11 @@ class ORBITAssistant:
             else:
                 self.search_web(query)
     
-    def handle_application_query(self, query):
+    def handle_application_query(self, query, annotation=None):
         """Handle application opening requests with NLP"""
-        # Using NLTK for parsing
-        tokens = word_tokenize(query.lower())
-        tagged = pos_tag(tokens)
+        # Using the shared NLTK tags for parsing
+        annotation = annotation or self.annotate(query)
+        tagged = annotation.lower_pos_tags
         
         # Extract application name (simple approach)
         app_name = ""
@@ -710,23 +1007,152 @@ class ORBITAssistant:
             self.add_message(f"ORBIT: Calculation error: {str(e)}", 'orbit')
     
     def generate_ai_response(self, prompt):
-        """Generate response from AI model"""
+        """Answer from the response cache, or queue the prompt for the inference worker"""
+        # "ask ai fresh ..." always goes to the model
+        prompt, fresh = strip_fresh(prompt)
+        if self.settings.get('ai_cache', True):
+            cached = self.response_cache.get(prompt, bypass=fresh)
+            if cached:
+                response, kind, score = cached
+                self.add_message(f"ORBIT: {response}", 'orbit')
+                self.status_label.config(text=f"✓ Ready (cached, {kind} match)", fg='#2ecc71')
+                return
+        
         if not self.ai_ready:
             self.add_message("ORBIT: AI is currently unavailable", 'orbit')
             return
         
-        def generate_response():
-            self.status_label.config(text="AI: Thinking...", fg='#f39c12')
+        def generate_response(model, request):
+            if model is None:
+                self.add_message("ORBIT: AI is currently unavailable", 'orbit')
+                return
+            # Excerpts from the documents folder ride along with this question only
+            context, sources = self.find_document_context(prompt)
+            if sources:
+                self.status_label.config(text=f"AI: Thinking (reading {', '.join(sources)})...", fg='#f39c12')
+            else:
+                self.status_label.config(text="AI: Thinking...", fg='#f39c12')
+            streaming = self.settings.get('ai_streaming', True)
+            # With a latency budget (seconds, 0 for none) the reply is sized to what this machine can do in time
+            options, budget = reply_options(self.settings, self.ai_throughput, started=request.submitted)
             try:
-                with self.ai_model.chat_session():
-                    response = self.ai_model.generate(prompt, max_tokens=400, temp=0.7)
-                    self.add_message(f"ORBIT: {response}", 'orbit')
+                # One session across turns keeps the conversation in the model's cache
+                if streaming:
+                    # Tokens reach the conversation pane while the rest is generated
+                    stream = ResponseStream()
+                    stream.queue_wait = request.wait_seconds
+                    self.root.after(0, self.show_ai_stream, stream)
+                    response = self.chat_session.respond(model, prompt, stream=stream, cancel=request.cancel_event,
+                                                         budget=budget, context=context, **options)
+                else:
+                    response = self.chat_session.respond(model, prompt, cancel=request.cancel_event,
+                                                         budget=budget, context=context, **options)
+                    self.add_message(f"ORBIT: {response}" + (" [stopped]" if request.cancelled else ""), 'orbit')
+                # Answers drawn from files would go stale when the files change
+                if not request.cancelled and not sources and self.settings.get('ai_cache', True):
+                    self.response_cache.put(prompt, response)
             except Exception as e:
                 self.add_message(f"ORBIT: AI error: {str(e)}", 'orbit')
+                streaming = False
             finally:
-                self.status_label.config(text="✓ Ready", fg='#2ecc71')
+                if not streaming:
+                    self.status_label.config(text="✓ Ready", fg='#2ecc71')
+        
+        try:
+            request = self.ai_worker.submit(generate_response, group='chat', label=prompt)
+        except queue.Full:
+            self.add_message("ORBIT: I'm still working on earlier questions. Please try again in a moment.", 'orbit')
+            return
         
-        threading.Thread(target=generate_response, daemon=True).start()
+        if request.replaced:
+            self.add_message(f"ORBIT: Skipping {len(request.replaced)} earlier question(s) to answer this one.", 'orbit')
+        if self.ai_state == 'loading':
+            self.add_message("ORBIT: The AI model is still loading, I'll answer as soon as it's ready", 'orbit')
+    
+    def new_conversation(self):
+        """Start the AI conversation over; runs on the inference worker, which owns the session"""
+        self.ai_worker.cancel_all()
+        self.ai_worker.submit(lambda model, request: self.chat_session.clear(), priority=HIGH)
+        self.add_message("ORBIT: Okay, let's start a new conversation.", 'orbit')
+    
+    def stop_ai(self, event=None):
+        """Stop the answer being generated, drop queued AI questions and stop talking"""
+        self.interrupt_speech()
+        if self.ai_worker.cancel_all():
+            self.add_message("ORBIT: Stopped.", 'orbit')
+    
+    def show_ai_stream(self, stream):
+        """Show a streamed AI reply on its own line, appending batches of tokens as they arrive"""
+        mark = f"ai_stream_{id(stream)}"
+        self.conversation.config(state=tk.NORMAL)
+        self.conversation.insert(tk.END, "ORBIT: \n", 'orbit')
+        self.conversation.config(state=tk.DISABLED)
+        # Messages added meanwhile go below; the reply keeps growing at this mark
+        self.conversation.mark_set(mark, 'end-2c')
+        # Each sentence is spoken as soon as it is complete, while the rest is still being generated
+        splitter = SentenceSplitter()
+        first_sentence = []
+        
+        def speak_sentences(sentences):
+            if not sentences or not (self.voice_enabled and self.settings['voice']):
+                return
+            if not first_sentence:
+                first_sentence.append(time.perf_counter())
+            for sentence in sentences:
+                self.speech.say(sentence)
+        
+        def append(text, spoken=True):
+            self.conversation.config(state=tk.NORMAL)
+            self.conversation.insert(mark, text, 'orbit')
+            self.conversation.config(state=tk.DISABLED)
+            self.conversation.see(mark)
+            if spoken:
+                speak_sentences(splitter.feed(text))
+        
+        def done(stream):
+            text = stream.final_text
+            if len(text) < len(stream.text):
+                # Out of time mid-sentence: drop the unfinished sentence already shown
+                self.conversation.config(state=tk.NORMAL)
+                self.conversation.delete(f"{mark}-{len(stream.text) - len(text)}c", mark)
+                self.conversation.config(state=tk.DISABLED)
+            # Still unspoken: the tail after the last complete sentence, less anything trimmed above
+            pending = splitter.buffer[:len(splitter.buffer) - (len(stream.text) - len(text))]
+            splitter.buffer = ''
+            if stream.error:
+                append(f" [AI error: {str(stream.error)}]", spoken=False)
+            elif stream.cancelled:
+                append(" [stopped]", spoken=False)
+            elif pending.strip():
+                speak_sentences(split_sentences(pending))
+            self.conversation.mark_unset(mark)
+            metrics = stream.metrics()
+            if first_sentence and stream.started is not None:
+                metrics['time_to_first_sentence'] = first_sentence[0] - stream.started
+            self.record_ai_metrics(metrics)
+        
+        stream.poll(self.root, append, done)
+    
+    def record_ai_metrics(self, metrics):
+        """Keep per-response latency metrics and show the latest in the status bar"""
+        self.ai_metrics.append(metrics)
+        del self.ai_metrics[:-100]
+        if metrics['tokens'] > 1:
+            # Persist the speed so the next launch sizes replies correctly from the start
+            self.ai_throughput.update(metrics)
+            self.settings['ai_tokens_per_second'] = self.ai_throughput.tokens_per_second
+            self.settings['ai_first_token_seconds'] = self.ai_throughput.first_token_seconds
+            self.save_settings()
+        if metrics['time_to_first_token'] is None:
+            self.status_label.config(text="✓ Ready", fg='#2ecc71')
+            return
+        rate = metrics['tokens_per_second']
+        self.status_label.config(
+            text=f"✓ Ready (first token {metrics['time_to_first_token']:.1f} s"
+                 + (f", {rate:.1f} tok/s" if rate else "")
+                 + (", shortened to fit the time limit)" if metrics.get('budget_stopped') else ")"),
+            fg='#2ecc71'
+        )
     
     def show_calculator(self):
         """Show advanced calculator window"""
@@ -1050,6 +1476,13 @@ class ORBITAssistant:
             command=lambda: self.browse_path(self.doc_path_var, 'documents_path')
         ).grid(row=1, column=2, padx=5)
         
+        self.docs_enabled_var = tk.BooleanVar(value=self.settings.get('docs_enabled', False))
+        ttk.Checkbutton(
+            paths_frame,
+            text="Let AI answers quote files in the Documents Folder (indexes it in the background)",
+            variable=self.docs_enabled_var
+        ).grid(row=2, column=0, columnspan=3, sticky='w', padx=10, pady=5)
+        
         # Startup Tab
         startup_frame = ttk.Frame(notebook)
         notebook.add(startup_frame, text="Startup")
@@ -1068,6 +1501,35 @@ class ORBITAssistant:
             variable=self.word_of_day_var
         ).grid(row=1, column=0, columnspan=2, sticky='w', padx=10, pady=5)
         
+        self.nltk_download_var = tk.BooleanVar(value=self.settings.get('nltk_download', False))
+        ttk.Checkbutton(
+            startup_frame,
+            text="Download missing language data (needs a network connection)",
+            variable=self.nltk_download_var
+        ).grid(row=2, column=0, columnspan=2, sticky='w', padx=10, pady=5)
+        
+        # AI Tab
+        ai_frame = ttk.Frame(notebook)
+        notebook.add(ai_frame, text="AI")
+        
+        ttk.Label(ai_frame, text="Answer within (seconds, 0 = no limit):").grid(row=0, column=0, padx=10, pady=10, sticky='w')
+        
+        self.ai_budget_var = tk.DoubleVar(value=self.settings.get('ai_latency_budget', 0))
+        ttk.Spinbox(
+            ai_frame,
+            from_=0,
+            to=120,
+            increment=1,
+            textvariable=self.ai_budget_var,
+            width=8
+        ).grid(row=0, column=1, sticky='w')
+        
+        rate = self.ai_throughput.tokens_per_second
+        ttk.Label(
+            ai_frame,
+            text=f"Measured speed: {rate:.1f} tokens/s" if rate else "Measured speed: not yet measured"
+        ).grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky='w')
+        
         # Save button
         ttk.Button(
             settings_window,
@@ -1080,8 +1542,11 @@ class ORBITAssistant:
                     'voice_rate': self.voice_rate.get(),
                     'music_path': self.music_path_var.get(),
                     'documents_path': self.doc_path_var.get(),
+                    'docs_enabled': self.docs_enabled_var.get(),
                     'startup_greeting': self.startup_greeting_var.get(),
-                    'word_of_day': self.word_of_day_var.get()
+                    'word_of_day': self.word_of_day_var.get(),
+                    'nltk_download': self.nltk_download_var.get(),
+                    'ai_latency_budget': self.ai_budget_var.get()
                 }
             )
         ).pack(side=tk.BOTTOM, pady=10)
@@ -1090,10 +1555,13 @@ class ORBITAssistant:
         """Save settings from dialog and update application"""
         self.settings.update(new_settings)
         self.save_settings()
+        self.nlp_resources.allow_download = self.settings['nltk_download']
+        # The next indexing pass picks up a changed documents folder
+        self.update_document_indexing()
         
         # Update voice rate if changed
         if self.voice_enabled:
-            self.engine.setProperty('rate', self.settings['voice_rate'])
+            self.speech.set_property('rate', self.settings['voice_rate'])
         
         # Update theme if changed
         if new_settings['theme'] != self.settings['theme']:
@@ -1123,6 +1591,79 @@ class ORBITAssistant:
         """
         messagebox.showinfo("System Info", system_info)
 
+    def show_startup_report(self):
+        """Show how long each start-up stage and NLTK resource took"""
+        launch = self.launch_seconds
+        lines = [f"Launch: {launch:.2f} s", ""]
+        lines.append("Start-up stages:")
+        for stage, seconds in self.startup_timings.items():
+            lines.append(f"  {stage}: {seconds * 1000:.0f} ms ({seconds / launch:.0%})")
+        
+        lines.append("")
+        lines.append("NLTK resources (loaded on first use):")
+        lines.extend(f"  {line}" for line in self.nlp_resources.report(launch) or ["none loaded yet"])
+        
+        lines.append("")
+        lines.append("AI model (loaded in the background):")
+        lines.extend(f"  {line}" for line in self.ai.report())
+        messagebox.showinfo("Startup Report", "\n".join(lines))
+
+    def show_ai_metrics(self):
+        """Show inference queue statistics and recent response latencies"""
+        worker = self.ai_worker.metrics()
+        lines = [
+            f"AI state: {self.ai_state}",
+            f"Queue depth: {worker['depth']} of {self.ai_worker.max_queue}" + (" (generating)" if worker['busy'] else ""),
+            "Requests: " + ", ".join(f"{worker[key]} {key}" for key in
+                                     ('submitted', 'completed', 'cancelled', 'superseded', 'rejected', 'failed'))
+        ]
+        if 'wait_mean' in worker:
+            lines.append(f"Queue wait: mean {worker['wait_mean']:.2f} s, p95 {worker['wait_p95']:.2f} s, "
+                         f"max {worker['wait_max']:.2f} s")
+        
+        first_tokens = [m['time_to_first_token'] for m in self.ai_metrics if m['time_to_first_token'] is not None]
+        rates = [m['tokens_per_second'] for m in self.ai_metrics if m['tokens_per_second']]
+        lines.append("")
+        lines.append(f"Streamed responses: {len(self.ai_metrics)}")
+        if first_tokens:
+            lines.append(f"Time to first token: mean {sum(first_tokens) / len(first_tokens):.2f} s, "
+                         f"last {first_tokens[-1]:.2f} s")
+        if rates:
+            lines.append(f"Generation speed: mean {sum(rates) / len(rates):.1f} tok/s, last {rates[-1]:.1f} tok/s")
+        first_sentences = [m['time_to_first_sentence'] for m in self.ai_metrics if 'time_to_first_sentence' in m]
+        if first_sentences:
+            lines.append(f"Time to first spoken sentence: mean {sum(first_sentences) / len(first_sentences):.2f} s, "
+                         f"last {first_sentences[-1]:.2f} s")
+        budget = self.settings.get('ai_latency_budget', 0)
+        if budget:
+            stopped = sum(1 for m in self.ai_metrics if m.get('budget_stopped'))
+            lines.append(f"Time limit: {budget:g} s, about {self.ai_throughput.max_tokens(budget, ceiling=self.settings.get('ai_max_tokens', 400))} "
+                         f"tokens per answer, {stopped} answers shortened")
+        
+        cache = self.response_cache.stats()
+        lines.append("")
+        lines.append(f"Response cache: {cache['entries']} answers, hit rate {cache['hit_rate']:.0%} "
+                     f"({cache['exact_hits']} exact, {cache['semantic_hits']} similar, {cache['misses']} misses, "
+                     f"{cache['bypassed']} bypassed)")
+        
+        lines.append(f"Documents: {self.documents.size} passages from {len(self.documents.files)} files "
+                     f"({self.doc_indexer.state}, {self.doc_indexer.progress['pending']} files waiting)")
+        
+        speech = self.speech.metrics()
+        lines.append(f"Speech: {speech['spoken']} spoken, {speech['merged']} merged, {speech['interrupted']} interrupted, "
+                     f"{speech['dropped']} dropped" + (f", queue wait mean {speech['wait_mean']:.2f} s, "
+                                                      f"p95 {speech['wait_p95']:.2f} s" if 'wait_mean' in speech else ""))
+        if 'audio_cache' in speech:
+            clips = speech['audio_cache']
+            lines.append(f"Voice clips: {speech['cached']} played from cache, {clips['entries']} clips "
+                         f"({clips['bytes'] / 2 ** 20:.1f} MB), {speech['rendered']} rendered this session")
+        
+        usage = self.chat_session.usage()
+        lines.append("")
+        lines.append(f"Chat context: ~{usage['used_tokens']} of {usage['n_ctx']} tokens, {usage['turns']} recent turns, "
+                     f"{usage['notes']} summarised, {usage['compactions']} compactions")
+        messagebox.showinfo("AI Metrics", "\n".join(lines))
+
     def word_of_the_day(self):
         """Show word of the day"""
         words = [
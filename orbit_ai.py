@@ -0,0 +1,978 @@
+import argparse
+import heapq
+import itertools
+import random
+import re
+import queue
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from contextlib import contextmanager
+
+DEFAULT_MODEL = "orca-mini-3b-gguf2-q4_0.gguf"
+
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+# Request priorities, lower runs first
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# Rough tokens per character for English text, and template tokens around each message
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 8
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+SUMMARY_WORD_RE = re.compile(r"[a-z0-9']{3,}")
+# Words too common to say what a conversation was about
+SUMMARY_STOPWORDS = {
+    'the', 'and', 'for', 'are', 'was', 'were', 'you', 'your', 'what', 'when', 'where', 'which', 'who',
+    'how', 'why', 'this', 'that', 'these', 'those', 'there', 'with', 'from', 'have', 'has', 'had', 'can',
+    'could', 'would', 'should', 'will', 'about', 'into', 'than', 'then', 'them', 'they', 'their', 'its',
+    "it's", 'also', 'just', 'some', 'any', 'more', 'most', 'very', 'much', 'many', 'not', 'but', 'all',
+    'one', 'out', 'does', 'did', 'here', 'tell', 'please', 'let', 'know', 'like', 'get', 'good'
+}
+# The end of the last complete sentence, including closing quotes or brackets
+SENTENCE_END_RE = re.compile(r'[.!?]["\')\]]*(?=\s|$)')
+
+# ai_state -> (status text, colour) for the Tk status labels
+STATE_DISPLAY = {
+    LOADING: ("AI: Loading...", '#f39c12'),
+    READY: ("AI: Online", '#2ecc71'),
+    FAILED: ("AI: Offline", '#e74c3c')
+}
+
+
+FAKE_SENTENCES = [
+    "That is a good question.",
+    "Here is a short answer.",
+    "There are a few things to consider.",
+    "The details depend on your situation.",
+    "Let me know if you want more detail.",
+    "In short, it works as expected."
+]
+
+
+class FakeModel:
+    """Deterministic stand-in for GPT4All with the same generate and chat_session interface
+
+    Replies depend only on the prompt. token_delay and prompt_delay (seconds
+    per prompt character) simulate decoding and prompt evaluation costs.
+    """
+
+    def __init__(self, model_name='fake', device=None, token_delay=0.0, prompt_delay=0.0):
+        self.model_name = model_name
+        self.token_delay = token_delay
+        self.prompt_delay = prompt_delay
+        self.config = {'systemPrompt': "You are ORBIT, a helpful desktop assistant."}
+        self._history = None
+
+    @contextmanager
+    def chat_session(self, system_prompt=None, prompt_template=None):
+        self._history = [{'role': 'system', 'content': system_prompt or self.config['systemPrompt']}]
+        try:
+            yield self
+        finally:
+            self._history = None
+
+    def reply(self, prompt, max_tokens):
+        """The full token list generate would produce for prompt"""
+        seed = zlib.crc32(prompt.encode('utf-8'))
+        words = f"You asked: {prompt.strip()}".split()
+        for i in range(max_tokens):
+            words += FAKE_SENTENCES[(seed + i) % len(FAKE_SENTENCES)].split()
+            if len(words) >= max_tokens:
+                break
+        return [word + ' ' for word in words[:max_tokens]]
+
+    def generate(self, prompt, max_tokens=200, streaming=False, callback=None, **kwargs):
+        # Inside a session only the new prompt is evaluated, like GPT4All's cached context
+        evaluated = len(prompt)
+        if self._history is not None:
+            if len(self._history) == 1:
+                evaluated += len(self._history[0]['content'])
+            self._history.append({'role': 'user', 'content': prompt})
+
+        def tokens():
+            if self.prompt_delay:
+                time.sleep(self.prompt_delay * evaluated)
+            produced = []
+            for i, token in enumerate(self.reply(prompt, max_tokens)):
+                if self.token_delay:
+                    time.sleep(self.token_delay)
+                # Like GPT4All, the token the callback stops on is still part of the reply
+                produced.append(token)
+                yield token
+                if callback is not None and callback(i, token) is False:
+                    break
+            if self._history is not None:
+                self._history.append({'role': 'assistant', 'content': ''.join(produced)})
+
+        if streaming:
+            return tokens()
+        return ''.join(tokens())
+
+
+def _gpt4all_factory(model_name, device, n_threads=None):
+    if model_name == 'fake':
+        return FakeModel(model_name, device)
+    from gpt4all import GPT4All
+    options = {}
+    if device is not None:
+        options['device'] = device
+    if n_threads:
+        options['n_threads'] = n_threads
+    return GPT4All(model_name, **options)
+
+
+class ModelLoader:
+    """Load a GPT4All model on a background thread, warm it up and queue work until it is ready"""
+
+    def __init__(self, model_name=DEFAULT_MODEL, device='cpu', on_state=None, factory=None,
+                 warmup_prompt="Hello", warmup_tokens=8):
+        self.model_name = model_name
+        self.device = device
+        self.on_state = on_state
+        self.factory = factory or _gpt4all_factory
+        self.warmup_prompt = warmup_prompt
+        self.warmup_tokens = warmup_tokens
+        self.model = None
+        self.state = LOADING
+        self.error = None
+        self.timings = {}
+        self.warmup_metrics = None
+        self.pending = []
+        self.lock = threading.Lock()
+        self.loaded = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Begin loading in a daemon thread; later calls do nothing"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._load, name='model-loader', daemon=True)
+                self.thread.start()
+        return self
+
+    def _load(self):
+        self._set_state(LOADING)
+        try:
+            start = time.perf_counter()
+            model = self.factory(self.model_name, self.device)
+            self.timings['load'] = time.perf_counter() - start
+
+            # A tiny generation allocates the context so the first real prompt doesn't pay for it,
+            # and gives a first measurement of this machine's speed
+            if self.warmup_tokens:
+                stream = ResponseStream()
+                stream.feed(model, self.warmup_prompt, max_tokens=self.warmup_tokens)
+                if stream.error:
+                    raise stream.error
+                self.timings['warmup'] = stream.ended - stream.started
+                self.warmup_metrics = stream.metrics()
+        except Exception as e:
+            self.error = e
+            self._finish(None, FAILED)
+        else:
+            self._finish(model, READY)
+
+    def _finish(self, model, state):
+        with self.lock:
+            self.model = model
+            self.state = state
+            pending, self.pending = self.pending, []
+        self.loaded.set()
+        self._set_state(state)
+        # Queued work runs in arrival order, with None if loading failed
+        for func in pending:
+            func(model)
+
+    def _set_state(self, state):
+        if self.on_state:
+            self.on_state(state)
+
+    def submit(self, func):
+        """Call func(model) now if loaded, otherwise once loading finishes
+
+        func receives None when the model failed to load. Returns the
+        state at submission, so callers can tell the user a reply is queued.
+        """
+        with self.lock:
+            state = self.state
+            if state == LOADING:
+                self.pending.append(func)
+        if state != LOADING:
+            func(self.model)
+        return state
+
+    @property
+    def queued(self):
+        with self.lock:
+            return len(self.pending)
+
+    def wait(self, timeout=None):
+        """Block until loading finished; True if the model is ready"""
+        self.loaded.wait(timeout)
+        return self.state == READY
+
+    def report(self):
+        """Describe load and warm-up durations"""
+        if self.state == FAILED:
+            return [f"model failed to load: {self.error}"]
+        if self.state == LOADING:
+            return [f"{self.model_name}: still loading ({self.queued} queued)"]
+        return [f"{self.model_name} {stage}: {seconds * 1000:.0f} ms" for stage, seconds in self.timings.items()]
+
+
+def trim_to_sentence(text):
+    """Cut text after its last complete sentence; text without one is returned unchanged"""
+    ends = list(SENTENCE_END_RE.finditer(text))
+    if not ends:
+        return text
+    return text[:ends[-1].end()]
+
+
+class ThroughputEstimator:
+    """Running estimate of this machine's generation speed, used to size replies to a time budget
+
+    Rates are exponential moving averages over recent responses, so the
+    estimate follows the machine getting busier or a different model.
+    """
+
+    def __init__(self, tokens_per_second=None, first_token_seconds=None, alpha=0.3):
+        self.tokens_per_second = tokens_per_second
+        self.first_token_seconds = first_token_seconds
+        self.alpha = alpha
+
+    def _average(self, current, value):
+        if value is None:
+            return current
+        if current is None:
+            return value
+        return current + self.alpha * (value - current)
+
+    def update(self, metrics, warmup=False):
+        """Fold in a ResponseStream.metrics() dict
+
+        A warm-up prompt is far shorter than real ones, so its time to first
+        token is not counted.
+        """
+        self.tokens_per_second = self._average(self.tokens_per_second, metrics.get('tokens_per_second'))
+        if not warmup:
+            self.first_token_seconds = self._average(self.first_token_seconds, metrics.get('time_to_first_token'))
+
+    def max_tokens(self, seconds, floor=16, ceiling=400):
+        """Tokens that fit in seconds at the current rate, or ceiling while the rate is unknown"""
+        if not self.tokens_per_second:
+            return ceiling
+        decode_seconds = seconds - (self.first_token_seconds or 0.0)
+        return max(floor, min(ceiling, int(decode_seconds * self.tokens_per_second)))
+
+
+class LatencyBudget:
+    """Generation callback that ends a reply on time
+
+    After soft of the budget has passed, generation stops at the next token
+    that ends a sentence. At the deadline it stops wherever it is and
+    expired is set, so the reply should be trimmed with trim_to_sentence.
+    The clock runs from started, which can be the time the request was queued.
+    """
+
+    def __init__(self, seconds, soft=0.8, started=None):
+        self.seconds = seconds
+        self.started = started if started is not None else time.perf_counter()
+        self.soft_deadline = self.started + soft * seconds
+        self.deadline = self.started + seconds
+        self.expired = False
+        self.cut = False
+
+    @property
+    def remaining(self):
+        return self.deadline - time.perf_counter()
+
+    def __call__(self, token_id, response):
+        now = time.perf_counter()
+        if now >= self.deadline:
+            self.expired = True
+            return False
+        if now >= self.soft_deadline and response.rstrip().endswith(('.', '!', '?')):
+            self.cut = True
+            return False
+        return True
+
+
+def reply_options(settings, throughput=None, started=None):
+    """Return (generate options, LatencyBudget or None) for one reply under ORBIT's AI settings
+
+    The GUI and the benchmark both build their requests here, so a
+    benchmark measures what a user gets.
+    """
+    options = {'max_tokens': settings.get('ai_max_tokens', 400), 'temp': settings.get('ai_temperature', 0.7)}
+    budget = None
+    seconds = settings.get('ai_latency_budget', 0)
+    if seconds:
+        budget = LatencyBudget(seconds, started=started)
+        if throughput is not None:
+            options['max_tokens'] = throughput.max_tokens(budget.remaining, ceiling=options['max_tokens'])
+    return options, budget
+
+
+def _stop_callback(cancel, budget):
+    """A generate callback that honours a cancel event and a LatencyBudget, or None if neither is set"""
+    if cancel is None and budget is None:
+        return None
+
+    def callback(token_id, response):
+        if cancel is not None and cancel.is_set():
+            return False
+        return budget is None or budget(token_id, response)
+    return callback
+
+
+class ResponseStream:
+    """Tokens generated on a worker thread, handed to the Tk loop in coalesced batches"""
+
+    def __init__(self):
+        self.tokens = queue.Queue()
+        self.received = []
+        self.error = None
+        self.finished = False
+        self.started = None
+        self.first_token = None
+        self.ended = None
+        self.count = 0
+        self.cancelled = False
+        self.queue_wait = None
+        self.budget = None
+
+    def feed(self, model, prompt, cancel=None, budget=None, **kwargs):
+        """Run a streaming generation, queueing each token as it arrives (worker thread)
+
+        Setting the cancel event stops generation at the next token; a
+        LatencyBudget stops it on time.
+        """
+        self.started = time.perf_counter()
+        self.budget = budget
+        callback = _stop_callback(cancel, budget)
+        if callback is not None:
+            kwargs['callback'] = callback
+        try:
+            for token in model.generate(prompt, streaming=True, **kwargs):
+                if self.first_token is None:
+                    self.first_token = time.perf_counter()
+                self.count += 1
+                self.received.append(token)
+                self.tokens.put(token)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.cancelled = cancel is not None and cancel.is_set()
+            self.ended = time.perf_counter()
+            self.tokens.put(None)
+
+    def drain(self):
+        """Return all text queued since the last call; sets finished once generation ended"""
+        parts = []
+        while True:
+            try:
+                token = self.tokens.get_nowait()
+            except queue.Empty:
+                break
+            if token is None:
+                self.finished = True
+                break
+            parts.append(token)
+        return ''.join(parts)
+
+    def poll(self, root, on_text, on_done, interval=50):
+        """Deliver batches to on_text every interval ms on the Tk thread, then call on_done(self)"""
+        text = self.drain()
+        if text:
+            on_text(text)
+        if self.finished:
+            on_done(self)
+        else:
+            root.after(interval, self.poll, root, on_text, on_done, interval)
+
+    @property
+    def text(self):
+        """Everything generated so far"""
+        return ''.join(self.received)
+
+    @property
+    def final_text(self):
+        """The reply as it should be kept: cut back to a whole sentence if the budget ran out mid-sentence"""
+        if self.budget is not None and self.budget.expired:
+            return trim_to_sentence(self.text)
+        return self.text
+
+    @property
+    def time_to_first_token(self):
+        if self.first_token is None:
+            return None
+        return self.first_token - self.started
+
+    @property
+    def tokens_per_second(self):
+        """Decode rate after the first token, which also pays for prompt evaluation"""
+        if self.first_token is None or self.count < 2:
+            return None
+        return (self.count - 1) / max(self.ended - self.first_token, 1e-9)
+
+    def metrics(self):
+        return {
+            'time_to_first_token': self.time_to_first_token,
+            'tokens': self.count,
+            'tokens_per_second': self.tokens_per_second,
+            'queue_wait': self.queue_wait,
+            'total_seconds': (self.ended - self.started) if self.ended else None,
+            'budget_stopped': self.budget is not None and (self.budget.cut or self.budget.expired)
+        }
+
+
+class InferenceRequest:
+    """One queued call into the model: run(model, request) on the inference thread"""
+
+    _sequence = itertools.count()
+
+    def __init__(self, run, priority=NORMAL, group=None, label=None):
+        self.run = run
+        self.priority = priority
+        self.group = group
+        self.label = label
+        self.order = next(self._sequence)
+        self.cancel_event = threading.Event()
+        self.state = 'queued'
+        self.replaced = []
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+
+    def __lt__(self, other):
+        return (self.priority, self.order) < (other.priority, other.order)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def wait_seconds(self):
+        return (self.started or time.perf_counter()) - self.submitted
+
+
+class InferenceWorker:
+    """The only thread that calls into the model, fed by a bounded priority queue
+
+    A request submitted with a group replaces requests of that group still
+    waiting in the queue. submit raises queue.Full when max_queue requests
+    are already waiting, so callers can push back instead of piling up work.
+    """
+
+    def __init__(self, loader, max_queue=4):
+        self.loader = loader
+        self.max_queue = max_queue
+        self.heap = []
+        self.current = None
+        self.condition = threading.Condition()
+        self.waits = deque(maxlen=200)
+        self.counts = {'submitted': 0, 'completed': 0, 'cancelled': 0, 'superseded': 0, 'rejected': 0,
+                       'failed': 0}
+        self.thread = threading.Thread(target=self._run, name='inference-worker', daemon=True)
+        self.thread.start()
+
+    def submit(self, run, priority=NORMAL, group=None, label=None):
+        """Queue run(model, request); returns the InferenceRequest"""
+        request = InferenceRequest(run, priority, group, label)
+        with self.condition:
+            if group is not None:
+                request.replaced = [r for r in self.heap if r.group == group]
+                for old in request.replaced:
+                    old.state = 'superseded'
+                    old.cancel()
+                self.counts['superseded'] += len(request.replaced)
+                self.heap = [r for r in self.heap if r.group != group]
+                heapq.heapify(self.heap)
+            if len(self.heap) >= self.max_queue:
+                self.counts['rejected'] += 1
+                raise queue.Full(f"{len(self.heap)} AI requests are already waiting")
+            heapq.heappush(self.heap, request)
+            self.counts['submitted'] += 1
+            self.condition.notify()
+        return request
+
+    def cancel_current(self):
+        """Stop the generation in progress; True if there was one"""
+        with self.condition:
+            request = self.current
+        if request is None:
+            return False
+        request.cancel()
+        return True
+
+    def cancel_all(self):
+        """Drop every waiting request and stop the one in progress; returns how many were affected"""
+        with self.condition:
+            dropped, self.heap = self.heap, []
+            for request in dropped:
+                request.state = 'cancelled'
+                request.cancel()
+            self.counts['cancelled'] += len(dropped)
+        return len(dropped) + self.cancel_current()
+
+    def _run(self):
+        # Requests queue up while the model loads; with a failed load each gets run(None, request)
+        self.loader.wait()
+        while True:
+            with self.condition:
+                while not self.heap:
+                    self.condition.wait()
+                request = heapq.heappop(self.heap)
+                request.started = time.perf_counter()
+                request.state = 'running'
+                self.current = request
+                self.waits.append(request.wait_seconds)
+
+            try:
+                request.run(self.loader.model, request)
+            except Exception as e:
+                request.error = e
+                request.state = 'failed'
+                self.counts['failed'] += 1
+            else:
+                request.state = 'cancelled' if request.cancelled else 'completed'
+                self.counts[request.state] += 1
+            finally:
+                request.finished = time.perf_counter()
+                with self.condition:
+                    self.current = None
+
+    @property
+    def depth(self):
+        with self.condition:
+            return len(self.heap)
+
+    def metrics(self):
+        """Queue depth, wait-time statistics and request counts"""
+        with self.condition:
+            waits = sorted(self.waits)
+            metrics = dict(self.counts, depth=len(self.heap), busy=self.current is not None)
+        if waits:
+            metrics.update(
+                wait_mean=sum(waits) / len(waits),
+                wait_p95=waits[min(len(waits) - 1, int(0.95 * len(waits)))],
+                wait_max=waits[-1]
+            )
+        return metrics
+
+
+def estimate_tokens(text):
+    """Approximate the token count of text without needing the model's tokenizer"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def clip_tokens(text, tokens, keep='start'):
+    """Shorten text to about tokens tokens, keeping its start or its end"""
+    limit = max(0, tokens) * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    if keep == 'end':
+        return '...' + text[len(text) - limit + 3:]
+    return text[:max(0, limit - 3)].rstrip() + '...'
+
+
+class ExtractiveSummary:
+    """Rolling summary of older turns made of their most salient sentences, no model call needed
+
+    Sentences score by how often their content words recur across the
+    folded turns, normalised for length and discounted with age, and what
+    the user asked counts extra. The best sentences that fit max_tokens
+    are kept in conversation order; a bounded pool of runners-up stays as
+    candidates, so each update costs the same however long the session.
+    """
+
+    def __init__(self, max_tokens=256, pool_size=64, decay=0.97, sentence_chars=200):
+        self.max_tokens = max_tokens
+        self.pool_size = pool_size
+        self.decay = decay
+        self.sentence_chars = sentence_chars
+        self.word_counts = Counter()
+        self.pool = []
+        self.selected = []
+        self.turn = 0
+
+    def __len__(self):
+        return len(self.selected)
+
+    def clear(self):
+        self.word_counts.clear()
+        self.pool = []
+        self.selected = []
+        self.turn = 0
+
+    def _score(self, item):
+        turn, speaker, sentence, words = item
+        salience = sum(self.word_counts[word] for word in words) / len(words) ** 0.5
+        weight = 1.5 if speaker == 'User' else 1.0
+        return salience * weight * self.decay ** (self.turn - turn)
+
+    def add(self, user, assistant):
+        """Fold one turn into the summary"""
+        self.turn += 1
+        for speaker, text in (('User', user), ('Assistant', assistant)):
+            for sentence in SENTENCE_RE.split(' '.join(text.split())):
+                words = {word for word in SUMMARY_WORD_RE.findall(sentence.lower()) if word not in SUMMARY_STOPWORDS}
+                if not words:
+                    continue
+                if len(sentence) > self.sentence_chars:
+                    sentence = clip_tokens(sentence, self.sentence_chars // CHARS_PER_TOKEN)
+                # A repeated sentence adds weight to its words but not another line
+                self.word_counts.update(words)
+                if any(item[2] == sentence for item in self.pool):
+                    continue
+                self.pool.append((self.turn, speaker, sentence, words))
+
+        ranked = sorted(self.pool, key=self._score, reverse=True)
+        selected, used = [], 0
+        for item in ranked:
+            cost = estimate_tokens(item[2]) + 2
+            if used + cost <= self.max_tokens:
+                selected.append(item)
+                used += cost
+        self.pool = ranked[:self.pool_size]
+        self.selected = sorted(selected, key=lambda item: item[0])
+
+    def text(self, max_tokens=None):
+        """The summary as bullet lines, oldest first, optionally cut to a smaller budget"""
+        lines, used = [], 0
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        for _, speaker, sentence, _ in self.selected:
+            line = f"- {'The user said' if speaker == 'User' else 'You said'}: {sentence}"
+            used += estimate_tokens(line)
+            if used > budget:
+                break
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class ContextBuilder:
+    """Conversation memory for plain generate calls, under a hard prompt-size cap
+
+    The last keep_turns turns go into the prompt verbatim and older ones
+    are folded into an ExtractiveSummary. build() never returns more than
+    about max_prompt_tokens: recent turns are folded, then the summary,
+    extra context and finally the question itself are shortened until
+    the prompt fits, so prompt evaluation per turn stays bounded however
+    long the conversation runs.
+    """
+
+    def __init__(self, keep_turns=4, summary_tokens=256, max_prompt_tokens=1024):
+        self.keep_turns = keep_turns
+        self.max_prompt_tokens = max_prompt_tokens
+        self.summary = ExtractiveSummary(summary_tokens)
+        self.turns = deque()
+        self.lock = threading.Lock()
+        self.last_prompt_tokens = 0
+
+    def add_turn(self, user, assistant):
+        with self.lock:
+            self.turns.append((user, assistant))
+            while len(self.turns) > self.keep_turns:
+                self.summary.add(*self.turns.popleft())
+
+    def clear(self):
+        with self.lock:
+            self.turns.clear()
+            self.summary.clear()
+
+    def build(self, question, context=None):
+        """The prompt for the next turn; just the question when there is nothing to remember"""
+        with self.lock:
+            if not self.turns and not len(self.summary) and not context:
+                self.last_prompt_tokens = estimate_tokens(question)
+                return question
+
+            def render(summary, turns, context, question):
+                parts = []
+                if summary:
+                    parts.append(f"Earlier in this conversation:\n{summary}")
+                if turns:
+                    parts.append("\n".join(f"User: {user}\nAssistant: {assistant}" for user, assistant in turns))
+                if context:
+                    parts.append(context)
+                parts.append(f"User: {question}\nAssistant:")
+                return "\n\n".join(parts)
+
+            cap = self.max_prompt_tokens
+            summary = self.summary.text()
+            prompt = render(summary, self.turns, context, question)
+            # Fold recent turns first; they are the cheapest to lose as the summary keeps their gist
+            while estimate_tokens(prompt) > cap and self.turns:
+                self.summary.add(*self.turns.popleft())
+                summary = self.summary.text()
+                prompt = render(summary, self.turns, context, question)
+            if estimate_tokens(prompt) > cap:
+                summary = self.summary.text(max_tokens=cap // 4)
+                prompt = render(summary, self.turns, context, question)
+            if estimate_tokens(prompt) > cap and context:
+                room = cap - estimate_tokens(render(summary, self.turns, None, question))
+                context = clip_tokens(context, room) if room > 16 else None
+                prompt = render(summary, self.turns, context, question)
+            if estimate_tokens(prompt) > cap:
+                room = cap - estimate_tokens(render(summary, self.turns, context, ''))
+                prompt = render(summary, self.turns, context, clip_tokens(question, max(16, room), keep='end'))
+            self.last_prompt_tokens = estimate_tokens(prompt)
+            return prompt
+
+    def usage(self):
+        return {
+            'turns': len(self.turns),
+            'summarised': len(self.summary),
+            'last_prompt_tokens': self.last_prompt_tokens,
+            'max_prompt_tokens': self.max_prompt_tokens
+        }
+
+
+class ChatSession:
+    """One GPT4All chat session kept open across turns so the shared prefix stays in the KV cache
+
+    GPT4All only re-evaluates the system prompt when a session starts, so
+    turns after the first pay only for their own tokens. When the estimated
+    context use would pass compact_at of the window, older turns are folded
+    into an ExtractiveSummary and the session restarts from that summary
+    plus the most recent turns, instead of starting from nothing. A
+    restarted session's prompt is capped at half the window. A model that
+    compacts its own conversations, such as the model server's client,
+    sets compacts_context and is not compacted here as well. Only the
+    inference thread may use a session.
+    """
+
+    def __init__(self, system_prompt=None, n_ctx=2048, compact_at=0.75, keep_turns=2):
+        self.system_prompt = system_prompt
+        self.n_ctx = n_ctx
+        self.compact_at = compact_at
+        self.keep_turns = keep_turns
+        self.model = None
+        self.context = None
+        self.turns = []
+        self.summary = ExtractiveSummary(max_tokens=n_ctx // 4)
+        self.used_tokens = 0
+        # Tokens the model had to evaluate for the last turn, including a restarted session's prompt
+        self.prompt_tokens = 0
+        self.compactions = 0
+        self.resets = 0
+
+    def _base_prompt(self, model):
+        if self.system_prompt is not None:
+            return self.system_prompt
+        return getattr(model, 'config', {}).get('systemPrompt', '')
+
+    def _session_prompt(self, model):
+        """System prompt for a (re)started session: base prompt, summary and kept turns"""
+        while True:
+            prompt = self._base_prompt(model)
+            if len(self.summary):
+                prompt += "\n\nEarlier in this conversation:\n" + self.summary.text()
+            if self.turns:
+                prompt += "\n\nMost recent exchange:\n" + "\n".join(
+                    f"User: {user}\nAssistant: {assistant}" for user, assistant in self.turns)
+            if not self.turns or estimate_tokens(prompt) <= self.n_ctx // 2:
+                return prompt
+            self.summary.add(*self.turns.pop(0))
+
+    def _open(self, model):
+        self.close()
+        system_prompt = self._session_prompt(model)
+        self.context = model.chat_session(system_prompt)
+        self.context.__enter__()
+        self.model = model
+        # The model's real window if it exposes one
+        self.n_ctx = getattr(getattr(model, 'model', None), 'n_ctx', self.n_ctx)
+        self.summary.max_tokens = self.n_ctx // 4
+        self.used_tokens = estimate_tokens(system_prompt) + MESSAGE_OVERHEAD
+        self.prompt_tokens += self.used_tokens
+        self.resets += 1
+
+    def close(self):
+        """Leave the GPT4All session, releasing its history"""
+        if self.context is not None:
+            self.context.__exit__(None, None, None)
+            self.context = None
+
+    def clear(self):
+        """Forget the conversation; the next turn starts a fresh session"""
+        self.close()
+        self.turns = []
+        self.summary.clear()
+        self.used_tokens = 0
+
+    def compact(self, model):
+        """Fold all but the last keep_turns turns into the summary and restart the session"""
+        keep = self.turns[-self.keep_turns:] if self.keep_turns else []
+        for user, assistant in self.turns[:len(self.turns) - len(keep)]:
+            self.summary.add(user, assistant)
+        self.turns = keep
+        self.compactions += 1
+        self._open(model)
+
+    def respond(self, model, prompt, stream=None, cancel=None, budget=None, context=None, max_tokens=200, **kwargs):
+        """Generate a reply within the session and return its text
+
+        With a ResponseStream the tokens are fed through it as they arrive.
+        A reply stopped by an expired LatencyBudget is cut back to its last
+        whole sentence. context, such as retrieved document excerpts, is
+        sent ahead of the prompt for this turn only and is not kept in the
+        turn history used for compaction.
+        """
+        self.prompt_tokens = 0
+        if self.context is None or self.model is not model:
+            self._open(model)
+        question = prompt
+        if context:
+            prompt = f"{clip_tokens(context, self.n_ctx // 4)}\n\nQuestion: {prompt}"
+        needed = estimate_tokens(prompt) + MESSAGE_OVERHEAD + max_tokens
+        if (self.turns and not getattr(model, 'compacts_context', False)
+                and self.used_tokens + needed > self.n_ctx * self.compact_at):
+            self.compact(model)
+
+        if stream is not None:
+            stream.feed(model, prompt, cancel=cancel, budget=budget, max_tokens=max_tokens, **kwargs)
+            if stream.error:
+                raise stream.error
+            response, generated = stream.final_text, stream.count
+        else:
+            counted = []
+            stop = _stop_callback(cancel, budget)
+
+            def callback(token_id, text):
+                counted.append(token_id)
+                return stop is None or stop(token_id, text)
+
+            response = model.generate(prompt, max_tokens=max_tokens, callback=callback, **kwargs)
+            generated = len(counted)
+            if budget is not None and budget.expired:
+                response = trim_to_sentence(response)
+
+        self.turns.append((question, response))
+        self.prompt_tokens += estimate_tokens(prompt) + MESSAGE_OVERHEAD
+        self.used_tokens += estimate_tokens(prompt) + generated + 2 * MESSAGE_OVERHEAD
+        return response
+
+    def usage(self):
+        return {
+            'used_tokens': self.used_tokens,
+            'n_ctx': self.n_ctx,
+            'turns': len(self.turns),
+            'notes': len(self.summary),
+            'prompt_tokens': self.prompt_tokens,
+            'compactions': self.compactions,
+            'sessions': self.resets
+        }
+
+
+def benchmark_sessions(model, prompts, max_tokens=32):
+    """Time to first token per turn: a new chat_session per prompt against one ChatSession"""
+    fresh = []
+    for prompt in prompts:
+        with model.chat_session():
+            stream = ResponseStream()
+            stream.feed(model, prompt, max_tokens=max_tokens)
+            fresh.append(stream.time_to_first_token or 0.0)
+
+    session = ChatSession(n_ctx=getattr(getattr(model, 'model', None), 'n_ctx', 2048))
+    kept = []
+    for prompt in prompts:
+        stream = ResponseStream()
+        session.respond(model, prompt, stream=stream, max_tokens=max_tokens)
+        kept.append(stream.time_to_first_token or 0.0)
+    session.close()
+    return fresh, kept, session.usage()
+
+
+SYNTHETIC_TOPICS = ['gardening', 'python decorators', 'the french revolution', 'marathon training', 'sourdough bread',
+                    'black holes', 'tax returns', 'guitar chords', 'electric cars', 'the roman empire']
+
+SYNTHETIC_TEMPLATES = [
+    "Tell me about {0}.",
+    "How does {0} compare with {1}?",
+    "What is the most common mistake people make with {0}?",
+    "Can you give me a longer explanation of {0}, with an example I could try this week, and explain why it matters for {1}?",
+    "Summarise what we said about {0}."
+]
+
+
+def measure_context_growth(turns=200, max_tokens=120, n_ctx=2048, seed=0):
+    """Prompt tokens per turn over a synthetic conversation, for three ways of carrying history
+
+    Returns rows of (turn, whole transcript resent, ContextBuilder prompt,
+    tokens a kept ChatSession evaluates). The replies come from FakeModel,
+    so the numbers are the same on every machine.
+    """
+    rng = random.Random(seed)
+    model = FakeModel()
+    builder = ContextBuilder()
+    session = ChatSession(n_ctx=n_ctx)
+    transcript = 0
+    rows = []
+    for turn in range(1, turns + 1):
+        prompt = rng.choice(SYNTHETIC_TEMPLATES).format(*rng.sample(SYNTHETIC_TOPICS, 2))
+        builder_prompt = builder.build(prompt)
+        reply = model.generate(builder_prompt, max_tokens=max_tokens)
+        builder.add_turn(prompt, reply)
+        session.respond(model, prompt, max_tokens=max_tokens)
+        transcript += estimate_tokens(prompt) + MESSAGE_OVERHEAD
+        rows.append((turn, transcript, builder.last_prompt_tokens, session.prompt_tokens))
+        transcript += estimate_tokens(reply) + MESSAGE_OVERHEAD
+    session.close()
+    return rows
+
+
+BENCHMARK_PROMPTS = [
+    "What is the capital of France?",
+    "How many people live there?",
+    "Name one famous museum in that city.",
+    "What is it best known for?",
+    "Suggest a good time of year to visit.",
+    "Summarise our conversation in one sentence."
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-turn prompt evaluation with and without a persistent chat session")
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--turns', type=int, default=len(BENCHMARK_PROMPTS))
+    parser.add_argument('--max-tokens', type=int, default=32)
+    parser.add_argument('--context-growth', type=int, metavar='TURNS',
+                        help="Instead, report prompt tokens per turn over a synthetic session of TURNS turns")
+    args = parser.parse_args()
+
+    if args.context_growth:
+        rows = measure_context_growth(args.context_growth)
+        print(f"{'turn':>5} {'whole transcript':>17} {'context builder':>16} {'kept session':>13}")
+        for turn, transcript, built, session in rows:
+            if turn == 1 or turn % 20 == 0:
+                print(f"{turn:>5} {transcript:>17} {built:>16} {session:>13}")
+        print(f"{'max':>5} {max(r[1] for r in rows):>17} {max(r[2] for r in rows):>16} {max(r[3] for r in rows):>13}")
+        print(f"{'mean':>5} {sum(r[1] for r in rows) / len(rows):>17.0f} {sum(r[2] for r in rows) / len(rows):>16.0f} "
+              f"{sum(r[3] for r in rows) / len(rows):>13.0f}")
+        raise SystemExit
+
+    loader = ModelLoader(args.model, args.device).start()
+    if not loader.wait():
+        raise SystemExit(f"Could not load {args.model}: {loader.error}")
+    prompts = [BENCHMARK_PROMPTS[i % len(BENCHMARK_PROMPTS)] for i in range(args.turns)]
+    fresh, kept, usage = benchmark_sessions(loader.model, prompts, args.max_tokens)
+
+    print(f"{'turn':>4} {'new session (s)':>16} {'kept session (s)':>17}")
+    for turn, (a, b) in enumerate(zip(fresh, kept), 1):
+        print(f"{turn:>4} {a:>16.3f} {b:>17.3f}")
+    later = slice(1, None)
+    print(f"mean after first turn: {sum(fresh[later]) / max(1, len(fresh) - 1):.3f} s vs "
+          f"{sum(kept[later]) / max(1, len(kept) - 1):.3f} s")
+    print(f"context use: {usage['used_tokens']}/{usage['n_ctx']} tokens, {usage['compactions']} compactions")
@@ -0,0 +1,279 @@
+import argparse
+import json
+import threading
+import time
+from collections import deque
+
+DEFAULT_VOSK_MODEL = 'vosk-model-small-en-us-0.15'
+
+
+class NotUnderstood(Exception):
+    """Speech was heard but no words were recognized"""
+
+
+class ServiceUnavailable(Exception):
+    """The recognition service could not be reached"""
+
+
+class Transcript:
+    """Recognized text of one segment, and how long after the listener closed the segment it was ready"""
+
+    def __init__(self, text, engine, latency):
+        self.text = text
+        self.engine = engine
+        self.latency = latency
+
+    def __str__(self):
+        return self.text
+
+
+class SpeechRecognizer:
+    """Turns Listener segments into text
+
+    Engines implement transcribe() for a whole segment and, if they can
+    decode incrementally, stream() for feeding a segment while it is
+    being spoken. recognize() uses the streamed result when the Listener
+    already has one, so a streaming engine answers almost as soon as
+    speech ends.
+    """
+
+    name = 'base'
+
+    def __init__(self):
+        self.latencies = deque(maxlen=100)
+
+    def load(self):
+        """Load whatever the engine keeps resident; safe to call repeatedly"""
+        return self
+
+    def stream(self, rate):
+        """A stream with feed(samples) -> partial text or None, and finish() -> text; None if unsupported"""
+        return None
+
+    def transcribe(self, samples, rate):
+        raise NotImplementedError
+
+    def recognize(self, segment):
+        """Transcript of a segment; raises NotUnderstood or ServiceUnavailable"""
+        if segment.result is None:
+            text = self.transcribe(segment.samples, segment.rate)
+            ready = time.perf_counter()
+        elif isinstance(segment.result, Exception):
+            raise segment.result
+        else:
+            text, ready = segment.result, segment.result_time
+        if not text.strip():
+            raise NotUnderstood()
+        latency = ready - segment.captured
+        self.latencies.append(latency)
+        return Transcript(text, self.name, latency)
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {'engine': self.name, 'utterances': 0}
+        return {'engine': self.name, 'utterances': len(latencies),
+                'latency_mean': sum(latencies) / len(latencies),
+                'latency_p95': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]}
+
+
+class GoogleRecognizer(SpeechRecognizer):
+    """Google's web speech API through speech_recognition; needs a network connection"""
+
+    name = 'google'
+
+    def __init__(self, language='en-US'):
+        super().__init__()
+        self.language = language
+        self.recognizer = None
+
+    def load(self):
+        if self.recognizer is None:
+            import speech_recognition as sr
+            self.recognizer = sr.Recognizer()
+        return self
+
+    def transcribe(self, samples, rate):
+        import speech_recognition as sr
+        audio = sr.AudioData(samples.tobytes(), rate, 2)
+        try:
+            return self.load().recognizer.recognize_google(audio, language=self.language)
+        except sr.UnknownValueError:
+            raise NotUnderstood()
+        except sr.RequestError as e:
+            raise ServiceUnavailable(str(e))
+
+
+class VoskStream:
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        # Vosk finalizes at its own pauses; the segment's text is every piece joined
+        self.pieces = []
+        self.partial = ''
+
+    def feed(self, samples):
+        if self.recognizer.AcceptWaveform(samples.tobytes()):
+            self.pieces.append(json.loads(self.recognizer.Result())['text'])
+            partial = ' '.join(self.pieces)
+        else:
+            partial = ' '.join(self.pieces + [json.loads(self.recognizer.PartialResult())['partial']])
+        partial = partial.strip()
+        if partial == self.partial:
+            return None
+        self.partial = partial
+        return partial
+
+    def finish(self):
+        self.pieces.append(json.loads(self.recognizer.FinalResult())['text'])
+        return ' '.join(piece for piece in self.pieces if piece)
+
+
+class VoskRecognizer(SpeechRecognizer):
+    """Offline recognition with a local Vosk model, loaded once and kept in memory
+
+    Download a model from https://alphacephei.com/vosk/models and point
+    model_path at its directory.
+    """
+
+    name = 'vosk'
+
+    def __init__(self, model_path=DEFAULT_VOSK_MODEL):
+        super().__init__()
+        self.model_path = model_path
+        self.model = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.model is None:
+                from vosk import Model, SetLogLevel
+                SetLogLevel(-1)
+                self.model = Model(self.model_path)
+        return self
+
+    def _recognizer(self, rate):
+        from vosk import KaldiRecognizer
+        return KaldiRecognizer(self.load().model, rate)
+
+    def stream(self, rate):
+        return VoskStream(self._recognizer(rate))
+
+    def transcribe(self, samples, rate):
+        stream = VoskStream(self._recognizer(rate))
+        stream.feed(samples)
+        return stream.finish()
+
+
+class FakeStream:
+    def __init__(self, text, rate, words_per_second):
+        self.words = text.split()
+        self.rate = rate
+        self.words_per_second = words_per_second
+        self.text = text
+        self.samples = 0
+        self.partial = ''
+
+    def feed(self, samples):
+        self.samples += len(samples)
+        heard = int(self.samples / self.rate * self.words_per_second)
+        partial = ' '.join(self.words[:heard])
+        if partial == self.partial:
+            return None
+        self.partial = partial
+        return partial
+
+    def finish(self):
+        return self.text
+
+
+class FakeRecognizer(SpeechRecognizer):
+    """Deterministic recognizer for tests: the n-th segment is the n-th line of a transcript file
+
+    Lines starting with # are skipped and a line holding only ? is speech
+    that wasn't understood. Partial results reveal words_per_second words
+    per second of audio fed. latency adds a delay to whole-segment
+    transcription, to stand in for a network round trip.
+    """
+
+    name = 'fake'
+
+    def __init__(self, path=None, lines=None, streaming=True, words_per_second=3.0, latency=0.0):
+        super().__init__()
+        if lines is None:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        self.lines = deque('' if line == '?' else line for line in lines)
+        self.streaming = streaming
+        self.words_per_second = words_per_second
+        self.latency = latency
+        self.lock = threading.Lock()
+
+    def _next_line(self):
+        with self.lock:
+            return self.lines.popleft() if self.lines else ''
+
+    def stream(self, rate):
+        if not self.streaming:
+            return None
+        return FakeStream(self._next_line(), rate, self.words_per_second)
+
+    def transcribe(self, samples, rate):
+        time.sleep(self.latency)
+        return self._next_line()
+
+
+ENGINES = {'google': GoogleRecognizer, 'vosk': VoskRecognizer, 'fake': FakeRecognizer}
+
+
+def make_recognizer(engine='google', **options):
+    """A recognizer by engine name ('google', 'vosk' or 'fake'), given that engine's options"""
+    try:
+        return ENGINES[engine](**options)
+    except KeyError:
+        raise ValueError(f"unknown speech engine {engine!r}, expected one of {', '.join(ENGINES)}")
+
+
+if __name__ == "__main__":
+    from orbit_listen import Listener, WavFileSource, synthesize_test_wav
+
+    parser = argparse.ArgumentParser(description="Recognize the speech in a WAV file as ORBIT would from the microphone")
+    parser.add_argument('wav', nargs='?', help="16-bit WAV file (default: a synthetic test recording)")
+    parser.add_argument('--engine', default='fake', choices=sorted(ENGINES))
+    parser.add_argument('--model', default=DEFAULT_VOSK_MODEL, help="Vosk model directory")
+    parser.add_argument('--transcripts', help="Transcript file for the fake engine")
+    parser.add_argument('--no-stream', action='store_true', help="Recognize whole segments only")
+    parser.add_argument('--latency', type=float, default=0.5, help="Simulated round trip of the fake engine")
+    args = parser.parse_args()
+
+    if args.engine == 'vosk':
+        recognizer = VoskRecognizer(args.model)
+    elif args.engine == 'fake':
+        lines = None if args.transcripts else ["set a reminder for ten minutes", "?", "what is the weather like today"]
+        recognizer = FakeRecognizer(args.transcripts, lines, streaming=not args.no_stream, latency=args.latency)
+    else:
+        recognizer = GoogleRecognizer()
+    start = time.perf_counter()
+    recognizer.load()
+    print(f"{recognizer.name} loaded in {time.perf_counter() - start:.2f} s")
+
+    path = args.wav
+    if path is None:
+        import os
+        import tempfile
+        path = synthesize_test_wav(os.path.join(tempfile.mkdtemp(), 'orbit_asr_test.wav'))
+    listener = Listener(WavFileSource(path), recognizer=None if args.no_stream else recognizer,
+                        on_partial=lambda text: print(f"  ... {text}")).start()
+    while True:
+        segment = listener.listen(timeout=1)
+        if segment is None:
+            if listener.finished.is_set():
+                break
+            continue
+        try:
+            transcript = recognizer.recognize(segment)
+            print(f"{segment.started:6.2f} s  {transcript.text!r} (ready {transcript.latency:.2f} s after speech ended)")
+        except NotUnderstood:
+            print(f"{segment.started:6.2f} s  (not understood)")
+        except ServiceUnavailable as e:
+            print(f"{segment.started:6.2f} s  service unavailable: {e}")
+    print(recognizer.metrics())
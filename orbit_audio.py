@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import wave
+from collections import OrderedDict
+
+AUDIO_FORMAT_VERSION = 1
+
+# Sentences ORBIT speaks over and over, as they come out of split_sentences. Capture
+# groups are the variable parts; the fixed text around them is cached as separate
+# segments and the clip is stitched together from both.
+CACHED_PHRASES = [re.compile(pattern) for pattern in (
+    r"Good (?:morning|afternoon|evening)! I'm your desktop assistant ORBIT\.",
+    r"Good (?:Morning|Afternoon|Evening)! I am ORBIT\.",
+    r"How can I help you today\?",
+    r"Good to see you again\.",
+    r"Goodbye!",
+    r"Have a good (?:day|night)!",
+    r"Hello! How can I help you\?",
+    r"Reminder set for (\d{1,4}) minute\(s\)",
+    r"Opening web browser\.\.\.",
+    r"Opened web browser",
+    r"Sorry, I didn't catch that",
+    r"Could not understand audio\.",
+    r"Please try again\.",
+    r"Time to take a short break and drink some water!",
+    r"Searching Wikipedia\.\.\.",
+    r"Thinking\.\.\.",
+)]
+
+# Rendered ahead of time so even their first use plays from the cache
+COMMON_PHRASES = [
+    "Good morning! I'm your desktop assistant ORBIT.",
+    "Good afternoon! I'm your desktop assistant ORBIT.",
+    "Good evening! I'm your desktop assistant ORBIT.",
+    "How can I help you today?",
+    "Reminder set for",
+    "minute(s)",
+    "Sorry, I didn't catch that",
+    "Time to take a short break and drink some water!",
+]
+
+
+def phrase_segments(text):
+    """The cacheable segments of a recurring phrase, or None for any other text
+
+    "Reminder set for 5 minute(s)" gives ["Reminder set for", "5",
+    "minute(s)"]; a phrase without variable parts is a single segment.
+    """
+    for pattern in CACHED_PHRASES:
+        match = pattern.fullmatch(text)
+        if match is None:
+            continue
+        segments, position = [], 0
+        for group in range(1, (pattern.groups or 0) + 1):
+            start, end = match.span(group)
+            segments += [text[position:start].strip(), match.group(group)]
+            position = end
+        segments.append(text[position:].strip())
+        return [segment for segment in segments if segment]
+    return None
+
+
+def wav_duration(path):
+    with wave.open(path, 'rb') as f:
+        return f.getnframes() / f.getframerate()
+
+
+def stitch_wavs(paths, out_path, gap=0.06):
+    """Join WAV clips rendered with the same voice into one file, with gap seconds of silence between
+
+    Raises ValueError if the clips' formats differ.
+    """
+    with wave.open(paths[0], 'rb') as f:
+        params = f.getparams()
+    silence = b'\0' * (int(params.framerate * gap) * params.nchannels * params.sampwidth)
+    with wave.open(out_path, 'wb') as out:
+        out.setnchannels(params.nchannels)
+        out.setsampwidth(params.sampwidth)
+        out.setframerate(params.framerate)
+        for index, path in enumerate(paths):
+            with wave.open(path, 'rb') as f:
+                if (f.getnchannels(), f.getsampwidth(), f.getframerate()) != \
+                        (params.nchannels, params.sampwidth, params.framerate):
+                    raise ValueError(f"{path} does not match the format of {paths[0]}")
+                if index:
+                    out.writeframes(silence)
+                out.writeframes(f.readframes(f.getnframes()))
+    return out_path
+
+
+class AudioCache:
+    """Rendered WAV clips on disk keyed by text, voice and rate, evicted least recently used beyond max_bytes
+
+    The index of clips is kept as JSON next to them. Clips are added by
+    moving a finished render into the directory, so a crash mid-render
+    never leaves a truncated clip behind.
+    """
+
+    def __init__(self, directory='audio_cache', max_bytes=16 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.stats_counts = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+        self.lock = threading.RLock()
+        self._renders = 0
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, 'index.json')
+
+    @staticmethod
+    def key(text, voice, rate):
+        return hashlib.sha1(f"{voice}\0{rate}\0{text}".encode('utf-8')).hexdigest()[:24]
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def has(self, text, voice, rate):
+        with self.lock:
+            return self.key(text, voice, rate) in self.entries
+
+    def get(self, text, voice, rate):
+        """Path of the cached clip, or None"""
+        key = self.key(text, voice, rate)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and not os.path.exists(self.path(key)):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.stats_counts['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats_counts['hits'] += 1
+            return self.path(key)
+
+    def render_path(self):
+        """A fresh temporary file to render into before put()"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock:
+            self._renders += 1
+            return os.path.join(self.directory, f"render-{os.getpid()}-{self._renders}.tmp.wav")
+
+    def put(self, text, voice, rate, source):
+        """Move a rendered WAV into the cache; returns its path
+
+        Raises wave.Error if source is not a readable WAV, as some
+        text-to-speech drivers write other formats.
+        """
+        wav_duration(source)
+        key = self.key(text, voice, rate)
+        size = os.path.getsize(source)
+        with self.lock:
+            os.replace(source, self.path(key))
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)['bytes']
+            self.entries[key] = {'text': text, 'voice': voice, 'rate': rate, 'bytes': size}
+            self.total_bytes += size
+            self.stats_counts['stored'] += 1
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                self._remove(next(iter(self.entries)))
+                self.stats_counts['evicted'] += 1
+            self.save()
+        return self.path(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry['bytes']
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.entries):
+                self._remove(key)
+            self.save()
+
+    def load(self):
+        """Read the index, forgetting clips whose files are gone and deleting leftover renders"""
+        with self.lock:
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return self
+            if data.get('version') != AUDIO_FORMAT_VERSION:
+                return self
+            for key, entry in data.get('entries', []):
+                if os.path.exists(self.path(key)):
+                    self.entries[key] = entry
+                    self.total_bytes += entry['bytes']
+            for name in os.listdir(self.directory):
+                if name.endswith('.tmp.wav'):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+        return self
+
+    def save(self):
+        """Write the index atomically, in least to most recently used order"""
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            temp = self.index_path + '.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump({'version': AUDIO_FORMAT_VERSION, 'entries': list(self.entries.items())}, f)
+            os.replace(temp, self.index_path)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.stats_counts['hits'] + self.stats_counts['misses']
+            return dict(self.stats_counts, entries=len(self.entries), bytes=self.total_bytes,
+                        hit_rate=self.stats_counts['hits'] / lookups if lookups else 0.0)
+
+
+class WavPlayer:
+    """Plays a WAV file and stops early when an event is set
+
+    Uses winsound on Windows and the first of aplay, paplay or afplay found
+    elsewhere. available is False when there is no way to play audio.
+    """
+
+    COMMANDS = (('aplay', '-q'), ('paplay',), ('afplay',))
+
+    def __init__(self):
+        self.winsound = None
+        self.command = None
+        try:
+            import winsound
+            self.winsound = winsound
+        except ImportError:
+            for command in self.COMMANDS:
+                if shutil.which(command[0]):
+                    self.command = list(command)
+                    break
+
+    @property
+    def available(self):
+        return self.winsound is not None or self.command is not None
+
+    def play(self, path, stop):
+        """Block until the clip has played or stop is set; True if it played to the end"""
+        if self.winsound is not None:
+            flags = self.winsound.SND_FILENAME | self.winsound.SND_ASYNC | self.winsound.SND_NODEFAULT
+            self.winsound.PlaySound(path, flags)
+            if stop.wait(wav_duration(path)):
+                self.winsound.PlaySound(None, 0)
+                return False
+            return True
+        process = subprocess.Popen(self.command + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        while process.poll() is None:
+            if stop.wait(0.02):
+                process.terminate()
+                process.wait()
+                return False
+        return process.returncode == 0
+
+
+class FakePlayer:
+    """Stand-in for WavPlayer that sleeps for each clip's length, recording (path, seconds, completed)"""
+
+    available = True
+
+    def __init__(self):
+        self.played = []
+
+    def play(self, path, stop):
+        seconds = wav_duration(path)
+        completed = not stop.wait(seconds)
+        self.played.append((path, seconds, completed))
+        return completed
@@ -0,0 +1,199 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import time
+
+from orbit_ai import (ChatSession, DEFAULT_MODEL, FakeModel, ModelLoader, ResponseStream, ThroughputEstimator,
+                      _gpt4all_factory, reply_options)
+
+RESULT_FIELDS = ['id', 'prompt', 'latency', 'time_to_first_token', 'tokens', 'tokens_per_second',
+                 'budget_stopped', 'error', 'response']
+
+
+def load_prompts(path):
+    """Read {"prompt": ...} lines from a JSONL file
+
+    A line with "new_conversation": true starts a new chat session before
+    its prompt, as the "new conversation" command does in the GUI.
+    """
+    prompts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            row.setdefault('id', str(number))
+            prompts.append(row)
+    return prompts
+
+
+def load_settings(path):
+    """The GUI's settings file, or no overrides if it is missing"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def percentile(values, q):
+    """Linearly interpolated q-th percentile (0-100) of a non-empty list"""
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where it can't be read"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 2 ** 20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if platform.system() == 'Darwin' else peak / 2 ** 10
+
+
+def run_prompts(model, prompts, settings, throughput=None, fresh=False):
+    """Answer each prompt the way generate_ai_response does; returns one result dict per prompt
+
+    Prompts go through one ChatSession, with the settings' max_tokens,
+    temperature and latency budget, sized by throughput as it learns the
+    machine's speed. The response cache is not consulted, so every prompt
+    reaches the model.
+    """
+    session = ChatSession(n_ctx=settings.get('ai_context_tokens', 2048))
+    results = []
+    for row in prompts:
+        if fresh or row.get('new_conversation'):
+            session.clear()
+        options, budget = reply_options(settings, throughput)
+        stream = ResponseStream()
+        start = time.perf_counter()
+        error = None
+        try:
+            response = session.respond(model, row['prompt'], stream=stream, budget=budget, **options)
+        except Exception as e:
+            response, error = '', str(e)
+        metrics = stream.metrics()
+        if throughput is not None and metrics['tokens'] > 1:
+            throughput.update(metrics)
+        results.append({
+            'id': row['id'],
+            'prompt': row['prompt'],
+            'latency': time.perf_counter() - start,
+            'time_to_first_token': metrics['time_to_first_token'],
+            'tokens': metrics['tokens'],
+            'tokens_per_second': metrics['tokens_per_second'],
+            'budget_stopped': metrics['budget_stopped'],
+            'error': error,
+            'response': response
+        })
+    session.close()
+    return results
+
+
+def summarize(results, wall_seconds, cpu_seconds):
+    """Latency percentiles, throughput and resource use over a run"""
+    ok = [r for r in results if r['error'] is None]
+    summary = {
+        'prompts': len(results),
+        'errors': len(results) - len(ok),
+        'wall_seconds': wall_seconds,
+        # 100% is one core fully busy
+        'cpu_percent': 100 * cpu_seconds / max(wall_seconds, 1e-9),
+        'cpu_count': os.cpu_count(),
+        'peak_rss_mb': peak_rss_mb()
+    }
+    for key in ('latency', 'time_to_first_token'):
+        values = [r[key] for r in ok if r[key] is not None]
+        if values:
+            summary[f'{key}_p50'] = percentile(values, 50)
+            summary[f'{key}_p95'] = percentile(values, 95)
+    tokens = sum(r['tokens'] for r in ok)
+    rates = [r['tokens_per_second'] for r in ok if r['tokens_per_second']]
+    summary['tokens'] = tokens
+    summary['tokens_per_second_mean'] = sum(rates) / len(rates) if rates else None
+    summary['budget_stopped'] = sum(1 for r in ok if r['budget_stopped'])
+    return summary
+
+
+def write_csv(path, results):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run prompts from a JSONL file through ORBIT's AI path without the GUI")
+    parser.add_argument('prompts', nargs='?', default='bench_prompts.jsonl')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="GPT4All model file, or 'fake' for a deterministic run")
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--threads', type=int, default=None, help="CPU threads for GPT4All (default: its own choice)")
+    parser.add_argument('--settings', default='orbit_settings.json',
+                        help="Settings file supplying max tokens, temperature, latency budget and context size")
+    parser.add_argument('--max-tokens', type=int, help="Override ai_max_tokens")
+    parser.add_argument('--budget', type=float, help="Override ai_latency_budget in seconds")
+    parser.add_argument('--fresh', action='store_true', help="Start a new conversation for every prompt")
+    parser.add_argument('--repeat', type=int, default=1, help="Run the prompt file this many times")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="Seconds per token for the fake model")
+    parser.add_argument('--json', help="Write the summary and per-prompt results as JSON")
+    parser.add_argument('--csv', help="Write per-prompt results as CSV")
+    args = parser.parse_args()
+
+    settings = load_settings(args.settings)
+    if args.max_tokens is not None:
+        settings['ai_max_tokens'] = args.max_tokens
+    if args.budget is not None:
+        settings['ai_latency_budget'] = args.budget
+
+    if args.model == 'fake':
+        def factory(model_name, device):
+            return FakeModel(model_name, device, token_delay=args.token_delay)
+    else:
+        def factory(model_name, device):
+            return _gpt4all_factory(model_name, device, n_threads=args.threads)
+
+    loader = ModelLoader(args.model, args.device, factory=factory).start()
+    if not loader.wait():
+        raise SystemExit(f"Could not load {args.model}: {loader.error}")
+    for line in loader.report():
+        print(line)
+    throughput = ThroughputEstimator(settings.get('ai_tokens_per_second'), settings.get('ai_first_token_seconds'))
+    if loader.warmup_metrics:
+        throughput.update(loader.warmup_metrics, warmup=True)
+
+    prompts = load_prompts(args.prompts) * args.repeat
+    wall, cpu = time.perf_counter(), time.process_time()
+    results = run_prompts(loader.model, prompts, settings, throughput, fresh=args.fresh)
+    summary = summarize(results, time.perf_counter() - wall, time.process_time() - cpu)
+
+    for result in results:
+        ttft = result['time_to_first_token']
+        print(f"{result['id']:>6} {result['latency']:7.2f} s  first token "
+              + (f"{ttft:5.2f} s" if ttft is not None else "    -  ")
+              + f"  {result['tokens']:4d} tokens" + (f"  error: {result['error']}" if result['error'] else ""))
+    print()
+    for key, value in summary.items():
+        print(f"  {key:<26} {value:.3f}" if isinstance(value, float) else f"  {key:<26} {value}")
+
+    config = {'model': args.model, 'device': args.device, 'threads': args.threads, 'prompts': args.prompts,
+              'fresh': args.fresh, 'repeat': args.repeat, 'machine': platform.platform(),
+              'load': loader.timings,
+              'settings': {key: settings.get(key) for key in ('ai_max_tokens', 'ai_temperature',
+                                                              'ai_latency_budget', 'ai_context_tokens')}}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': config, 'summary': summary, 'results': results}, f, indent=2)
+    if args.csv:
+        write_csv(args.csv, results)
@@ -0,0 +1,251 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from orbit_kb import KnowledgeBaseIndex
+
+# "ask ai fresh ..." or "fresh: ..." skips the cache for one query
+FRESH_RE = re.compile(r'^\s*(?:ask\s+ai\s+)?fresh\b[\s:,]*', re.IGNORECASE)
+
+CONTRACTIONS = {"what's": "what is", "who's": "who is", "where's": "where is", "how's": "how is",
+                "it's": "it is", "that's": "that is", "what're": "what are"}
+
+# Words that carry no meaning for matching near-duplicate questions
+FILLER_WORDS = {
+    'what', 'is', 'are', 'was', 'the', 'a', 'an', 'explain', 'describe', 'define', 'tell', 'me',
+    'about', 'please', 'can', 'could', 'you', 'i', 'do', 'does', 'meaning', 'of'
+}
+
+# Follow-ups like "how many people live there" depend on the conversation, so they are never cached
+CONTEXT_WORDS = {'it', 'its', 'that', 'this', 'these', 'those', 'there', 'they', 'them', 'their',
+                 'he', 'him', 'his', 'she', 'her', 'more', 'else', 'again', 'above', 'previous'}
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def strip_fresh(prompt):
+    """Return (prompt without the bypass prefix, whether the cache should be bypassed)"""
+    match = FRESH_RE.match(prompt)
+    if match:
+        return prompt[match.end():], True
+    return prompt, False
+
+
+def normalize_prompt(prompt):
+    """Lowercase, expand common contractions and drop punctuation"""
+    words = WORD_RE.findall(prompt.lower().replace('’', "'"))
+    words = [CONTRACTIONS.get(word, word) for word in words]
+    return ' '.join(' '.join(words).replace("'", ' ').split())
+
+
+def semantic_key(normalized):
+    """The content words of a normalized prompt, used by the similarity tier"""
+    return ' '.join(word for word in normalized.split() if word not in FILLER_WORDS)
+
+
+def same_word_order(words, other):
+    """Whether the words two prompts share come in the same order in both
+
+    TF-IDF sees a bag of words, so "convert celsius to fahrenheit" and
+    "convert fahrenheit to celsius" would otherwise score as the same question.
+    """
+    shared = set(words) & set(other)
+    return [word for word in words if word in shared] == [word for word in other if word in shared]
+
+
+def is_cacheable(normalized):
+    """Whether a prompt can be answered without knowing the conversation so far"""
+    words = normalized.split()
+    return bool(words) and not any(word in CONTEXT_WORDS for word in words)
+
+
+class ResponseCache:
+    """Exact and similarity-based cache of AI answers, persisted as JSON
+
+    The exact tier is keyed on the normalized prompt. The semantic tier
+    indexes the content words of every cached prompt with the knowledge
+    base's TF-IDF index and serves the closest one scoring at least
+    threshold whose shared words come in the same order. Entries expire after ttl seconds and the least recently used
+    are evicted beyond max_entries.
+    """
+
+    def __init__(self, path='ai_cache.json', max_entries=500, ttl=7 * 24 * 3600, threshold=0.85,
+                 semantic=True):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.semantic = semantic
+        self.entries = OrderedDict()
+        self.index = KnowledgeBaseIndex(os.devnull)
+        # Index row -> exact key; rows of evicted entries stay until the next rebuild
+        self.rows = []
+        self.stats_counts = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0, 'bypassed': 0,
+                             'evicted': 0, 'expired': 0, 'stored': 0}
+        self.lock = threading.RLock()
+
+    def _expired(self, entry, now):
+        return self.ttl is not None and now - entry['created'] > self.ttl
+
+    def _drop(self, key, counter):
+        del self.entries[key]
+        self.stats_counts[counter] += 1
+
+    def _rebuild_index(self):
+        """Refit the similarity index on live entries only"""
+        self.rows = list(self.entries)
+        self.index.fit([self.entries[key]['semantic'] for key in self.rows])
+
+    def _knows_words(self, text):
+        """Whether the index vocabulary has every word of text, so its row isn't missing any"""
+        if self.index.vectorizer is None:
+            return False
+        vocabulary = self.index.vectorizer.vocabulary_
+        return all(token in vocabulary for token in self.index.vectorizer.build_analyzer()(text))
+
+    def _lookup_semantic(self, normalized, now):
+        if not self.semantic or self.index.retriever is None:
+            return None
+        query = semantic_key(normalized)
+        analyzer = self.index.vectorizer.build_analyzer()
+        tokens = analyzer(query)
+        if not tokens:
+            return None
+        # Words the index has never seen don't count towards the cosine, so scale by coverage
+        coverage = sum(token in self.index.vectorizer.vocabulary_ for token in tokens) / len(tokens)
+        if coverage < self.threshold:
+            return None
+        for row, score in self.index.search(query, top_k=3, threshold=self.threshold / coverage - 1e-9):
+            score *= coverage
+            key = self.rows[row]
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            if self._expired(entry, now):
+                self._drop(key, 'expired')
+                continue
+            if not same_word_order(tokens, analyzer(entry['semantic'])):
+                continue
+            return key, score
+        return None
+
+    def get(self, prompt, bypass=False):
+        """Return (response, 'exact' or 'semantic', score) for a cached answer, or None"""
+        if bypass:
+            with self.lock:
+                self.stats_counts['bypassed'] += 1
+            return None
+
+        normalized = normalize_prompt(prompt)
+        if not is_cacheable(normalized):
+            with self.lock:
+                self.stats_counts['bypassed'] += 1
+            return None
+
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(normalized)
+            if entry is not None and self._expired(entry, now):
+                self._drop(normalized, 'expired')
+                entry = None
+
+            if entry is not None:
+                kind, score, key = 'exact', 1.0, normalized
+            else:
+                found = self._lookup_semantic(normalized, now)
+                if found is None:
+                    self.stats_counts['misses'] += 1
+                    return None
+                key, score = found
+                kind = 'semantic'
+                entry = self.entries[key]
+
+            self.entries.move_to_end(key)
+            entry['last_used'] = now
+            entry['hits'] += 1
+            self.stats_counts[f'{kind}_hits'] += 1
+            return entry['response'], kind, score
+
+    def put(self, prompt, response):
+        """Store an answer; context-dependent prompts and empty answers are skipped"""
+        normalized = normalize_prompt(prompt)
+        if not response.strip() or not is_cacheable(normalized):
+            return False
+
+        now = time.time()
+        with self.lock:
+            is_new = normalized not in self.entries
+            self.entries[normalized] = {
+                'prompt': prompt,
+                'semantic': semantic_key(normalized) or normalized,
+                'response': response,
+                'created': now,
+                'last_used': now,
+                'hits': 0
+            }
+            self.entries.move_to_end(normalized)
+            self.stats_counts['stored'] += 1
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)), 'evicted')
+
+            semantic = self.entries[normalized]['semantic']
+            if is_new and not self._knows_words(semantic):
+                # Unknown words would leave the new row empty, and the cache is small enough to refit
+                self._rebuild_index()
+            elif is_new:
+                self.rows.append(normalized)
+                self.index.add([semantic], refit=False)
+            # Evicted rows degrade the index over time
+            if len(self.rows) > 2 * len(self.entries) + 50:
+                self._rebuild_index()
+        self.save()
+        return True
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self._rebuild_index()
+        self.save()
+
+    def load(self):
+        """Read the on-disk store, skipping expired entries"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return 0
+
+        now = time.time()
+        with self.lock:
+            self.entries.clear()
+            # Stored least recently used first
+            for entry in stored.get('entries', []):
+                if not self._expired(entry, now):
+                    self.entries[normalize_prompt(entry['prompt'])] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._rebuild_index()
+            return len(self.entries)
+
+    def save(self):
+        """Write entries in LRU order, atomically"""
+        with self.lock:
+            data = {'version': 1, 'entries': list(self.entries.values())}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def stats(self):
+        """Hit/miss counters, hit rate and current size"""
+        with self.lock:
+            stats = dict(self.stats_counts, entries=len(self.entries))
+        lookups = stats['exact_hits'] + stats['semantic_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['exact_hits'] + stats['semantic_hits']) / lookups if lookups else 0.0
+        return stats
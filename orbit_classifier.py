@@ -0,0 +1,203 @@
+import argparse
+import json
+import random
+import re
+import time
+import zlib
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9']+|[+\-*/%^]")
+
+DEFAULT_FEATURES = 2 ** 16
+
+
+def extract_features(text, n_features=DEFAULT_FEATURES):
+    """Hash word unigrams, bigrams and character trigrams into (indices, values)"""
+    tokens = TOKEN_RE.findall(text.lower())
+    features = [f"w:{t}" for t in tokens]
+    features += [f"b:{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for token in tokens:
+        padded = f"<{token}>"
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    if not features:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    hashed = np.fromiter((zlib.crc32(f.encode('utf-8')) % n_features for f in features),
+                         dtype=np.int64, count=len(features))
+    indices, counts = np.unique(hashed, return_counts=True)
+    values = (1.0 + np.log(counts)).astype(np.float32)
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentClassifier:
+    """Multinomial logistic regression over hashed n-gram features"""
+
+    def __init__(self, labels, n_features=DEFAULT_FEATURES):
+        self.labels = list(labels)
+        self.n_features = n_features
+        self.weights = np.zeros((n_features, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+
+    def _matrix(self, texts):
+        """Build a sparse feature matrix for training"""
+        import scipy.sparse as sp
+
+        rows, cols, vals = [], [], []
+        for row, text in enumerate(texts):
+            indices, values = extract_features(text, self.n_features)
+            rows.append(np.full(len(indices), row))
+            cols.append(indices)
+            vals.append(values)
+        return sp.csr_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(len(texts), self.n_features)
+        )
+
+    def fit(self, texts, labels, epochs=300, learning_rate=0.5, l2=1e-4):
+        """Train with full-batch Adam on the cross-entropy loss"""
+        X = self._matrix(texts)
+        label_index = {label: i for i, label in enumerate(self.labels)}
+        Y = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        Y[np.arange(len(texts)), [label_index[label] for label in labels]] = 1.0
+
+        # Only columns that occur in training ever get a gradient
+        active = np.unique(X.indices)
+        X_active = X[:, active]
+        W = np.zeros((len(active), len(self.labels)), dtype=np.float32)
+        b = np.zeros(len(self.labels), dtype=np.float32)
+        m_W, v_W = np.zeros_like(W), np.zeros_like(W)
+        m_b, v_b = np.zeros_like(b), np.zeros_like(b)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+        for step in range(1, epochs + 1):
+            P = _softmax(X_active @ W + b)
+            error = (P - Y) / len(texts)
+            grad_W = np.asarray(X_active.T @ error) + l2 * W
+            grad_b = error.sum(axis=0)
+
+            for param, grad, m, v in ((W, grad_W, m_W, v_W), (b, grad_b, m_b, v_b)):
+                m *= beta1
+                m += (1 - beta1) * grad
+                v *= beta2
+                v += (1 - beta2) * grad * grad
+                param -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+
+        self.weights[:] = 0
+        self.weights[active] = W
+        self.bias = b
+        return self
+
+    def predict_proba(self, text):
+        """Class probabilities for one utterance"""
+        indices, values = extract_features(text, self.n_features)
+        return _softmax(values @ self.weights[indices] + self.bias)
+
+    def predict(self, text):
+        """Return (label, confidence) for one utterance"""
+        probabilities = self.predict_proba(text)
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path):
+        """Store the model as a compressed .npz file"""
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            labels=np.array(self.labels),
+            n_features=np.array(self.n_features)
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a model saved by save()"""
+        with np.load(path) as data:
+            model = cls([str(label) for label in data['labels']], int(data['n_features']))
+            model.weights = data['weights']
+            model.bias = data['bias']
+        return model
+
+
+def load_utterances(path):
+    """Read {"text": ..., "intent": ...} lines from a JSONL file"""
+    texts, labels = [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            texts.append(row['text'])
+            labels.append(row['intent'])
+    return texts, labels
+
+
+def accuracy(model, texts, labels):
+    """Share of texts the model labels correctly"""
+    correct = sum(model.predict(text)[0] == label for text, label in zip(texts, labels))
+    return correct / max(1, len(texts))
+
+
+def train_command(args):
+    texts, labels = load_utterances(args.data)
+    start = time.perf_counter()
+
+    if args.holdout:
+        # Report held-out accuracy before training on everything
+        order = list(range(len(texts)))
+        random.Random(0).shuffle(order)
+        cut = int(len(order) * (1 - args.holdout))
+        train, test = order[:cut], order[cut:]
+        model = IntentClassifier(sorted(set(labels)), args.features)
+        model.fit([texts[i] for i in train], [labels[i] for i in train], epochs=args.epochs)
+        score = accuracy(model, [texts[i] for i in test], [labels[i] for i in test])
+        print(f"Held-out accuracy on {len(test)} utterances: {score:.1%}")
+
+    model = IntentClassifier(sorted(set(labels)), args.features)
+    model.fit(texts, labels, epochs=args.epochs)
+    if args.test:
+        test_texts, test_labels = load_utterances(args.test)
+        print(f"Accuracy on {args.test}: {accuracy(model, test_texts, test_labels):.1%}")
+    model.save(args.output)
+    print(f"Trained on {len(texts)} utterances, {len(model.labels)} intents in "
+          f"{time.perf_counter() - start:.1f} s -> {args.output}")
+
+
+def predict_command(args):
+    start = time.perf_counter()
+    model = IntentClassifier.load(args.model)
+    loaded = time.perf_counter()
+    label, confidence = model.predict(args.text)
+    print(f"{label} ({confidence:.2f}) - load {1000 * (loaded - start):.1f} ms, "
+          f"predict {1000 * (time.perf_counter() - loaded):.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and test ORBIT's intent classifier")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train = commands.add_parser('train', help="Train from a labelled JSONL utterance file")
+    train.add_argument('data', nargs='?', default='intent_utterances.jsonl')
+    train.add_argument('-o', '--output', default='intent_model.npz')
+    train.add_argument('--epochs', type=int, default=300)
+    train.add_argument('--features', type=int, default=DEFAULT_FEATURES)
+    train.add_argument('--holdout', type=float, default=0.0,
+                       help="Fraction held out to report accuracy before the final fit")
+    train.add_argument('--test', help="Labelled JSONL file, never trained on, to report accuracy on")
+    train.set_defaults(func=train_command)
+
+    predict = commands.add_parser('predict', help="Classify one utterance")
+    predict.add_argument('text')
+    predict.add_argument('-m', '--model', default='intent_model.npz')
+    predict.set_defaults(func=predict_command)
+
+    args = parser.parse_args()
+    args.func(args)
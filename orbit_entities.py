@@ -0,0 +1,119 @@
+import re
+
+WEEKDAYS = r'(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)'
+MONTHS = (r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+          r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)')
+NUMBER_WORDS = r'(?:a|an|one|two|three|four|five|six|seven|eight|nine|ten|fifteen|twenty|thirty|forty|fifty|sixty)'
+
+# Order matters: earlier patterns win where spans overlap
+ENTITY_PATTERNS = [
+    ('DATE', re.compile(
+        r'\b(?:\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}(?:/\d{2,4})?|\d{1,2}\.\d{1,2}\.\d{2,4}'
+        rf'|{MONTHS}\.?\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{4}})?'
+        rf'|\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?{MONTHS}(?:,?\s+\d{{4}})?'
+        rf'|today|tonight|tomorrow|yesterday|(?:next|this|last)\s+(?:week|month|year|{WEEKDAYS})|{WEEKDAYS})\b',
+        re.IGNORECASE)),
+    ('TIME', re.compile(
+        r'\b(?:\d{1,2}:\d{2}(?:\s*[ap]\.?m\.?)?|\d{1,2}\s*[ap]\.?m\.?|noon|midnight)(?![\w])',
+        re.IGNORECASE)),
+    ('DURATION', re.compile(
+        rf'\b(?:\d+(?:\.\d+)?|{NUMBER_WORDS})\s*(?:seconds?|secs?|minutes?|mins?|hours?|hrs?|days?|weeks?|months?|years?)\b',
+        re.IGNORECASE)),
+    ('NUMBER', re.compile(r'(?<![\w.])[-+]?\d+(?:,\d{3})*(?:\.\d+)?%?(?![\w])'))
+]
+
+TOKEN_RE = re.compile(r"[\w']+")
+
+DEFAULT_APPLICATIONS = [
+    'notepad', 'calculator', 'paint', 'word', 'excel', 'powerpoint', 'chrome', 'firefox', 'edge',
+    'browser', 'vs code', 'visual studio code', 'whatsapp', 'youtube', 'spotify', 'outlook'
+]
+
+
+class Gazetteer:
+    """Word-level trie of known phrases for longest-match lookup"""
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def add(self, phrase, label):
+        """Add a phrase such as 'vs code' with its entity label"""
+        words = TOKEN_RE.findall(phrase.lower())
+        if not words:
+            return
+        node = self.root
+        for word in words:
+            node = node.setdefault(word, {})
+        if None not in node:
+            self.size += 1
+        node[None] = label
+
+    def add_all(self, phrases, label):
+        for phrase in phrases:
+            self.add(phrase, label)
+
+    def find(self, text):
+        """Return (start, end, label) character spans of the longest known phrases in text"""
+        matches = list(TOKEN_RE.finditer(text))
+        words = [m.group().lower() for m in matches]
+        spans = []
+        i = 0
+        while i < len(words):
+            node = self.root
+            best = None
+            j = i
+            while j < len(words) and words[j] in node:
+                node = node[words[j]]
+                j += 1
+                if None in node:
+                    best = (j, node[None])
+            if best:
+                end, label = best
+                spans.append((matches[i].start(), matches[end - 1].end(), label))
+                i = end
+            else:
+                i += 1
+        return spans
+
+
+class EntityExtractor:
+    """Entity extraction engine: 'fast' regex and gazetteer, 'nltk' ne_chunk, or 'off'"""
+
+    MODES = ('fast', 'nltk', 'off')
+
+    def __init__(self, mode='fast', applications=None, contacts=None, places=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown entity mode: {mode}")
+        self.mode = mode
+        self.gazetteer = Gazetteer()
+        self.gazetteer.add_all(applications if applications is not None else DEFAULT_APPLICATIONS, 'APPLICATION')
+        self.gazetteer.add_all(contacts or [], 'PERSON')
+        self.gazetteer.add_all(places or [], 'GPE')
+
+    def extract(self, annotation):
+        """Return a de-duplicated list of (text, label) pairs for an annotation"""
+        if self.mode == 'off':
+            return []
+        if self.mode == 'nltk':
+            return annotation.nltk_entities()
+        return self.extract_fast(annotation.text)
+
+    def extract_fast(self, text):
+        """Regex and gazetteer extraction that never touches the NLTK tagger"""
+        spans = []
+
+        def _claim(start, end, label):
+            # Skip spans overlapping one already found, e.g. the 5 in "5 minutes"
+            if any(start < e and s < end for s, e, _ in spans):
+                return
+            spans.append((start, end, label))
+
+        for start, end, label in self.gazetteer.find(text):
+            _claim(start, end, label)
+        for label, pattern in ENTITY_PATTERNS:
+            for match in pattern.finditer(text):
+                _claim(match.start(), match.end(), label)
+
+        spans.sort()
+        return list(dict.fromkeys((text[start:end], label) for start, end, label in spans))
@@ -0,0 +1,121 @@
+from collections import deque, namedtuple
+
+IntentMatch = namedtuple('IntentMatch', ['intent', 'score', 'keywords'])
+
+# main5 routing table: intent -> keyword groups, every group needs a hit.
+# Table order is routing precedence; inflections are listed because matching is whole-word.
+ORBIT_INTENTS = [
+    ('calculate', [['calculate', 'compute', 'solve', 'what is', 'math', '+', '-', '*', '/']]),
+    ('task', [['task', 'tasks', 'todo', 'todos', 'reminder', 'reminders', 'remember', 'add', 'new']]),
+    ('reminder', [
+        ['remind', 'reminds', 'reminder', 'alert', 'alerts', 'notify', 'remember'],
+        ['at', 'in', 'on', 'tomorrow', 'today', 'after']
+    ]),
+    ('information', [['what', 'when', 'where', 'who', 'why', 'how', 'tell me', 'explain']]),
+    ('application', [
+        ['open', 'launch', 'start', 'run'],
+        ['notepad', 'calculator', 'browser', 'chrome', 'firefox', 'word', 'excel']
+    ])
+]
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+class AhoCorasick:
+    """Character automaton that finds every whole-word pattern occurrence in one pass"""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.patterns = []
+
+    def add(self, pattern, value):
+        """Add a lowercase pattern with an associated value"""
+        state = 0
+        for char in pattern:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].append(len(self.patterns))
+        self.patterns.append((pattern, value))
+
+    def build(self):
+        """Compute failure links breadth first"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """Yield (start, end, pattern, value) for whole-word matches in text"""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for pattern_id in self.output[state]:
+                pattern, value = self.patterns[pattern_id]
+                end = index + 1
+                start = end - len(pattern)
+                # Patterns starting/ending in a word character must sit on word boundaries
+                if _is_word_char(pattern[0]) and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if _is_word_char(pattern[-1]) and end < len(text) and _is_word_char(text[end]):
+                    continue
+                yield start, end, pattern, value
+
+
+class IntentMatcher:
+    """Compiled intent table; finds every keyword in one pass and scores intents"""
+
+    def __init__(self, table):
+        self.intents = []
+        self.automaton = AhoCorasick()
+        for priority, (intent, groups) in enumerate(table):
+            # A flat keyword list is a single group
+            if groups and isinstance(groups[0], str):
+                groups = [groups]
+            self.intents.append((intent, len(groups)))
+            for group_index, keywords in enumerate(groups):
+                for keyword in keywords:
+                    self.automaton.add(keyword.lower(), (priority, group_index))
+        self.automaton.build()
+
+    def match(self, text):
+        """Return IntentMatch candidates whose keyword groups all hit, in table order"""
+        text = text.lower()
+        hits = {}
+        for _, _, keyword, (priority, group_index) in self.automaton.find(text):
+            hits.setdefault(priority, {}).setdefault(group_index, set()).add(keyword)
+
+        matches = []
+        for priority, groups in sorted(hits.items()):
+            intent, group_count = self.intents[priority]
+            if len(groups) < group_count:
+                continue
+            keywords = sorted(set().union(*groups.values()), key=text.find)
+            # Share of the query covered by distinct keywords
+            score = min(1.0, sum(len(k) for k in keywords) / max(1, len(text.strip())))
+            matches.append(IntentMatch(intent, score, keywords))
+        return matches
+
+    def intents_in(self, text):
+        """Names of every matching intent, in table order"""
+        return [m.intent for m in self.match(text)]
+
+    def best(self, text):
+        """The highest scoring match, or None"""
+        matches = self.match(text)
+        return max(matches, key=lambda m: m.score) if matches else None
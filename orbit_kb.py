@@ -0,0 +1,538 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import pickle
+import random
+import threading
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Bump when the on-disk layout changes so old caches are rebuilt
+INDEX_FORMAT_VERSION = 3
+
+# Below this size an ANN index costs more than it saves
+IVF_MIN_DOCS = 2000
+
+# Don't judge vocabulary drift on a handful of words
+MIN_DRIFT_TOKENS = 20
+
+
+def _top_k(scores, top_k):
+    """Indices of the top_k highest scores, best first"""
+    if top_k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def _normalize_rows(vectors):
+    """L2-normalize dense row vectors in place"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+def _spherical_kmeans(vectors, n_clusters, iterations=10, seed=0):
+    """Cluster unit vectors by cosine similarity, returning unit centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+
+        # Re-seed clusters that lost all their members
+        empty = np.flatnonzero(~sums.any(axis=1))
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = _normalize_rows(sums)
+
+    return centroids
+
+
+class ExactRetriever:
+    """Brute-force cosine scan over the sparse TF-IDF matrix"""
+
+    name = 'exact'
+
+    def __init__(self):
+        self.doc_matrix = None
+
+    def config(self):
+        return {}
+
+    def fit(self, doc_matrix):
+        self.doc_matrix = doc_matrix
+
+    def add(self, doc_matrix, rows):
+        self.doc_matrix = doc_matrix
+
+    def search(self, query_vec, top_k):
+        """Return (indices, scores) of the top_k rows"""
+        scores = (self.doc_matrix @ query_vec.T).toarray().ravel()
+        top = _top_k(scores, top_k)
+        return top, scores[top]
+
+
+class IVFRetriever:
+    """Inverted-file ANN index over truncated-SVD dense vectors"""
+
+    name = 'ivf'
+
+    def __init__(self, n_components=128, n_lists=None, n_probe=8, rerank=True, seed=0):
+        self.n_components = n_components
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.rerank = rerank
+        self.seed = seed
+        self.doc_matrix = None
+        self.projection = None
+        self.centroids = None
+        self.list_offsets = None
+        self.list_ids = None
+        self.vectors = None
+        self.pending_ids = None
+        self.pending_vectors = None
+
+    def config(self):
+        return {'n_components': self.n_components, 'n_lists': self.n_lists, 'seed': self.seed}
+
+    def fit(self, doc_matrix, sample_size=100000, chunk_size=65536):
+        """Reduce dimensions, train the coarse quantizer and bucket every row"""
+        self.doc_matrix = doc_matrix
+        n_docs, n_features = doc_matrix.shape
+        rng = np.random.default_rng(self.seed)
+
+        n_components = max(1, min(self.n_components, n_features - 1, n_docs - 1))
+        svd = TruncatedSVD(n_components=n_components, random_state=self.seed)
+        sample = rng.choice(n_docs, min(n_docs, sample_size), replace=False)
+        svd.fit(doc_matrix[sample])
+        # Keep only the feature -> component map; sklearn's transform adds per-call overhead
+        self.projection = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+
+        vectors = np.empty((n_docs, n_components), dtype=np.float32)
+        for start in range(0, n_docs, chunk_size):
+            chunk = doc_matrix[start:start + chunk_size] @ self.projection
+            vectors[start:start + chunk_size] = _normalize_rows(np.asarray(chunk, dtype=np.float32))
+
+        n_lists = min(self.n_lists or max(1, int(4 * np.sqrt(n_docs))), n_docs)
+        train = vectors[rng.choice(n_docs, min(n_docs, 256 * n_lists), replace=False)]
+        self.centroids = _spherical_kmeans(train, n_lists, seed=self.seed)
+
+        assignments = np.empty(n_docs, dtype=np.int32)
+        for start in range(0, n_docs, chunk_size):
+            block = vectors[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(block @ self.centroids.T, axis=1)
+
+        # Store each inverted list contiguously so probing is a slice
+        order = np.argsort(assignments, kind='stable')
+        self.list_ids = order.astype(np.int64)
+        self.list_offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+        self.vectors = vectors[order]
+        self.pending_ids = np.empty(0, dtype=np.int64)
+        self.pending_vectors = np.empty((0, n_components), dtype=np.float32)
+
+    def add(self, doc_matrix, rows):
+        """Keep new rows in a brute-force overflow list until the next refit"""
+        self.doc_matrix = doc_matrix
+        start = doc_matrix.shape[0] - rows.shape[0]
+        vectors = _normalize_rows(np.asarray(rows @ self.projection, dtype=np.float32))
+        self.pending_ids = np.concatenate([self.pending_ids, np.arange(start, doc_matrix.shape[0])])
+        self.pending_vectors = np.vstack([self.pending_vectors, vectors])
+
+    def project(self, query_vec):
+        """Map a sparse TF-IDF row into the reduced unit-length space"""
+        query = query_vec.data.astype(np.float32) @ self.projection[query_vec.indices]
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def search(self, query_vec, top_k):
+        """Probe the n_probe closest lists and rank their members"""
+        query = self.project(query_vec.tocsr())
+        n_probe = min(self.n_probe, len(self.centroids))
+        probes = _top_k(self.centroids @ query, n_probe)
+
+        slices = [slice(self.list_offsets[p], self.list_offsets[p + 1]) for p in probes]
+        candidates = np.concatenate([self.list_ids[s] for s in slices] + [self.pending_ids])
+        if not len(candidates):
+            return candidates, np.empty(0, dtype=np.float32)
+
+        if self.rerank:
+            # Exact TF-IDF cosine on the short list keeps scores comparable to the exact path
+            scores = (self.doc_matrix[candidates] @ query_vec.T).toarray().ravel()
+        else:
+            scores = np.concatenate([self.vectors[s] for s in slices] + [self.pending_vectors]) @ query
+
+        top = _top_k(scores, top_k)
+        return candidates[top], scores[top]
+
+
+RETRIEVERS = {
+    'exact': ExactRetriever,
+    'ivf': IVFRetriever
+}
+
+
+class KnowledgeBaseIndex:
+    """Precomputed, L2-normalized TF-IDF matrix over knowledge base questions"""
+
+    def __init__(self, cache_path='knowledge_base.index', backend='exact', n_probe=8, refit_drift=0.2):
+        if backend not in RETRIEVERS:
+            raise ValueError(f"Unknown knowledge base index: {backend}")
+        self.cache_path = cache_path
+        self.backend = backend
+        self.n_probe = n_probe
+        self.refit_drift = refit_drift
+        self.vectorizer = None
+        self.doc_matrix = None
+        self.retriever = None
+        self.content_hash = None
+        self.questions = []
+        # Tokens added since the last fit, and how many of them the vocabulary lacked
+        self.new_tokens = 0
+        self.oov_tokens = 0
+        self.refitting = False
+        self.lock = threading.RLock()
+
+    def make_retriever(self, n_docs):
+        """Create the configured retriever, using the exact scan for small knowledge bases"""
+        if self.backend == 'ivf' and n_docs >= IVF_MIN_DOCS:
+            return IVFRetriever(n_probe=self.n_probe)
+        return ExactRetriever()
+
+    def compute_hash(self, questions):
+        """Hash the question texts and index settings so a stale cache can be detected"""
+        retriever = self.make_retriever(len(questions))
+        digest = hashlib.sha256(
+            f"v{INDEX_FORMAT_VERSION}:{retriever.name}:{sorted(retriever.config().items())}".encode('utf-8')
+        )
+        for question in questions:
+            digest.update(question.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def build(self, questions, indexed=None):
+        """Reload the persisted index if it matches, otherwise fit and persist it
+
+        indexed is how many leading questions the persisted index may cover
+        when the rest were appended since it was saved; those are added on
+        top of it instead of refitting everything.
+        """
+        content_hash = self.compute_hash(questions)
+        if self.load(content_hash):
+            self.questions = list(questions)
+            if self.needs_refit():
+                self.refit_async()
+            return
+        if indexed is not None and 0 < indexed < len(questions) and self.load(self.compute_hash(questions[:indexed])):
+            self.questions = list(questions[:indexed])
+            self.add(questions[indexed:])
+            return
+        self.fit(questions)
+        self.content_hash = content_hash
+        self.save()
+
+    def fit(self, questions):
+        """Fit the vectorizer, compute the document matrix once and index it"""
+        self.questions = list(questions)
+        self.new_tokens = 0
+        self.oov_tokens = 0
+        self.vectorizer = None
+        self.doc_matrix = None
+        self.retriever = None
+        if not questions:
+            return
+
+        # TfidfVectorizer rows are L2-normalized, so a dot product is the cosine
+        vectorizer = TfidfVectorizer(norm='l2')
+        try:
+            doc_matrix = vectorizer.fit_transform(self.questions).tocsr()
+        except ValueError:
+            # Nothing but punctuation so far, so there is no vocabulary to fit
+            return
+        self.vectorizer = vectorizer
+        self.doc_matrix = doc_matrix
+        self.retriever = self.make_retriever(len(self.questions))
+        self.retriever.fit(self.doc_matrix)
+
+    def drift(self):
+        """Fraction of tokens added since the last fit that the vocabulary doesn't know"""
+        if self.new_tokens < MIN_DRIFT_TOKENS:
+            return 0.0
+        return self.oov_tokens / self.new_tokens
+
+    def needs_refit(self):
+        """Whether vocabulary drift or growth warrants a full refit"""
+        if self.retriever is None:
+            return bool(self.questions)
+        if self.drift() >= self.refit_drift:
+            return True
+        if self.backend == 'ivf' and isinstance(self.retriever, ExactRetriever):
+            return len(self.questions) >= IVF_MIN_DOCS
+        if isinstance(self.retriever, IVFRetriever):
+            return len(self.retriever.pending_ids) > len(self.retriever.list_ids) // 2
+        return False
+
+    def _append(self, questions):
+        """Vectorize questions with the current vocabulary and append them to the index"""
+        analyzer = self.vectorizer.build_analyzer()
+        vocabulary = self.vectorizer.vocabulary_
+        for question in questions:
+            tokens = analyzer(question)
+            self.new_tokens += len(tokens)
+            self.oov_tokens += sum(1 for token in tokens if token not in vocabulary)
+
+        rows = self.vectorizer.transform(questions).tocsr()
+        self.doc_matrix = sp.vstack([self.doc_matrix, rows], format='csr')
+        self.retriever.add(self.doc_matrix, rows)
+
+    def add(self, questions, refit=True):
+        """Add questions without refitting, scheduling a background refit on drift"""
+        with self.lock:
+            self.questions.extend(questions)
+            if self.retriever is None:
+                self.fit(self.questions)
+            else:
+                self._append(questions)
+            self.content_hash = None
+
+        if refit and self.needs_refit():
+            self.refit_async()
+
+    def refit_async(self):
+        """Refit the vectorizer on a background thread, then swap the new index in"""
+        with self.lock:
+            if self.refitting:
+                return False
+            self.refitting = True
+            snapshot = list(self.questions)
+
+        def _refit():
+            try:
+                fresh = KnowledgeBaseIndex(os.devnull, self.backend, self.n_probe, self.refit_drift)
+                fresh.fit(snapshot)
+                with self.lock:
+                    late = self.questions[len(snapshot):]
+                    self.vectorizer = fresh.vectorizer
+                    self.doc_matrix = fresh.doc_matrix
+                    self.retriever = fresh.retriever
+                    self.new_tokens = 0
+                    self.oov_tokens = 0
+                    # Questions added while fitting still need rows
+                    if late and self.retriever is not None:
+                        self._append(late)
+                    elif late:
+                        self.fit(self.questions)
+                self.save()
+            finally:
+                # Cleared under the lock that refit_async tests and sets it with
+                with self.lock:
+                    self.refitting = False
+
+        threading.Thread(target=_refit, daemon=True).start()
+        return True
+
+    def load(self, content_hash):
+        """Load the persisted index, returning False if missing or stale"""
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception:
+            return False
+
+        if data.get('hash') != content_hash:
+            return False
+
+        self.vectorizer = data['vectorizer']
+        self.doc_matrix = data['matrix']
+        self.retriever = data['retriever']
+        self.new_tokens = data['new_tokens']
+        self.oov_tokens = data['oov_tokens']
+        if isinstance(self.retriever, IVFRetriever):
+            self.retriever.n_probe = self.n_probe
+        self.content_hash = content_hash
+        return True
+
+    def save(self):
+        """Persist the vectorizer, matrix and retriever next to the knowledge base"""
+        with self.lock:
+            if self.content_hash is None:
+                self.content_hash = self.compute_hash(self.questions)
+            data = {
+                'hash': self.content_hash,
+                'vectorizer': self.vectorizer,
+                'matrix': self.doc_matrix,
+                'retriever': self.retriever,
+                'new_tokens': self.new_tokens,
+                'oov_tokens': self.oov_tokens
+            }
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            # A read-only install still works, it just refits on every launch
+            pass
+
+    def search(self, query, top_k=1, threshold=0.0):
+        """Return up to top_k (index, score) pairs scoring above threshold, best first"""
+        with self.lock:
+            if self.retriever is None:
+                return []
+            query_vec = self.vectorizer.transform([query])
+            indices, scores = self.retriever.search(query_vec, top_k)
+        return [(int(i), float(s)) for i, s in zip(indices, scores) if s > threshold]
+
+    def most_similar(self, query):
+        """Return (index, score) of the closest question, or (None, 0.0)"""
+        results = self.search(query, top_k=1, threshold=-1.0)
+        return results[0] if results else (None, 0.0)
+
+
+def iter_knowledge_file(path):
+    """Stream question-answer entries from a JSONL or CSV file one row at a time"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        for row in rows:
+            question = (row.get('question') or '').strip()
+            answer = (row.get('answer') or '').strip()
+            if not question or not answer:
+                continue
+            tags = row.get('tags') or []
+            if isinstance(tags, str):
+                tags = [t.strip() for t in tags.split(';') if t.strip()]
+            yield {'question': question, 'answer': answer, 'tags': tags}
+
+
+def iter_knowledge_batches(path, batch_size=1000):
+    """Group streamed knowledge entries into lists of batch_size"""
+    batch = []
+    for entry in iter_knowledge_file(path):
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _load_vocabulary(words_file):
+    """Read benchmark words, falling back to generated tokens"""
+    try:
+        with open(words_file, 'r') as f:
+            return [w.strip() for w in f if w.strip()]
+    except OSError:
+        return [f"word{i}" for i in range(5000)]
+
+
+def _synthetic_questions(count, vocabulary, seed=0):
+    """Generate random question-like strings for benchmarking"""
+    rng = random.Random(seed)
+    prefixes = ['what is', 'how do I', 'where can I find', 'why does', 'can you']
+    return [
+        f"{rng.choice(prefixes)} {' '.join(rng.sample(vocabulary, 4))}"
+        for _ in range(count)
+    ]
+
+
+def _topical_questions(count, vocabulary, words_per_topic=12, seed=0):
+    """Generate questions clustered around topics, closer to a real FAQ corpus"""
+    rng = random.Random(seed)
+    n_topics = max(1, count // 50)
+    topics = [rng.sample(vocabulary, words_per_topic) for _ in range(n_topics)]
+    prefixes = ['what is', 'how do I', 'where can I find', 'why does', 'can you']
+    return [
+        f"{rng.choice(prefixes)} {' '.join(rng.sample(rng.choice(topics), 4))} {rng.choice(vocabulary)}"
+        for _ in range(count)
+    ]
+
+
+def benchmark(sizes=(100, 1000, 5000, 20000), queries=50, words_file='words.txt'):
+    """Compare per-query latency of the old transform-everything path against the precomputed matrix"""
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    vocabulary = _load_vocabulary(words_file)
+    print(f"{'KB size':>8} {'old ms/query':>14} {'new ms/query':>14} {'speedup':>9}")
+    for size in sizes:
+        questions = _synthetic_questions(size, vocabulary)
+        probes = _synthetic_questions(queries, vocabulary, seed=1)
+
+        index = KnowledgeBaseIndex(cache_path=os.devnull)
+        index.fit(questions)
+
+        # Old path: re-transform every question for every query
+        start = time.perf_counter()
+        for probe in probes:
+            query_vec = index.vectorizer.transform([probe])
+            doc_vecs = index.vectorizer.transform(questions)
+            np.argmax(cosine_similarity(query_vec, doc_vecs))
+        old_ms = (time.perf_counter() - start) * 1000 / queries
+
+        start = time.perf_counter()
+        for probe in probes:
+            index.most_similar(probe)
+        new_ms = (time.perf_counter() - start) * 1000 / queries
+
+        print(f"{size:>8} {old_ms:>14.3f} {new_ms:>14.3f} {old_ms / new_ms:>8.1f}x")
+
+
+def benchmark_ann(sizes=(20000, 200000), probes=(1, 4, 8, 16), queries=200, top_k=5,
+                  words_file='words.txt'):
+    """Measure recall@k and latency of the IVF index against the exact scan"""
+    vocabulary = _load_vocabulary(words_file)
+    rng = random.Random(2)
+    print(f"{'KB size':>8} {'index':>10} {'recall@' + str(top_k):>10} {'ms/query':>10}")
+    for size in sizes:
+        questions = _topical_questions(size, vocabulary)
+        # Perturb existing questions so every query has true neighbours
+        tests = []
+        for question in rng.sample(questions, queries):
+            words = question.split()
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            tests.append(' '.join(words))
+
+        exact = KnowledgeBaseIndex(cache_path=os.devnull)
+        exact.fit(questions)
+        truth = []
+        start = time.perf_counter()
+        for test in tests:
+            truth.append({i for i, _ in exact.search(test, top_k=top_k, threshold=-1.0)})
+        exact_ms = (time.perf_counter() - start) * 1000 / queries
+        print(f"{size:>8} {'exact':>10} {1.0:>10.3f} {exact_ms:>10.3f}")
+
+        ann = KnowledgeBaseIndex(cache_path=os.devnull, backend='ivf')
+        ann.fit(questions)
+        for n_probe in probes:
+            ann.retriever.n_probe = n_probe
+            hits = 0
+            start = time.perf_counter()
+            for test, expected in zip(tests, truth):
+                found = {i for i, _ in ann.search(test, top_k=top_k, threshold=-1.0)}
+                hits += len(found & expected)
+            ann_ms = (time.perf_counter() - start) * 1000 / queries
+            recall = hits / max(1, sum(len(t) for t in truth))
+            print(f"{size:>8} {'ivf/' + str(n_probe):>10} {recall:>10.3f} {ann_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ORBIT knowledge base index benchmarks")
+    parser.add_argument('benchmark', nargs='?', choices=['latency', 'recall'], default='latency')
+    args = parser.parse_args()
+
+    if args.benchmark == 'recall':
+        benchmark_ann()
+    else:
+        benchmark()
@@ -0,0 +1,470 @@
+import argparse
+import queue
+import threading
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+
+
+class RingBuffer:
+    """The last capacity samples of a stream, in one preallocated array
+
+    Samples are addressed by their absolute position in the stream, so a
+    segment found by the VAD can be read back after later frames arrive,
+    as long as it hasn't been overwritten.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.written = 0
+
+    @property
+    def oldest(self):
+        return max(0, self.written - self.capacity)
+
+    def write(self, samples):
+        """Append samples; returns the stream position after them"""
+        n = len(samples)
+        if n >= self.capacity:
+            samples = samples[-self.capacity:]
+            self.written += n - self.capacity
+            n = self.capacity
+        start = self.written % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        self.written += n
+        return self.written
+
+    def read(self, start, end):
+        """A copy of samples [start, end) of the stream"""
+        if start < self.oldest or end > self.written or start > end:
+            raise IndexError(f"samples {start}-{end} are not in the buffer ({self.oldest}-{self.written})")
+        begin = start % self.capacity
+        n = end - start
+        if begin + n <= self.capacity:
+            return self.data[begin:begin + n].copy()
+        return np.concatenate((self.data[begin:], self.data[:n - (self.capacity - begin)]))
+
+
+class VoiceActivityDetector:
+    """Energy and zero-crossing voice activity detection over fixed-size frames
+
+    A frame is speech if its RMS energy is ratio times the noise floor, or
+    half that with a zero-crossing rate typical of fricatives ("s", "f").
+    The noise floor is learned from the first frames and then tracks the
+    frames judged silent, so no per-press calibration is needed. Speech
+    starts after start_frames speech frames in a row and ends after
+    end_frames silent ones.
+    """
+
+    def __init__(self, ratio=3.0, min_rms=100.0, zcr_threshold=0.25, start_frames=3, end_frames=27,
+                 calibration_frames=10, adapt=0.05):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.zcr_threshold = zcr_threshold
+        self.start_frames = start_frames
+        self.end_frames = end_frames
+        self.calibration_frames = calibration_frames
+        self.adapt = adapt
+        self.noise = None
+        self.calibration = []
+        self.reset()
+
+    def reset(self):
+        self.triggered = False
+        self.run = 0
+        self.silence = 0
+
+    @staticmethod
+    def features(frame):
+        """(RMS energy, zero-crossing rate) of an int16 frame"""
+        x = frame.astype(np.float32)
+        rms = float(np.sqrt(np.dot(x, x) / len(x)))
+        signs = np.signbit(x)
+        zcr = float(np.count_nonzero(signs[1:] != signs[:-1])) / (len(x) - 1)
+        return rms, zcr
+
+    @property
+    def threshold(self):
+        return max(self.min_rms, self.ratio * (self.noise or 0.0))
+
+    def is_speech(self, rms, zcr):
+        threshold = self.threshold
+        return rms > threshold or (rms > threshold / 2 and zcr > self.zcr_threshold)
+
+    def update(self, frame):
+        """Feed one frame; returns 'start' or 'end' when a segment begins or ends, else None"""
+        rms, zcr = self.features(frame)
+        if self.noise is None:
+            self.calibration.append(rms)
+            if len(self.calibration) < self.calibration_frames:
+                return None
+            self.noise = float(np.median(self.calibration))
+            self.calibration = []
+            return None
+
+        speech = self.is_speech(rms, zcr)
+        if not speech and not self.triggered:
+            self.noise += self.adapt * (rms - self.noise)
+
+        if not self.triggered:
+            self.run = self.run + 1 if speech else 0
+            if self.run >= self.start_frames:
+                self.triggered = True
+                self.silence = 0
+                return 'start'
+            return None
+        self.silence = 0 if speech else self.silence + 1
+        if self.silence >= self.end_frames:
+            self.triggered = False
+            self.run = 0
+            return 'end'
+        return None
+
+
+class Segment:
+    """One stretch of detected speech, with its pre-roll"""
+
+    def __init__(self, samples, rate, started, ended):
+        self.samples = samples
+        self.rate = rate
+        self.started = started
+        self.ended = ended
+        self.captured = time.perf_counter()
+        # Filled in by a streaming recognizer: the text, or the exception it raised
+        self.result = None
+        self.result_time = None
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.rate
+
+    def audio_data(self):
+        """The segment as a speech_recognition AudioData"""
+        import speech_recognition as sr
+        return sr.AudioData(self.samples.tobytes(), self.rate, 2)
+
+    def save(self, path):
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.rate)
+            f.writeframes(self.samples.tobytes())
+
+
+class MicrophoneSource:
+    """16-bit mono frames from the default (or given) input device, via PyAudio
+
+    The device is opened once and read continuously; read() blocks until a
+    frame is ready, so an idle listener just waits on the driver.
+    """
+
+    def __init__(self, rate=SAMPLE_RATE, frame_seconds=FRAME_SECONDS, device_index=None):
+        self.rate = rate
+        self.frame_samples = int(rate * frame_seconds)
+        self.device_index = device_index
+        self.audio = None
+        self.stream = None
+
+    def open(self):
+        import pyaudio
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=pyaudio.paInt16, channels=1, rate=self.rate, input=True,
+                                      frames_per_buffer=self.frame_samples, input_device_index=self.device_index)
+
+    def read(self):
+        data = self.stream.read(self.frame_samples, exception_on_overflow=False)
+        return np.frombuffer(data, dtype=np.int16)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+        if self.audio is not None:
+            self.audio.terminate()
+        self.stream = self.audio = None
+
+
+class WavFileSource:
+    """Frames from a 16-bit WAV file in place of a microphone, for testing
+
+    With realtime, frames are delivered at the pace a microphone would
+    deliver them. read() returns None at the end of the file.
+    """
+
+    def __init__(self, path, frame_seconds=FRAME_SECONDS, realtime=True):
+        self.path = path
+        self.realtime = realtime
+        with wave.open(path, 'rb') as f:
+            if f.getsampwidth() != 2:
+                raise ValueError(f"{path} is not 16-bit PCM")
+            self.rate = f.getframerate()
+            self.channels = f.getnchannels()
+        self.frame_samples = int(self.rate * frame_seconds)
+        self.file = None
+        self.next_frame = None
+
+    def open(self):
+        self.file = wave.open(self.path, 'rb')
+        self.next_frame = time.perf_counter()
+
+    def read(self):
+        data = self.file.readframes(self.frame_samples)
+        if not data:
+            return None
+        samples = np.frombuffer(data, dtype=np.int16)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1).astype(np.int16)
+        if len(samples) < self.frame_samples:
+            samples = np.concatenate((samples, np.zeros(self.frame_samples - len(samples), dtype=np.int16)))
+        if self.realtime:
+            self.next_frame += self.frame_samples / self.rate
+            delay = self.next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return samples
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Listener:
+    """Always-on capture thread that hands detected speech segments to a recognizer
+
+    Every frame goes into a ring buffer and through the VAD; only the
+    segments it finds, with pre_roll seconds of audio from before speech
+    was detected, are queued for listen() or passed to on_segment. While
+    gate() returns False (say, while ORBIT itself is talking) frames are
+    still buffered but no speech is detected. Segments are cut at
+    max_seconds.
+
+    Given a recognizer that can stream (see orbit_asr), each segment is
+    fed to it frame by frame as it is spoken: on_partial receives the
+    words so far, and the final result is ready on the segment
+    (segment.result) as soon as speech ends.
+    """
+
+    def __init__(self, source, vad=None, pre_roll=0.3, post_roll=0.2, max_seconds=15.0, buffer_seconds=30.0,
+                 gate=None, on_segment=None, max_queue=8, recognizer=None, on_partial=None):
+        self.source = source
+        self.vad = vad or VoiceActivityDetector()
+        self.rate = source.rate
+        self.pre_roll = int(pre_roll * self.rate)
+        self.post_roll = int(post_roll * self.rate)
+        self.max_samples = int(max_seconds * self.rate)
+        self.ring = RingBuffer(int(max(buffer_seconds, max_seconds + pre_roll + 1) * self.rate))
+        self.gate = gate
+        self.on_segment = on_segment
+        self.segments = queue.Queue(maxsize=max_queue)
+        self.segment_start = None
+        self.recognizer = recognizer
+        self.on_partial = on_partial
+        self.stream = None
+        self.error = None
+        self.stopping = threading.Event()
+        self.finished = threading.Event()
+        self.thread = None
+        self.counts = {'frames': 0, 'segments': 0, 'dropped': 0, 'gated': 0}
+        self.speech_seconds = 0.0
+        self.started = None
+        self.cpu_seconds = 0.0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='listener', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+
+    @property
+    def in_speech(self):
+        return self.segment_start is not None
+
+    def _open_stream(self, start, position):
+        self.stream = self.recognizer.stream(self.rate) if self.recognizer is not None else None
+        if self.stream is not None:
+            self._feed(self.ring.read(max(start, self.ring.oldest), position))
+
+    def _feed(self, samples):
+        partial = self.stream.feed(samples)
+        if partial and self.on_partial is not None:
+            self.on_partial(partial)
+
+    def _emit(self, start, end):
+        start = max(start, self.ring.oldest)
+        samples = self.ring.read(start, end)
+        segment = Segment(samples, self.rate, start / self.rate, end / self.rate)
+        if self.stream is not None:
+            # Recognition errors belong to the segment, not the capture thread
+            try:
+                segment.result = self.stream.finish()
+            except Exception as e:
+                segment.result = e
+            segment.result_time = time.perf_counter()
+            self.stream = None
+        self.counts['segments'] += 1
+        self.speech_seconds += segment.duration
+        if self.on_segment is not None:
+            self.on_segment(segment)
+            return
+        try:
+            self.segments.put_nowait(segment)
+        except queue.Full:
+            # Nobody is listening; the oldest speech is the least useful
+            self.segments.get_nowait()
+            self.segments.put_nowait(segment)
+            self.counts['dropped'] += 1
+
+    def _run(self):
+        self.started = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            self.source.open()
+            while not self.stopping.is_set():
+                frame = self.source.read()
+                if frame is None:
+                    break
+                position = self.ring.write(frame)
+                self.counts['frames'] += 1
+                self.cpu_seconds = time.thread_time() - cpu_start
+                if self.gate is not None and not self.gate():
+                    if self.vad.triggered or self.segment_start is not None:
+                        self.vad.reset()
+                        self.segment_start = None
+                        self.stream = None
+                    self.counts['gated'] += 1
+                    continue
+
+                event = self.vad.update(frame)
+                if event == 'start':
+                    self.segment_start = position - self.vad.run * len(frame) - self.pre_roll
+                    self._open_stream(self.segment_start, position)
+                    continue
+                if self.stream is not None:
+                    self._feed(frame)
+                if event == 'end':
+                    speech_end = min(position, position - self.vad.end_frames * len(frame) + self.post_roll)
+                    if speech_end > self.segment_start:
+                        self._emit(self.segment_start, speech_end)
+                    else:
+                        # Speech ended before the last max_seconds cut, so only silence is left
+                        self.stream = None
+                    self.segment_start = None
+                elif self.segment_start is not None and position - self.segment_start >= self.max_samples:
+                    self._emit(self.segment_start, position)
+                    self.segment_start = position
+                    self._open_stream(position, position)
+        except Exception as e:
+            self.error = e
+        finally:
+            # Speech still going when the input ends is not lost
+            if self.segment_start is not None and self.error is None:
+                self._emit(self.segment_start, self.ring.written)
+                self.segment_start = None
+            self.source.close()
+            self.finished.set()
+
+    def listen(self, timeout=None):
+        """The next speech segment, or None if nobody starts talking within timeout seconds
+
+        Speech already under way when the timeout passes is waited for.
+        Raises the capture error if the input device failed.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            try:
+                return self.segments.get(timeout=0.05)
+            except queue.Empty:
+                pass
+            if self.error is not None:
+                raise self.error
+            if self.finished.is_set() and self.segments.empty():
+                return None
+            if deadline is not None and time.perf_counter() > deadline and not self.in_speech:
+                return None
+
+    def flush(self):
+        """Forget segments nobody asked for yet"""
+        while True:
+            try:
+                self.segments.get_nowait()
+            except queue.Empty:
+                return
+
+    def metrics(self):
+        wall = time.perf_counter() - self.started if self.started else 0.0
+        return dict(self.counts, speech_seconds=self.speech_seconds, wall_seconds=wall,
+                    cpu_percent=100 * self.cpu_seconds / wall if wall else 0.0,
+                    noise_rms=self.vad.noise, queued=self.segments.qsize())
+
+
+def synthesize_test_wav(path, rate=SAMPLE_RATE, utterances=((1.0, 1.2), (3.5, 0.8), (5.5, 2.0)), seconds=8.0,
+                        noise=60, seed=0):
+    """Write a WAV of background noise with voice-like bursts at (start, length) seconds"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    signal = rng.normal(0, noise, len(t))
+    for start, length in utterances:
+        inside = (t >= start) & (t < start + length)
+        local = t[inside] - start
+        # A few harmonics of a wobbling pitch, shaped into syllables
+        pitch = 140 + 20 * np.sin(2 * np.pi * 3 * local)
+        phase = 2 * np.pi * np.cumsum(pitch) / rate
+        voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+        syllables = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * local - np.pi / 2)
+        signal[inside] += 3000 * voice * syllables
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(np.clip(signal, -32768, 32767).astype(np.int16).tobytes())
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find speech segments in a WAV file or from the microphone")
+    parser.add_argument('wav', nargs='?', help="16-bit WAV file (default: a synthetic test recording)")
+    parser.add_argument('--mic', action='store_true', help="Listen to the microphone instead")
+    parser.add_argument('--seconds', type=float, default=20, help="How long to listen to the microphone")
+    parser.add_argument('--fast', action='store_true', help="Read the file as fast as possible")
+    parser.add_argument('--save', help="Write each segment as PREFIX-N.wav")
+    args = parser.parse_args()
+
+    if args.mic:
+        source = MicrophoneSource()
+    else:
+        path = args.wav
+        if path is None:
+            import os
+            import tempfile
+            path = synthesize_test_wav(os.path.join(tempfile.mkdtemp(), 'orbit_listen_test.wav'))
+        source = WavFileSource(path, realtime=not args.fast)
+
+    listener = Listener(source).start()
+    deadline = time.perf_counter() + args.seconds if args.mic else None
+    number = 0
+    while deadline is None or time.perf_counter() < deadline:
+        segment = listener.listen(timeout=1)
+        if segment is None:
+            if listener.finished.is_set():
+                break
+            continue
+        number += 1
+        print(f"segment {number}: {segment.started:6.2f}-{segment.ended:6.2f} s ({segment.duration:.2f} s), "
+              f"delivered {segment.captured - listener.started - segment.ended:+.2f} s after it ended")
+        if args.save:
+            segment.save(f"{args.save}-{number}.wav")
+    listener.stop()
+    listener.finished.wait(2)
+    for key, value in listener.metrics().items():
+        print(f"  {key:<15} {value:.3f}" if isinstance(value, float) else f"  {key:<15} {value}")
@@ -0,0 +1,379 @@
+import argparse
+import http.client
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from orbit_ai import ChatSession, DEFAULT_MODEL, InferenceWorker, ModelLoader, ResponseStream
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_SESSIONS = 16
+
+
+class ModelServer:
+    """One loaded model shared by every ORBIT window over localhost HTTP
+
+    GET /health reports the load state. POST /generate streams the reply as
+    NDJSON lines: {"token": ...} for each token, then {"done": true, ...}
+    with metrics or {"error": ...}. A request naming a session continues
+    that conversation in a server-side ChatSession. Closing the connection
+    or POST /cancel stops a generation.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, device='cpu', max_queue=8, idle_exit=None):
+        self.loader = ModelLoader(model_name, device).start()
+        self.worker = InferenceWorker(self.loader, max_queue=max_queue)
+        self.sessions = OrderedDict()
+        self.active_session = None
+        self.requests = {}
+        self.idle_exit = idle_exit
+        self.last_request = time.time()
+        self.lock = threading.Lock()
+        self.httpd = None
+
+    def health(self):
+        model = self.loader.model
+        return {
+            'state': self.loader.state,
+            'model': self.loader.model_name,
+            'error': str(self.loader.error) if self.loader.error else None,
+            'system_prompt': getattr(model, 'config', {}).get('systemPrompt', '') if model else '',
+            'pid': os.getpid(),
+            'warmup': self.loader.warmup_metrics,
+            'queue': self.worker.metrics()
+        }
+
+    def _session(self, session_id, system_prompt):
+        """Find or create a conversation, evicting the least recently used"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = ChatSession(system_prompt=system_prompt)
+                self.sessions[session_id] = session
+                while len(self.sessions) > MAX_SESSIONS:
+                    _, evicted = self.sessions.popitem(last=False)
+                    if evicted is self.active_session:
+                        self.active_session = None
+            self.sessions.move_to_end(session_id)
+            return session
+
+    def submit(self, body):
+        """Queue a generation and return (request, stream); raises queue.Full under load"""
+        prompt = body['prompt']
+        options = {key: body[key] for key in ('max_tokens', 'temp', 'top_k', 'top_p', 'repeat_penalty')
+                   if key in body}
+        session_id = body.get('session')
+        session = self._session(session_id, body.get('system_prompt')) if session_id else None
+        stream = ResponseStream()
+
+        def run(model, request):
+            if model is None:
+                stream.error = RuntimeError(f"model failed to load: {self.loader.error}")
+                stream.tokens.put(None)
+                return
+            if session is None:
+                stream.feed(model, prompt, cancel=request.cancel_event, **options)
+                return
+            # GPT4All holds one chat at a time; the session switched away from is reopened later
+            if self.active_session is not None and self.active_session is not session:
+                self.active_session.close()
+            self.active_session = session
+            try:
+                session.respond(model, prompt, stream=stream, cancel=request.cancel_event, **options)
+            except Exception as e:
+                # Failures inside feed() have already ended the stream
+                if stream.ended is None:
+                    stream.error = e
+                    stream.tokens.put(None)
+
+        request = self.worker.submit(run, label=body.get('id'))
+        if body.get('id'):
+            with self.lock:
+                self.requests[body['id']] = request
+        return request, stream
+
+    def cancel(self, request_id):
+        with self.lock:
+            request = self.requests.get(request_id)
+        if request is None:
+            return False
+        request.cancel()
+        return True
+
+    def finished(self, request_id):
+        with self.lock:
+            self.requests.pop(request_id, None)
+            self.last_request = time.time()
+
+    def _watch_idle(self):
+        while True:
+            time.sleep(30)
+            with self.lock:
+                idle = time.time() - self.last_request
+                busy = bool(self.requests)
+            if not busy and self.worker.depth == 0 and idle > self.idle_exit:
+                self.httpd.shutdown()
+                return
+
+    def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _json(self, status, data):
+                payload = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length', 0))
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def do_GET(self):
+                if self.path == '/health':
+                    self._json(200, server.health())
+                else:
+                    self._json(404, {'error': 'not found'})
+
+            def do_POST(self):
+                try:
+                    body = self._body()
+                except ValueError:
+                    self._json(400, {'error': 'invalid JSON'})
+                    return
+
+                if self.path == '/cancel':
+                    self._json(200, {'cancelled': server.cancel(body.get('id'))})
+                    return
+                if self.path != '/generate' or not isinstance(body.get('prompt'), str):
+                    self._json(400, {'error': 'POST /generate needs a prompt'})
+                    return
+
+                try:
+                    request, stream = server.submit(body)
+                except queue.Full as e:
+                    self._json(503, {'error': str(e)})
+                    return
+
+                # No Content-Length: the reply streams until the connection closes
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.end_headers()
+                try:
+                    while True:
+                        token = stream.tokens.get()
+                        if token is None:
+                            break
+                        self.wfile.write(json.dumps({'token': token}).encode('utf-8') + b'\n')
+                        self.wfile.flush()
+                    if stream.error:
+                        final = {'error': str(stream.error)}
+                    else:
+                        final = dict(stream.metrics(), done=True, cancelled=stream.cancelled,
+                                     queue_wait=request.wait_seconds)
+                    self.wfile.write(json.dumps(final).encode('utf-8') + b'\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client went away, so stop spending CPU on its answer
+                    request.cancel()
+                finally:
+                    server.finished(body.get('id'))
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        if self.idle_exit:
+            threading.Thread(target=self._watch_idle, daemon=True).start()
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+
+
+class RemoteModel:
+    """Client for ModelServer with GPT4All's generate and chat_session interface
+
+    It can stand in for a GPT4All model anywhere in ORBIT: ResponseStream,
+    ChatSession and InferenceWorker use it unchanged.
+    """
+
+    # The server's ChatSession compacts the conversation against the real context window
+    compacts_context = True
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=600):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.session = None
+        self.system_prompt = None
+        self.config = {}
+        self.last_metrics = None
+        self.warmup_metrics = None
+        # What connect() was given, to start the server again if it goes away
+        self.model_name = DEFAULT_MODEL
+        self.device = 'cpu'
+        self.autostart = False
+        self.wait = 600
+        self.restart_lock = threading.Lock()
+
+    def _connection(self, timeout=None):
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout or self.timeout)
+
+    def health(self):
+        """The server's /health reply, or None if nothing is listening"""
+        connection = self._connection(timeout=2)
+        try:
+            connection.request('GET', '/health')
+            return json.loads(connection.getresponse().read())
+        except (OSError, ValueError, http.client.HTTPException):
+            return None
+        finally:
+            connection.close()
+
+    def connect(self, model_name=DEFAULT_MODEL, device='cpu', autostart=True, wait=600):
+        """Wait for a server to have its model ready, starting one if none is running
+
+        With autostart, a server that has since exited while idle or
+        crashed is started again on the next request.
+        """
+        self.model_name = model_name
+        self.device = device
+        self.autostart = autostart
+        self.wait = wait
+        health = self.health()
+        if health is None and autostart:
+            start_server(model_name, device, self.port)
+        return self._wait_ready(wait)
+
+    def _wait_ready(self, wait):
+        health = None
+        deadline = time.time() + wait
+        while time.time() < deadline:
+            health = self.health()
+            if health is not None and health['state'] != 'loading':
+                break
+            time.sleep(0.5)
+        if health is None:
+            raise ConnectionError(f"No ORBIT model server on {self.host}:{self.port}")
+        if health['state'] != 'ready':
+            raise RuntimeError(f"Model server could not load its model: {health.get('error')}")
+        self.config = {'systemPrompt': health.get('system_prompt', '')}
+        # The server's own warm-up measures the machine the tokens are generated on
+        self.warmup_metrics = health.get('warmup')
+        return self
+
+    @contextmanager
+    def chat_session(self, system_prompt=None, prompt_template=None):
+        """Continue one server-side conversation until the block exits"""
+        self.session = uuid.uuid4().hex
+        self.system_prompt = system_prompt
+        try:
+            yield self
+        finally:
+            self.session = None
+            self.system_prompt = None
+
+    def restart(self):
+        """Start the server again and wait for its model, unless another thread already did"""
+        with self.restart_lock:
+            if self.health() is None:
+                start_server(self.model_name, self.device, self.port)
+            return self._wait_ready(self.wait)
+
+    def _post(self, path, body):
+        connection = self._connection()
+        try:
+            connection.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+            return connection, connection.getresponse()
+        except BaseException:
+            connection.close()
+            raise
+
+    def _stream(self, prompt, callback, **options):
+        body = dict(options, prompt=prompt, id=uuid.uuid4().hex)
+        if self.session:
+            body.update(session=self.session, system_prompt=self.system_prompt)
+        try:
+            connection, response = self._post('/generate', body)
+        except (ConnectionRefusedError, ConnectionResetError):
+            if not self.autostart:
+                raise
+            # Nothing was generated yet, so the request can be retried once on a fresh server;
+            # a server-side conversation starts over there
+            self.restart()
+            connection, response = self._post('/generate', body)
+        try:
+            if response.status != 200:
+                raise RuntimeError(json.loads(response.read()).get('error', f"HTTP {response.status}"))
+            index = 0
+            for line in response:
+                message = json.loads(line)
+                if 'error' in message:
+                    raise RuntimeError(message['error'])
+                if message.get('done'):
+                    self.last_metrics = message
+                    return
+                token = message['token']
+                yield token
+                if callback is not None and callback(index, token) is False:
+                    # Closing the connection makes the server cancel the generation
+                    return
+                index += 1
+        finally:
+            connection.close()
+
+    def generate(self, prompt, max_tokens=200, streaming=False, callback=None, **kwargs):
+        tokens = self._stream(prompt, callback, max_tokens=max_tokens, **kwargs)
+        if streaming:
+            return tokens
+        return ''.join(tokens)
+
+
+def start_server(model_name=DEFAULT_MODEL, device='cpu', port=DEFAULT_PORT, idle_exit=1800):
+    """Launch a detached server process that outlives the window that started it"""
+    command = [sys.executable, os.path.abspath(__file__), '--model', model_name, '--port', str(port),
+               '--idle-exit', str(idle_exit)]
+    if device:
+        command += ['--device', device]
+    options = {}
+    if os.name == 'nt':
+        options['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        options['start_new_session'] = True
+    # The child keeps its own copy of the handle, so the parent's can be closed right away
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'orbit_model_server.log'), 'ab') as log:
+        return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=log, stderr=log, **options)
+
+
+def remote_factory(port=DEFAULT_PORT, autostart=True):
+    """A ModelLoader factory that connects to (or starts) the shared server"""
+    def factory(model_name, device):
+        return RemoteModel(port=port).connect(model_name, device, autostart=autostart)
+    return factory
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve one GPT4All model to every ORBIT window")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="GPT4All model file, or 'fake' for tests")
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-queue', type=int, default=8)
+    parser.add_argument('--idle-exit', type=float, default=None,
+                        help="Exit after this many seconds without requests")
+    args = parser.parse_args()
+
+    print(f"ORBIT model server on http://{args.host}:{args.port} serving {args.model}", flush=True)
+    ModelServer(args.model, args.device, args.max_queue, args.idle_exit).serve(args.host, args.port)
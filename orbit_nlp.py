@@ -0,0 +1,267 @@
+import argparse
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Compiled once instead of on every query
+NON_ALPHA_RE = re.compile(r'[^a-zA-Z\s]')
+
+
+class TextPreprocessor:
+    """Lowercase, strip, tokenize and lemmatize text with memoization"""
+
+    def __init__(self, stop_words=None, lemmatizer=None, tokenizer=None, resources=None, cache_size=4096,
+                 lemma_cache_size=50000):
+        # Anything not passed in is fetched from resources on the first miss
+        self.stop_words = stop_words
+        self.lemmatizer = lemmatizer
+        self.tokenizer = tokenizer
+        self.resources = resources
+        self.cache_size = cache_size
+        self.lemma_cache_size = lemma_cache_size
+        self.cache = OrderedDict()
+        self.lemma_cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lemmatize(self, token):
+        """Lemmatize a single token, remembering the result"""
+        lemma = self.lemma_cache.get(token)
+        if lemma is None:
+            lemma = self.lemmatizer.lemmatize(token)
+            if len(self.lemma_cache) >= self.lemma_cache_size:
+                self.lemma_cache.clear()
+            self.lemma_cache[token] = lemma
+        return lemma
+
+    def _process(self, text):
+        """Run the uncached pipeline"""
+        if self.stop_words is None:
+            self.stop_words = self.resources.get('stop_words')
+        if self.lemmatizer is None:
+            self.lemmatizer = self.resources.get('lemmatizer')
+        if self.tokenizer is None:
+            self.tokenizer = self.resources.get('tokenizer')
+
+        text = NON_ALPHA_RE.sub('', text.lower())
+        # word_tokenize, not split(): it breaks up words like "cannot" and "gonna"
+        tokens = self.tokenizer(text)
+        return ' '.join(self.lemmatize(token) for token in tokens if token not in self.stop_words)
+
+    def preprocess(self, text):
+        """Preprocess one string, served from the LRU cache when seen before"""
+        with self.lock:
+            result = self.cache.get(text)
+            if result is not None:
+                self.cache.move_to_end(text)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = self._process(text)
+
+        with self.lock:
+            self.cache[text] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    def preprocess_many(self, texts):
+        """Preprocess a batch, running the pipeline once per distinct string"""
+        results = {}
+        for text in texts:
+            if text not in results:
+                results[text] = self.preprocess(text)
+        return [results[text] for text in texts]
+
+    def cache_info(self):
+        """Return hit/miss counts and current cache sizes"""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self.cache),
+                'lemmas': len(self.lemma_cache)
+            }
+
+
+def sentiment_label(polarity):
+    """Map a polarity score to ORBIT's positive/negative/neutral label"""
+    if polarity > 0.1:
+        return 'positive'
+    elif polarity < -0.1:
+        return 'negative'
+    else:
+        return 'neutral'
+
+
+class Annotation:
+    """Linguistic annotations for one utterance, each computed on first access"""
+
+    def __init__(self, text, resources, entity_extractor=None, preprocessor=None):
+        self.text = text
+        self.resources = resources
+        self.entity_extractor = entity_extractor
+        self.preprocessor = preprocessor
+        self.values = {}
+        self.timings = {}
+        self.hits = {}
+
+    def _stage(self, name, compute):
+        """Compute a stage on first access, recording its duration and later hits"""
+        if name in self.values:
+            self.hits[name] += 1
+        else:
+            start = time.perf_counter()
+            self.values[name] = compute()
+            self.timings[name] = time.perf_counter() - start
+            self.hits[name] = 0
+        return self.values[name]
+
+    @property
+    def processed(self):
+        """Lowercased, lemmatized text without stop words, for knowledge base lookups"""
+        if self.preprocessor is None:
+            self.preprocessor = TextPreprocessor(resources=self.resources)
+        return self._stage('processed', lambda: self.preprocessor.preprocess(self.text))
+
+    @property
+    def tokens(self):
+        return self._stage('tokens', lambda: self.resources.get('tokenizer')(self.text))
+
+    @property
+    def lower_tokens(self):
+        return self._stage('lower_tokens', lambda: [token.lower() for token in self.tokens])
+
+    @property
+    def words(self):
+        """Lowercase tokens without punctuation, like TextBlob.words"""
+        return self._stage('words', lambda: [
+            token for token in self.lower_tokens if any(c.isalnum() for c in token)
+        ])
+
+    @property
+    def pos_tags(self):
+        return self._stage('pos_tags', lambda: self.resources.get('tagger')(self.tokens))
+
+    @property
+    def lower_pos_tags(self):
+        """POS tags of the lowercased text, which the handlers were written against"""
+        return self._stage('lower_pos_tags', lambda: self.resources.get('tagger')(self.lower_tokens))
+
+    @property
+    def entities(self):
+        if self.entity_extractor is None:
+            return self._stage('entities', self.nltk_entities)
+        return self._stage('entities', lambda: self.entity_extractor.extract(self))
+
+    @property
+    def polarity(self):
+        def _polarity():
+            from textblob import TextBlob
+            return TextBlob(self.text).sentiment.polarity
+        return self._stage('polarity', _polarity)
+
+    @property
+    def sentiment(self):
+        return sentiment_label(self.polarity)
+
+    def nltk_entities(self):
+        """Proper nouns plus NLTK ne_chunk entities, from the shared POS tags"""
+        from nltk.tree import Tree
+
+        entities = [(word, 'PERSON') for word, pos in self.pos_tags if pos in ('NNP', 'NNPS')]
+        for chunk in self.resources.get('ne_chunker')(self.pos_tags):
+            if isinstance(chunk, Tree):
+                entities.append((' '.join(c[0] for c in chunk), chunk.label()))
+        return list(set(entities))
+
+    def timing_report(self):
+        """One line per stage: the time of its single computation and how many later accesses reused it"""
+        return ', '.join(
+            f"{name} {seconds * 1000:.1f} ms +{self.hits[name]} hits"
+            for name, seconds in self.timings.items()
+        )
+
+
+def _legacy_preprocess(text, stop_words, lemmatizer):
+    """The original per-call pipeline, kept for benchmark comparison"""
+    from nltk.tokenize import word_tokenize
+
+    text = text.lower()
+    text = re.sub(r'[^a-zA-Z\s]', '', text)
+    tokens = word_tokenize(text)
+    tokens = [lemmatizer.lemmatize(token) for token in tokens if token not in stop_words]
+    return ' '.join(tokens)
+
+
+def _synthetic_log(count, seed=0):
+    """Build a query log with the repetition seen in real usage"""
+    rng = random.Random(seed)
+    common = [
+        "what time is it",
+        "what is the date today",
+        "open notepad",
+        "calculate 12 * 7",
+        "remind me in 5 minutes to stretch",
+        "tell me a joke",
+        "what can you do",
+        # word_tokenize splits these where whitespace doesn't
+        "i cannot find my notes",
+        "gonna need a timer",
+        "gimme the weather",
+        "lemme see my tasks",
+        "wanna hear a joke"
+    ]
+    subjects = ['groceries', 'report', 'meeting notes', 'dentist', 'invoice', 'slides', 'laundry']
+    log = []
+    for _ in range(count):
+        if rng.random() < 0.7:
+            log.append(rng.choice(common))
+        else:
+            log.append(f"add task {rng.choice(subjects)} {rng.randint(1, 500)}")
+    return log
+
+
+def benchmark(count=5000):
+    """Report queries per second of the original pipeline against TextPreprocessor"""
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+    from nltk.tokenize import word_tokenize
+
+    stop_words = set(stopwords.words('english'))
+    lemmatizer = WordNetLemmatizer()
+    log = _synthetic_log(count)
+
+    # Warm WordNet so neither side pays its lazy load
+    lemmatizer.lemmatize('warmup')
+
+    start = time.perf_counter()
+    expected = [_legacy_preprocess(text, stop_words, lemmatizer) for text in log]
+    before = count / (time.perf_counter() - start)
+
+    preprocessor = TextPreprocessor(stop_words, lemmatizer, word_tokenize)
+    start = time.perf_counter()
+    single = [preprocessor.preprocess(text) for text in log]
+    after = count / (time.perf_counter() - start)
+
+    preprocessor = TextPreprocessor(stop_words, lemmatizer, word_tokenize)
+    start = time.perf_counter()
+    batched = preprocessor.preprocess_many(log)
+    after_batch = count / (time.perf_counter() - start)
+
+    assert expected == single == batched
+    print(f"{'pipeline':<24} {'queries/s':>12}")
+    print(f"{'original':<24} {before:>12.0f}")
+    print(f"{'cached preprocess':<24} {after:>12.0f}")
+    print(f"{'preprocess_many':<24} {after_batch:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ORBIT text preprocessing benchmark")
+    parser.add_argument('--queries', type=int, default=5000)
+    args = parser.parse_args()
+    benchmark(args.queries)
@@ -0,0 +1,136 @@
+import threading
+import time
+
+# Download name -> data paths that satisfy it (newer NLTK releases renamed some packages)
+NLTK_DATA_PATHS = {
+    'punkt': ['tokenizers/punkt_tab', 'tokenizers/punkt'],
+    'stopwords': ['corpora/stopwords'],
+    'wordnet': ['corpora/wordnet', 'corpora/wordnet.zip'],
+    'averaged_perceptron_tagger': ['taggers/averaged_perceptron_tagger_eng', 'taggers/averaged_perceptron_tagger'],
+    'maxent_ne_chunker': ['chunkers/maxent_ne_chunker_tab', 'chunkers/maxent_ne_chunker'],
+    'words': ['corpora/words']
+}
+
+# Packages to fetch when a resource is missing, newest name first
+NLTK_DOWNLOAD_NAMES = {
+    'punkt': ['punkt_tab', 'punkt'],
+    'averaged_perceptron_tagger': ['averaged_perceptron_tagger_eng', 'averaged_perceptron_tagger'],
+    'maxent_ne_chunker': ['maxent_ne_chunker_tab', 'maxent_ne_chunker']
+}
+
+
+def _load_tokenizer():
+    from nltk.tokenize import word_tokenize
+    word_tokenize("Warm up the tokenizer.")
+    return word_tokenize
+
+
+def _load_stop_words():
+    from nltk.corpus import stopwords
+    return set(stopwords.words('english'))
+
+
+def _load_lemmatizer():
+    from nltk.stem import WordNetLemmatizer
+    lemmatizer = WordNetLemmatizer()
+    # WordNet itself is only read on the first lemmatize call
+    lemmatizer.lemmatize('warming')
+    return lemmatizer
+
+
+def _load_tagger():
+    from nltk import pos_tag
+    pos_tag(['warm', 'up'])
+    return pos_tag
+
+
+def _load_ne_chunker():
+    from nltk import ne_chunk
+    ne_chunk([('ORBIT', 'NNP')])
+    return ne_chunk
+
+
+# Feature -> (NLTK resources it needs, loader returning the ready object)
+FEATURES = {
+    'tokenizer': (['punkt'], _load_tokenizer),
+    'stop_words': (['stopwords'], _load_stop_words),
+    'lemmatizer': (['wordnet'], _load_lemmatizer),
+    'tagger': (['averaged_perceptron_tagger'], _load_tagger),
+    'ne_chunker': (['maxent_ne_chunker', 'words'], _load_ne_chunker)
+}
+
+
+class NLTKResources:
+    """Check for NLTK data once and load each feature the first time it is used
+
+    Missing data is only downloaded with allow_download, so an offline
+    launch never waits on the network.
+    """
+
+    def __init__(self, allow_download=False):
+        self.allow_download = allow_download
+        self.found = {}
+        self.loaded = {}
+        self.timings = {}
+        self.lock = threading.RLock()
+
+    def available(self, resource):
+        """Whether the NLTK data for resource is installed, checked once"""
+        if resource not in self.found:
+            import nltk
+            self.found[resource] = False
+            for path in NLTK_DATA_PATHS.get(resource, [resource]):
+                try:
+                    nltk.data.find(path)
+                    self.found[resource] = True
+                    break
+                except LookupError:
+                    continue
+        return self.found[resource]
+
+    def missing(self):
+        """The resources some feature needs that are not installed"""
+        needed = dict.fromkeys(resource for resources, _ in FEATURES.values() for resource in resources)
+        return [resource for resource in needed if not self.available(resource)]
+
+    def download(self, resource):
+        """Fetch resource, trying each package name until one provides it; True if it is now installed"""
+        import nltk
+        for name in NLTK_DOWNLOAD_NAMES.get(resource, [resource]):
+            nltk.download(name, quiet=True)
+            self.found.pop(resource, None)
+            if self.available(resource):
+                return True
+        return False
+
+    def ensure(self, resource):
+        """Make sure resource is installed, downloading only if allowed and missing"""
+        if self.available(resource):
+            return
+        if self.allow_download and self.download(resource):
+            return
+        raise LookupError(f"NLTK resource '{resource}' is not installed")
+
+    def get(self, feature):
+        """Return the loaded object for feature, loading it on first use"""
+        with self.lock:
+            if feature in self.loaded:
+                return self.loaded[feature]
+
+            resources, loader = FEATURES[feature]
+            start = time.perf_counter()
+            for resource in resources:
+                self.ensure(resource)
+            self.loaded[feature] = loader()
+            self.timings[feature] = time.perf_counter() - start
+            return self.loaded[feature]
+
+    def report(self, launch_seconds=None):
+        """Describe how long each loaded feature took, optionally as a share of launch"""
+        lines = []
+        for feature, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            line = f"{feature}: {seconds * 1000:.0f} ms"
+            if launch_seconds:
+                line += f" ({seconds / launch_seconds:.0%} of launch)"
+            lines.append(line)
+        return lines
@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from orbit_nlp import sentiment_label
+
+NEGATIONS = ('no', 'not', "n't", 'never')
+LABELS = np.array(['negative', 'neutral', 'positive'])
+
+# Token categories for the flattened token stream
+OTHER, KNOWN, NEGATION, EMOTICON, BANG = range(5)
+
+
+class SentimentLexicon:
+    """TextBlob's polarity lexicon compiled into NumPy arrays for batch scoring"""
+
+    def __init__(self, words, emoticons, negations=NEGATIONS):
+        # words: {word: (polarity, intensity, is_modifier)}, emoticons: {token: polarity}
+        self.index = {word: i for i, word in enumerate(words)}
+        self.polarity = np.array([words[w][0] for w in words], dtype=np.float64)
+        self.intensity = np.array([words[w][1] for w in words], dtype=np.float64)
+        self.modifier = np.array([words[w][2] for w in words], dtype=bool)
+        self.ly_modifier = np.array([w.endswith('ly') for w in words], dtype=bool)
+        self.emoticons = emoticons
+        self.negations = set(negations)
+
+    @classmethod
+    def from_textblob(cls):
+        """Compile the English lexicon shipped with TextBlob"""
+        from textblob._text import EMOTICONS
+        from textblob.en import sentiment
+
+        sentiment.load()
+        words = {}
+        for word, entries in dict.items(sentiment):
+            # Plain strings are scored with pos=None, which holds the averaged entry
+            p, _, i = entries[None]
+            words[word] = (p, i, 'RB' in entries)
+
+        emoticons = {'(!)': 0.0}
+        for (_, p), faces in EMOTICONS.items():
+            for face in faces:
+                emoticons.setdefault(face.lower(), p)
+        return cls(words, emoticons)
+
+    def encode(self, tokens):
+        """Return (category, lexicon row, emoticon polarity, length, length without quotes) arrays"""
+        count = len(tokens)
+        category = np.full(count, OTHER, dtype=np.int8)
+        rows = np.zeros(count, dtype=np.int64)
+        face = np.zeros(count, dtype=np.float64)
+        length = np.fromiter((len(t) for t in tokens), dtype=np.int64, count=count)
+        stripped = np.fromiter((len(t.strip("'")) for t in tokens), dtype=np.int64, count=count)
+        for position, token in enumerate(tokens):
+            row = self.index.get(token)
+            if row is not None:
+                category[position] = KNOWN
+                rows[position] = row
+            elif token in self.negations:
+                category[position] = NEGATION
+            elif token == '!':
+                category[position] = BANG
+            elif token in self.emoticons:
+                category[position] = EMOTICON
+                face[position] = self.emoticons[token]
+        return category, rows, face, length, stripped
+
+
+_lexicon = None
+
+
+def get_lexicon():
+    """The compiled TextBlob lexicon, built once per process"""
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = SentimentLexicon.from_textblob()
+    return _lexicon
+
+
+def tokenize(text):
+    """Lowercase tokens exactly as TextBlob splits a string before scoring it"""
+    from textblob.en import parser
+    return ' '.join(parser.find_tokens(text)).lower().split()
+
+
+def _previous(mask, starts):
+    """For each position, the index of the last earlier position in mask within the same message, else -1"""
+    index = np.arange(len(mask))
+    last = np.maximum.accumulate(np.where(mask, index, -1))
+    previous = np.concatenate(([-1], last[:-1]))
+    return np.where(previous >= starts, previous, -1)
+
+
+def score_tokens(token_lists, lexicon=None):
+    """Polarity of each tokenized message, matching TextBlob's pattern analyzer rules
+
+    Every known word opens an assessment unless it follows a modifier such as
+    "very", which scales it instead. A preceding negation flips and halves the
+    assessment and each trailing "!" boosts it by 25%. A message scores the mean
+    of its assessments. All rules run as array operations over the flattened
+    token stream of the whole batch.
+    """
+    lexicon = lexicon or get_lexicon()
+    lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+    if not lengths.sum():
+        return np.zeros(len(token_lists))
+
+    flat = [token for tokens in token_lists for token in tokens]
+    category, rows, face, length, stripped = lexicon.encode(flat)
+    message = np.repeat(np.arange(len(token_lists)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    known = category == KNOWN
+    negation = category == NEGATION
+    modifier = known & lexicon.modifier[rows]
+    ly_modifier = modifier & lexicon.ly_modifier[rows]
+
+    # "really not good": a negation right after an -ly modifier negates that
+    # modifier's assessment and leaves the modifier in effect
+    long_unknown = ~known & (length > 2)
+    previous_word = _previous(known | long_unknown, starts)
+    absorbed = negation & (previous_word >= 0) & ly_modifier[np.maximum(previous_word, 0)]
+
+    # A modifier carries over to the next known word unless a long unknown token intervenes
+    resets_modifier = known | (long_unknown & ~absorbed)
+    previous_word = _previous(resets_modifier, starts)
+    merged = known & (previous_word >= 0) & modifier[np.maximum(previous_word, 0)]
+
+    # A negation applies to the next known word unless another word intervenes
+    active_negation = negation & ~absorbed
+    resets_negation = known | active_negation | (~known & (stripped > 1))
+    previous_word = _previous(resets_negation, starts)
+    negated = known & (previous_word >= 0) & active_negation[np.maximum(previous_word, 0)]
+
+    # Group tokens into assessments
+    opens = (known & ~merged) | (category == EMOTICON)
+    group = np.cumsum(opens) - 1
+    member = known | (category == EMOTICON)
+    n_groups = int(opens.sum())
+    if not n_groups:
+        return np.zeros(len(token_lists))
+
+    # A merged word is scaled by the previous word's intensity, inverted if that word was negated
+    intensity = lexicon.intensity[rows]
+    intensity = np.where(negated, 1.0 / intensity, intensity)
+    previous_member = _previous(member, starts)
+    scale = np.where(merged, intensity[np.maximum(previous_member, 0)], 1.0)
+    value = np.where(known, np.clip(lexicon.polarity[rows] * scale, -1.0, 1.0), face)
+
+    # The last member of each group sets its polarity
+    last_member = np.full(n_groups, -1, dtype=np.int64)
+    np.maximum.at(last_member, group[member], np.flatnonzero(member))
+    polarity = value[last_member]
+
+    # Exclamation marks after a group's last member, before the next group opens
+    group_message = message[last_member]
+    owner = np.maximum(group, 0)
+    bang = ((category == BANG) & (group >= 0) & (group_message[owner] == message)
+            & (np.arange(len(flat)) > last_member[owner]))
+    bangs = np.bincount(group[bang], minlength=n_groups)
+    polarity = np.clip(polarity * 1.25 ** bangs, -1.0, 1.0)
+
+    group_negated = np.zeros(n_groups, dtype=bool)
+    group_negated[group[negated]] = True
+    absorbed_into = _previous(known, starts)[absorbed]
+    group_negated[group[absorbed_into]] = True
+    polarity = np.where(group_negated, polarity * -0.5, polarity)
+
+    totals = np.bincount(group_message, weights=polarity, minlength=len(token_lists))
+    counts = np.bincount(group_message, minlength=len(token_lists))
+    return totals / np.maximum(counts, 1)
+
+
+def _score_chunk(messages):
+    # Logs repeat themselves a lot, so tokenize and score each distinct message once
+    distinct = {text: i for i, text in enumerate(dict.fromkeys(messages))}
+    scores = score_tokens([tokenize(text) for text in distinct])
+    return scores[np.fromiter((distinct[text] for text in messages), dtype=np.int64, count=len(messages))]
+
+
+def score_batch(messages, processes=None, chunk_size=20000):
+    """Return a polarity array for a list of messages
+
+    Inputs larger than chunk_size are split across a process pool when
+    processes is given (0 uses every CPU).
+    """
+    messages = list(messages)
+    if processes is None or len(messages) <= chunk_size:
+        return _score_chunk(messages)
+
+    chunks = [messages[i:i + chunk_size] for i in range(0, len(messages), chunk_size)]
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+        return np.concatenate(list(pool.map(_score_chunk, chunks)))
+
+
+def label_batch(polarity):
+    """Vectorized sentiment_label: the same 0.1 thresholds for a whole polarity array"""
+    polarity = np.asarray(polarity)
+    return LABELS[(polarity > 0.1).astype(np.int8) - (polarity < -0.1) + 1]
+
+
+def summarize(polarity):
+    """Aggregate statistics for a polarity array"""
+    polarity = np.asarray(polarity, dtype=np.float64)
+    labels = label_batch(polarity)
+    summary = {'messages': int(len(polarity))}
+    if len(polarity):
+        summary.update({
+            'mean': float(polarity.mean()),
+            'std': float(polarity.std()),
+            'median': float(np.median(polarity)),
+            'p05': float(np.percentile(polarity, 5)),
+            'p95': float(np.percentile(polarity, 95))
+        })
+    for label in LABELS:
+        count = int((labels == label).sum())
+        summary[str(label)] = count
+        summary[f'{label}_share'] = count / max(1, len(polarity))
+    return summary
+
+
+def load_messages(path, speaker='You:'):
+    """Read messages from a JSONL export ({"text": ...}) or a plain text log
+
+    In a text log only lines starting with speaker are kept, with the prefix
+    removed; lines without any "Name:" prefix are kept as they are.
+    """
+    messages = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith('.jsonl'):
+                messages.append(json.loads(line)['text'])
+            elif line.startswith(speaker):
+                messages.append(line[len(speaker):].strip())
+            elif not line.startswith(('ORBIT:', 'AI:', 'System:')):
+                messages.append(line)
+    return messages
+
+
+def check_consistency(messages):
+    """Compare batch labels with per-message TextBlob labels; return (agreement, mismatches)"""
+    from textblob import TextBlob
+
+    batch = score_batch(messages)
+    mismatches = []
+    for text, polarity in zip(messages, batch):
+        expected = TextBlob(text).sentiment.polarity
+        if sentiment_label(expected) != sentiment_label(polarity):
+            mismatches.append((text, expected, float(polarity)))
+    return 1 - len(mismatches) / max(1, len(messages)), mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch sentiment over exported ORBIT conversations")
+    parser.add_argument('log', help="JSONL export or plain text conversation log")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Worker processes for large logs (0 uses every CPU)")
+    parser.add_argument('--check', action='store_true',
+                        help="Also score every message with TextBlob and report label agreement")
+    parser.add_argument('--output', help="Write per-message polarity and label as JSONL")
+    args = parser.parse_args()
+
+    messages = load_messages(args.log)
+    get_lexicon()
+    start = time.perf_counter()
+    polarity = score_batch(messages, processes=args.processes)
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(polarity)
+    print(f"Scored {len(messages)} messages in {elapsed:.2f} s "
+          f"({len(messages) / max(elapsed, 1e-9):.0f} messages/s)")
+    for key, value in summary.items():
+        print(f"  {key:<16} {value:.3f}" if isinstance(value, float) else f"  {key:<16} {value}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for text, score, label in zip(messages, polarity, label_batch(polarity)):
+                f.write(json.dumps({'text': text, 'polarity': float(score), 'sentiment': str(label)}) + '\n')
+
+    if args.check:
+        agreement, mismatches = check_consistency(messages)
+        print(f"Label agreement with TextBlob: {agreement:.2%}")
+        for text, expected, actual in mismatches[:10]:
+            print(f"  {expected:+.3f} vs {actual:+.3f}  {text}")
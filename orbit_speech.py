@@ -0,0 +1,558 @@
+import argparse
+import heapq
+import tempfile
+import itertools
+import re
+import os
+import threading
+import time
+import wave
+from collections import deque
+
+from orbit_ai import HIGH, LOW, NORMAL
+from orbit_audio import AudioCache, COMMON_PHRASES, FakePlayer, WavPlayer, phrase_segments, stitch_wavs
+
+# A sentence ends at terminal punctuation followed by whitespace, or at a line break
+BOUNDARY_RE = re.compile(r'[.!?]+["\')\]\u2019\u201d]*(?=\s)|\n')
+LAST_WORD_RE = re.compile(r'(\w+)\W*$')
+# Words whose trailing period doesn't end a sentence
+ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'etc', 'eg', 'ie', 'e', 'i', 'no',
+                 'fig', 'approx', 'inc', 'ltd', 'co', 'jan', 'feb', 'mar', 'apr', 'aug', 'sep', 'oct', 'nov', 'dec'}
+
+
+class SentenceSplitter:
+    """Cut streaming text into speakable sentences as soon as each one is complete
+
+    feed() takes text in arbitrary pieces, such as model tokens, and
+    returns the sentences it completed. Sentences shorter than min_chars
+    ("Sure.", "Hi!") wait to be joined with what follows, and a run
+    longer than max_chars without a boundary is cut at a comma or space so
+    speech never waits on one endless sentence.
+    """
+
+    def __init__(self, min_chars=20, max_chars=250):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ''
+
+    def _is_abbreviation(self, end):
+        if self.buffer[end - 1] != '.':
+            return False
+        match = LAST_WORD_RE.search(self.buffer, 0, end)
+        if match is None:
+            return False
+        word = match.group(1).lower()
+        # Initials ("J. Smith") and list numbers ("1. Preheat") as well as common abbreviations
+        return word in ABBREVIATIONS or len(word) == 1 or word.isdigit() and match.start() == 0
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        cut = 0
+        for match in BOUNDARY_RE.finditer(self.buffer):
+            if match.group() != '\n' and self._is_abbreviation(match.end()):
+                continue
+            sentence = ' '.join(self.buffer[cut:match.end()].split())
+            # A line break always ends a phrase; a short line isn't run into the next
+            if match.group() == '\n':
+                if not sentence:
+                    cut = match.end()
+                    continue
+            elif len(sentence) < self.min_chars:
+                continue
+            sentences.append(sentence)
+            cut = match.end()
+        self.buffer = self.buffer[cut:]
+
+        while len(self.buffer) > self.max_chars:
+            split = self.buffer.rfind(', ', 0, self.max_chars)
+            if split < self.min_chars:
+                split = self.buffer.rfind(' ', 0, self.max_chars)
+            if split < self.min_chars:
+                split = self.max_chars
+            sentences.append(' '.join(self.buffer[:split + 1].split()))
+            self.buffer = self.buffer[split + 1:]
+        return sentences
+
+    def flush(self):
+        """Whatever is left once the text is complete"""
+        rest, self.buffer = ' '.join(self.buffer.split()), ''
+        return rest
+
+
+def split_sentences(text, min_chars=20, max_chars=250):
+    """All speakable sentences of a complete text"""
+    splitter = SentenceSplitter(min_chars, max_chars)
+    sentences = splitter.feed(text)
+    rest = splitter.flush()
+    return sentences + [rest] if rest else sentences
+
+
+class Utterance:
+    """One queued piece of speech; merged neighbours share its timings"""
+
+    _sequence = itertools.count()
+
+    def __init__(self, text, priority=NORMAL):
+        self.text = text
+        self.priority = priority
+        self.order = next(self._sequence)
+        self.created = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.interrupted = False
+        self.dropped = False
+        self.done = threading.Event()
+        # Set for recurring phrases that can be played from the audio cache
+        self.segments = None
+
+    def __lt__(self, other):
+        return (self.priority, self.order) < (other.priority, other.order)
+
+    @property
+    def queue_wait(self):
+        return (self.started or time.perf_counter()) - self.created
+
+    def wait(self, timeout=None):
+        """Block until spoken, interrupted or dropped"""
+        return self.done.wait(timeout)
+
+
+def _pyttsx3_factory(driver=None):
+    import pyttsx3
+    return pyttsx3.init(driver) if driver else pyttsx3.init()
+
+
+class SpeechWorker:
+    """The only thread that touches the pyttsx3 engine, fed by a priority queue of utterances
+
+    pyttsx3 engines are not thread-safe and must be driven from the thread
+    that created them, so the engine is created, configured and run here.
+    Short utterances waiting together at the same priority are merged into
+    one say() call. interrupt() stops the current utterance at the next
+    word, from inside the engine's own word callback, and drops everything
+    queued below HIGH priority.
+
+    With an audio_cache, recurring phrases (see orbit_audio) are played
+    from WAV clips instead of being synthesized again. A phrase heard for
+    the first time is spoken live and its segments are rendered with
+    save_to_file while the worker is otherwise idle, ready for next time.
+    """
+
+    def __init__(self, engine_factory=None, driver=None, voice=0, rate=180, merge_chars=200, max_queue=50,
+                 audio_cache=None, player=None):
+        self.engine_factory = engine_factory or (lambda: _pyttsx3_factory(driver))
+        self.merge_chars = merge_chars
+        self.max_queue = max_queue
+        self.engine = None
+        self.error = None
+        self.heap = []
+        self.current = []
+        self.properties = {'rate': rate}
+        self.voice = voice
+        self.voice_id = str(voice)
+        self.rate = rate
+        self.player = player or (WavPlayer() if audio_cache is not None else None)
+        # Without a way to play clips, rendering them would be wasted work
+        self.audio_cache = audio_cache if self.player is not None and self.player.available else None
+        self.renders = deque()
+        self.condition = threading.Condition()
+        self.interrupt_event = threading.Event()
+        self.ready = threading.Event()
+        self.closed = False
+        self.waits = deque(maxlen=200)
+        self.counts = {'queued': 0, 'spoken': 0, 'merged': 0, 'interrupted': 0, 'dropped': 0, 'failed': 0,
+                       'cached': 0, 'rendered': 0}
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='speech-worker', daemon=True)
+            self.thread.start()
+        return self
+
+    def say(self, text, priority=NORMAL):
+        """Queue text to be spoken; returns its Utterance"""
+        utterance = Utterance(text.strip(), priority)
+        if self.audio_cache is not None:
+            utterance.segments = phrase_segments(utterance.text)
+        with self.condition:
+            if not utterance.text or self.closed:
+                return self._drop(utterance)
+            if len(self.heap) >= self.max_queue:
+                # A backlog of speech is useless; the least important, newest line gives way
+                worst = max(self.heap)
+                if worst < utterance:
+                    return self._drop(utterance)
+                self.heap.remove(worst)
+                heapq.heapify(self.heap)
+                self._drop(worst)
+            heapq.heappush(self.heap, utterance)
+            self.counts['queued'] += 1
+            self.condition.notify()
+        return utterance
+
+    def say_sentences(self, text, priority=NORMAL):
+        """Queue text one sentence at a time, so speech starts before a long message is rendered
+
+        Returns the list of Utterances.
+        """
+        return [self.say(sentence, priority) for sentence in split_sentences(text)]
+
+    def prerender(self, texts=COMMON_PHRASES):
+        """Render the clips for these phrases while there is nothing to say"""
+        if self.audio_cache is None:
+            return
+        with self.condition:
+            for text in texts:
+                for segment in phrase_segments(text) or [text]:
+                    if segment not in self.renders:
+                        self.renders.append(segment)
+            self.condition.notify()
+
+    def _drop(self, utterance):
+        utterance.dropped = True
+        utterance.done.set()
+        self.counts['dropped'] += 1
+        return utterance
+
+    def interrupt(self):
+        """Stop speaking now and forget queued speech, except HIGH priority; True if anything was cut"""
+        with self.condition:
+            kept = [u for u in self.heap if u.priority == HIGH]
+            for utterance in self.heap:
+                if utterance.priority != HIGH:
+                    self._drop(utterance)
+            cut = len(self.heap) - len(kept)
+            self.heap = kept
+            heapq.heapify(self.heap)
+            if self.current:
+                self.interrupt_event.set()
+                cut += 1
+        return cut > 0
+
+    def set_property(self, name, value):
+        """Change an engine property such as 'rate' before the next utterance"""
+        with self.condition:
+            self.properties[name] = value
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.interrupt_event.set()
+
+    @property
+    def busy(self):
+        with self.condition:
+            return bool(self.current or self.heap)
+
+    def _on_word(self, name, location, length):
+        # Runs inside runAndWait on this thread, the one place stop() is safe to call
+        if self.interrupt_event.is_set():
+            self.engine.stop()
+
+    def _open_engine(self):
+        try:
+            self.engine = self.engine_factory()
+            voices = self.engine.getProperty('voices')
+            if voices:
+                self.voice_id = voices[min(self.voice, len(voices) - 1)].id
+                self.engine.setProperty('voice', self.voice_id)
+            self.engine.connect('started-word', self._on_word)
+        except Exception as e:
+            self.error = e
+            self.engine = None
+        self.ready.set()
+
+    def _next_batch(self):
+        """Pop the next utterance plus short ones queued right behind it at the same priority"""
+        batch = [heapq.heappop(self.heap)]
+        if batch[0].segments:
+            return batch
+        length = len(batch[0].text)
+        while self.heap and self.heap[0].priority == batch[0].priority:
+            following = self.heap[0]
+            # Cached phrases are played on their own, never merged into live speech
+            if following.segments or length + len(following.text) + 1 > self.merge_chars:
+                break
+            batch.append(heapq.heappop(self.heap))
+            length += len(following.text) + 1
+        return batch
+
+    def _apply_properties(self, properties):
+        for name, value in properties.items():
+            self.engine.setProperty(name, value)
+            if name == 'rate':
+                self.rate = value
+
+    def _render(self, text):
+        """Synthesize text into the audio cache, unless it is already there"""
+        cache = self.audio_cache
+        if cache is None or cache.has(text, self.voice_id, self.rate):
+            return
+        path = cache.render_path()
+        try:
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            cache.put(text, self.voice_id, self.rate, path)
+            self.counts['rendered'] += 1
+        except (wave.Error, EOFError):
+            # This driver doesn't write WAV files, so there is nothing the cache can play
+            self.audio_cache = None
+        except Exception as e:
+            self.error = e
+            self.counts['failed'] += 1
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _cached_clip(self, utterance):
+        """The clip for a recurring phrase, stitched from its segments if need be; None queues its rendering"""
+        cache = self.audio_cache
+        clip = cache.get(utterance.text, self.voice_id, self.rate)
+        if clip is not None or len(utterance.segments) == 1:
+            missing = [] if clip else utterance.segments
+        else:
+            clips = [cache.get(segment, self.voice_id, self.rate) for segment in utterance.segments]
+            missing = [segment for segment, path in zip(utterance.segments, clips) if path is None]
+            if not missing:
+                # The stitched phrase is cached too, so the next time is a single lookup
+                clip = cache.put(utterance.text, self.voice_id, self.rate, stitch_wavs(clips, cache.render_path()))
+        if missing:
+            with self.condition:
+                self.renders.extend(segment for segment in missing if segment not in self.renders)
+        return clip
+
+    def _run(self):
+        self._open_engine()
+        while True:
+            with self.condition:
+                while not self.heap and not self.closed and not (self.renders and self.engine is not None):
+                    self.condition.wait()
+                if self.closed:
+                    break
+                properties, self.properties = self.properties, {}
+                if not self.heap:
+                    # Idle: render one clip for the cache, then look at the queue again
+                    text = self.renders.popleft()
+                else:
+                    text = None
+                    batch = self._next_batch()
+                    self.current = batch
+                    self.interrupt_event.clear()
+
+            if text is not None:
+                try:
+                    self._apply_properties(properties)
+                except Exception as e:
+                    self.error = e
+                self._render(text)
+                continue
+
+            started = time.perf_counter()
+            for utterance in batch:
+                utterance.started = started
+                self.waits.append(utterance.queue_wait)
+            self.counts['merged'] += len(batch) - 1
+
+            interrupted = False
+            if self.engine is None:
+                for utterance in batch:
+                    self._drop(utterance)
+            else:
+                try:
+                    self._apply_properties(properties)
+                    clip = None
+                    if batch[0].segments and self.audio_cache is not None:
+                        clip = self._cached_clip(batch[0])
+                    if clip is not None:
+                        self.player.play(clip, self.interrupt_event)
+                        self.counts['cached'] += 1
+                    else:
+                        self.engine.say(' '.join(utterance.text for utterance in batch))
+                        self.engine.runAndWait()
+                except Exception as e:
+                    self.error = e
+                    self.counts['failed'] += 1
+                interrupted = self.interrupt_event.is_set()
+                self.counts['interrupted' if interrupted else 'spoken'] += 1
+
+            finished = time.perf_counter()
+            with self.condition:
+                self.current = []
+                for utterance in batch:
+                    utterance.finished = finished
+                    utterance.interrupted = interrupted
+                    utterance.done.set()
+        if self.audio_cache is not None:
+            # Keep the recency order for the next session's evictions
+            self.audio_cache.save()
+
+    def wait_idle(self, timeout=None):
+        """Block until nothing is queued or being spoken; True if that happened in time"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self.busy:
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def metrics(self):
+        """Queue latency statistics, depth and utterance counts"""
+        with self.condition:
+            waits = sorted(self.waits)
+            metrics = dict(self.counts, depth=len(self.heap), speaking=bool(self.current),
+                           error=str(self.error) if self.error else None)
+        if self.audio_cache is not None:
+            metrics['audio_cache'] = self.audio_cache.stats()
+        if waits:
+            metrics.update(
+                wait_mean=sum(waits) / len(waits),
+                wait_p95=waits[min(len(waits) - 1, int(0.95 * len(waits)))],
+                wait_max=waits[-1]
+            )
+        return metrics
+
+
+class FakeVoice:
+    def __init__(self, id):
+        self.id = id
+
+
+class FakeEngine:
+    """Stand-in for a pyttsx3 engine that "speaks" at word_delay seconds per word
+
+    It fires the same started-utterance, started-word and
+    finished-utterance callbacks, honours stop() from inside a callback
+    and records what was said in spoken as (text, words spoken, completed).
+    save_to_file() writes a silent WAV of the same length and records the
+    text in saved.
+    """
+
+    def __init__(self, word_delay=0.05):
+        self.word_delay = word_delay
+        self.properties = {'rate': 200, 'voice': 'fake-0', 'voices': [FakeVoice('fake-0'), FakeVoice('fake-1')]}
+        self.callbacks = {'started-utterance': [], 'started-word': [], 'finished-utterance': []}
+        self.queued = []
+        self.spoken = []
+        self.saved = []
+        self.stopping = False
+        self.running = False
+
+    def getProperty(self, name):
+        return self.properties[name]
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def connect(self, topic, callback):
+        self.callbacks[topic].append(callback)
+        return (topic, callback)
+
+    def say(self, text, name=None):
+        self.queued.append((text, name, None))
+
+    def save_to_file(self, text, filename, name=None):
+        self.queued.append((text, name, filename))
+
+    def _save(self, text, filename):
+        # Silence as long as the words would take to say, rendered four times faster than that
+        words = len(text.split())
+        time.sleep(words * self.word_delay / 4)
+        with wave.open(filename, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(8000)
+            f.writeframes(b'\0\0' * int(8000 * words * self.word_delay))
+        self.saved.append(text)
+
+    def stop(self):
+        self.stopping = True
+
+    def _fire(self, topic, *args):
+        for callback in self.callbacks[topic]:
+            callback(*args)
+
+    def runAndWait(self):
+        if self.running:
+            raise RuntimeError('run loop already started')
+        self.running = True
+        self.stopping = False
+        try:
+            while self.queued and not self.stopping:
+                text, name, filename = self.queued.pop(0)
+                if filename is not None:
+                    self._save(text, filename)
+                    continue
+                self._fire('started-utterance', name)
+                words, location = 0, 0
+                for word in text.split():
+                    self._fire('started-word', name, location, len(word))
+                    if self.stopping:
+                        break
+                    time.sleep(self.word_delay)
+                    words += 1
+                    location += len(word) + 1
+                completed = not self.stopping
+                self.spoken.append((text, words, completed))
+                self._fire('finished-utterance', name, completed)
+            self.queued = []
+        finally:
+            self.running = False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise ORBIT's speech worker")
+    parser.add_argument('--real', action='store_true', help="Use pyttsx3 instead of the fake engine")
+    parser.add_argument('--word-delay', type=float, default=0.02)
+    args = parser.parse_args()
+
+    fake = FakeEngine(args.word_delay)
+    worker = SpeechWorker(None if args.real else lambda: fake).start()
+    worker.ready.wait()
+
+    # Startup: greeting and word of the day no longer fight over the engine
+    worker.say("Good morning! I am ORBIT, your desktop assistant.")
+    worker.say("Word of the day: serendipity.")
+    worker.say("It means finding something good without looking for it.")
+    worker.wait_idle()
+
+    # A long answer cut short as the user starts typing; the reminder still plays
+    long_answer = worker.say("Here is a long answer that keeps going " * 10)
+    worker.say("And a follow-up nobody will hear.")
+    reminder = worker.say("Reminder: stand up and stretch.", priority=HIGH)
+    time.sleep(10 * args.word_delay)
+    worker.interrupt()
+    worker.wait_idle()
+
+    # Many short lines arriving together are merged
+    lines = [worker.say(f"Item {i}.", priority=LOW) for i in range(8)]
+    worker.wait_idle()
+
+    if not args.real:
+        for text, words, completed in fake.spoken:
+            print(f"{'done' if completed else 'CUT '} {words:>3} words  {text[:60]}")
+    print(f"long answer interrupted: {long_answer.interrupted}, reminder spoken: {reminder.done.is_set() and not reminder.dropped}")
+    for key, value in worker.metrics().items():
+        print(f"  {key:<12} {value:.3f}" if isinstance(value, float) else f"  {key:<12} {value}")
+    worker.close()
+
+    # Recurring phrases: spoken live the first time, then played from clips rendered while idle
+    with tempfile.TemporaryDirectory() as directory:
+        fake = FakeEngine(args.word_delay)
+        player = FakePlayer()
+        worker = SpeechWorker(lambda: fake, audio_cache=AudioCache(directory), player=player).start()
+        worker.ready.wait()
+        for minutes in (5, 5, 10, 10):
+            played = len(player.played)
+            start = time.perf_counter()
+            worker.say(f"Reminder set for {minutes} minute(s)").wait()
+            print(f"reminder for {minutes:>2}: {'clip' if len(player.played) > played else 'live'}, "
+                  f"{time.perf_counter() - start:.3f} s")
+            worker.wait_idle()
+            time.sleep(0.3)
+        print(f"live {len(fake.spoken)}, played {len(player.played)}, rendered {fake.saved}")
+        print(f"  audio cache {worker.metrics()['audio_cache']}")
+        worker.close()
+        worker.thread.join()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from orbit_asr import FakeRecognizer, NotUnderstood, make_recognizer
+from orbit_listen import Listener, Segment, WavFileSource, synthesize_test_wav
+
+LINES = ["set a reminder for ten minutes", "?", "what is the weather like today"]
+
+
+def segment(seconds=1.0, rate=16000):
+    samples = np.zeros(int(seconds * rate), dtype=np.int16)
+    return Segment(samples, rate, 0.0, seconds)
+
+
+class FakeRecognizerTest(unittest.TestCase):
+    def test_lines_in_order(self):
+        recognizer = FakeRecognizer(lines=LINES, streaming=False)
+        self.assertEqual(recognizer.recognize(segment()).text, LINES[0])
+        with self.assertRaises(NotUnderstood):
+            recognizer.recognize(segment())
+        self.assertEqual(recognizer.recognize(segment()).text, LINES[2])
+        # Past the end of the transcript nothing is understood
+        with self.assertRaises(NotUnderstood):
+            recognizer.recognize(segment())
+        self.assertEqual(recognizer.metrics()['utterances'], 2)
+
+    def test_transcript_file(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'transcript.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("# what the test speaker says\nhey orbit\n\n?\nthank you orbit\n")
+        recognizer = FakeRecognizer(path)
+        self.assertEqual(list(recognizer.lines), ["hey orbit", "", "thank you orbit"])
+
+    def test_partial_results_grow_with_audio(self):
+        stream = FakeRecognizer(lines=LINES, words_per_second=2.0).stream(16000)
+        self.assertIsNone(stream.feed(np.zeros(4000, dtype=np.int16)))
+        self.assertEqual(stream.feed(np.zeros(4000, dtype=np.int16)), "set")
+        self.assertIsNone(stream.feed(np.zeros(100, dtype=np.int16)))
+        self.assertEqual(stream.feed(np.zeros(16000, dtype=np.int16)), "set a reminder")
+        self.assertEqual(stream.finish(), LINES[0])
+
+    def test_no_stream_when_not_streaming(self):
+        self.assertIsNone(FakeRecognizer(lines=LINES, streaming=False).stream(16000))
+
+    def test_make_recognizer(self):
+        recognizer = make_recognizer('fake', lines=LINES)
+        self.assertIsInstance(recognizer, FakeRecognizer)
+        with self.assertRaises(ValueError):
+            make_recognizer('whisper')
+
+
+class ListenerRecognitionTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = synthesize_test_wav(os.path.join(directory.name, 'speech.wav'))
+
+    def transcripts(self, recognizer, streaming):
+        partials = []
+        listener = Listener(WavFileSource(self.path, realtime=False), recognizer=recognizer if streaming else None,
+                            on_partial=partials.append).start()
+        listener.thread.join(30)
+        results = []
+        while True:
+            found = listener.listen(timeout=0)
+            if found is None:
+                break
+            try:
+                results.append(recognizer.recognize(found).text)
+            except NotUnderstood:
+                results.append(None)
+        return results, partials
+
+    def test_streamed_segments(self):
+        recognizer = FakeRecognizer(lines=LINES)
+        results, partials = self.transcripts(recognizer, streaming=True)
+        self.assertEqual(results, [LINES[0], None, LINES[2]])
+        self.assertIn("set", partials)
+        # Streamed results are ready when the segment closes
+        self.assertTrue(all(latency < 0.5 for latency in recognizer.latencies))
+
+    def test_whole_segments(self):
+        recognizer = FakeRecognizer(lines=LINES, streaming=False)
+        results, partials = self.transcripts(recognizer, streaming=False)
+        self.assertEqual(results, [LINES[0], None, LINES[2]])
+        self.assertEqual(partials, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from orbit_ai import FakeModel
+from orbit_bench import RESULT_FIELDS, load_prompts, percentile, run_prompts, summarize, write_csv
+
+SETTINGS = {'ai_max_tokens': 16, 'ai_latency_budget': 30}
+
+
+class BenchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.prompts_path = os.path.join(self.directory.name, 'prompts.jsonl')
+        with open(self.prompts_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'prompt': "What is the capital of France?"}) + '\n')
+            f.write('\n')
+            f.write(json.dumps({'prompt': "How many people live there?"}) + '\n')
+            f.write(json.dumps({'id': 'fresh', 'prompt': "Tell me a joke.", 'new_conversation': True}) + '\n')
+
+    def test_load_prompts(self):
+        prompts = load_prompts(self.prompts_path)
+        self.assertEqual([row['id'] for row in prompts], ['1', '3', 'fresh'])
+        self.assertTrue(prompts[2]['new_conversation'])
+
+    def test_run_prompts_with_fake_model(self):
+        prompts = load_prompts(self.prompts_path)
+        results = run_prompts(FakeModel(), prompts, SETTINGS)
+        self.assertEqual([r['id'] for r in results], ['1', '3', 'fresh'])
+        for row, result in zip(prompts, results):
+            self.assertIsNone(result['error'])
+            self.assertTrue(result['response'].startswith(f"You asked: {row['prompt']}"))
+            self.assertGreater(result['tokens'], 0)
+            self.assertLessEqual(result['tokens'], SETTINGS['ai_max_tokens'])
+            self.assertFalse(result['budget_stopped'])
+
+        # Same prompts, same answers: the fake model makes runs comparable
+        again = run_prompts(FakeModel(), prompts, SETTINGS)
+        self.assertEqual([r['response'] for r in again], [r['response'] for r in results])
+
+    def test_failing_model_is_reported_per_prompt(self):
+        class BrokenModel(FakeModel):
+            def generate(self, prompt, **kwargs):
+                raise RuntimeError("out of memory")
+
+        results = run_prompts(BrokenModel(), load_prompts(self.prompts_path), SETTINGS)
+        self.assertEqual([r['error'] for r in results], ["out of memory"] * 3)
+        summary = summarize(results, 1.0, 0.5)
+        self.assertEqual(summary['errors'], 3)
+        self.assertEqual(summary['tokens'], 0)
+
+    def test_summarize(self):
+        results = run_prompts(FakeModel(), load_prompts(self.prompts_path), SETTINGS)
+        summary = summarize(results, 2.0, 1.0)
+        self.assertEqual(summary['prompts'], 3)
+        self.assertEqual(summary['errors'], 0)
+        self.assertEqual(summary['cpu_percent'], 50.0)
+        self.assertEqual(summary['tokens'], sum(r['tokens'] for r in results))
+        self.assertLessEqual(summary['latency_p50'], summary['latency_p95'])
+
+    def test_percentile(self):
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertEqual(percentile([1, 2], 50), 1.5)
+        self.assertEqual(percentile([5], 95), 5)
+        self.assertEqual(percentile(list(range(101)), 95), 95)
+
+    def test_write_csv(self):
+        results = run_prompts(FakeModel(), load_prompts(self.prompts_path), SETTINGS)
+        path = os.path.join(self.directory.name, 'results.csv')
+        write_csv(path, results)
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(list(rows[0]), RESULT_FIELDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from orbit_cache import ResponseCache
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResponseCache(os.path.join(directory.name, 'ai_cache.json'))
+
+    def test_exact_and_semantic_hits(self):
+        self.cache.put("What is Python?", "A programming language.")
+        self.assertEqual(self.cache.get("what is python"), ("A programming language.", 'exact', 1.0))
+        response, kind, _ = self.cache.get("define python")
+        self.assertEqual((response, kind), ("A programming language.", 'semantic'))
+        self.assertIsNone(self.cache.get("how tall is mount everest"))
+
+    def test_entry_with_new_words_is_found(self):
+        self.cache.put("what is python", "A programming language.")
+        self.cache.put("convert celsius to fahrenheit", "Multiply by 9/5 and add 32.")
+        response, kind, score = self.cache.get("could you convert celsius to fahrenheit")
+        self.assertEqual((response, kind), ("Multiply by 9/5 and add 32.", 'semantic'))
+        self.assertGreater(score, 0.99)
+
+    def test_reversed_question_is_a_miss(self):
+        self.cache.put("convert celsius to fahrenheit", "Multiply by 9/5 and add 32.")
+        self.cache.put("is python faster than java", "Usually not.")
+        self.cache.put("how many km in 10 miles", "About 16 km.")
+        self.assertIsNone(self.cache.get("convert fahrenheit to celsius"))
+        self.assertIsNone(self.cache.get("is java faster than python"))
+        self.assertIsNone(self.cache.get("how many miles in 10 km"))
+        self.assertEqual(self.cache.stats()['misses'], 3)
+
+    def test_context_dependent_prompts_are_not_cached(self):
+        self.assertFalse(self.cache.put("how many people live there", "About two million."))
+        self.assertIsNone(self.cache.get("how many people live there"))
+
+    def test_persisted_entries_reload(self):
+        self.cache.put("convert celsius to fahrenheit", "Multiply by 9/5 and add 32.")
+        reloaded = ResponseCache(self.cache.path)
+        self.assertEqual(reloaded.load(), 1)
+        self.assertEqual(reloaded.get("please convert celsius to fahrenheit")[1], 'semantic')
+
+
+if __name__ == "__main__":
+    unittest.main()
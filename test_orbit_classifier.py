@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from orbit_classifier import IntentClassifier, accuracy, load_utterances
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# intent_heldout.jsonl is never trained on; retraining must not fall below this
+MIN_HELDOUT_ACCURACY = 0.85
+
+# main5's default intent_threshold: below it the keyword rules decide
+INTENT_THRESHOLD = 0.6
+
+
+class IntentClassifierTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        texts, labels = load_utterances(os.path.join(DATA_DIR, 'intent_utterances.jsonl'))
+        cls.model = IntentClassifier(sorted(set(labels))).fit(texts, labels)
+
+    def test_heldout_accuracy(self):
+        texts, labels = load_utterances(os.path.join(DATA_DIR, 'intent_heldout.jsonl'))
+        self.assertGreaterEqual(accuracy(self.model, texts, labels), MIN_HELDOUT_ACCURACY)
+
+    def test_factual_questions_are_information(self):
+        for question in ("what is the capital of peru", "who wrote hamlet", "how tall is mount everest"):
+            intent, confidence = self.model.predict(question)
+            self.assertEqual(intent, 'information', question)
+            self.assertGreaterEqual(confidence, INTENT_THRESHOLD, question)
+
+    def test_open_questions_stay_with_the_ai(self):
+        self.assertEqual(self.model.predict("explain how rainbows form")[0], 'ai')
+        self.assertEqual(self.model.predict("write a haiku about autumn")[0], 'ai')
+
+    def test_saved_model_predicts_the_same(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'intent_model.npz')
+        self.model.save(path)
+        loaded = IntentClassifier.load(path)
+        self.assertEqual(loaded.labels, self.model.labels)
+        self.assertEqual(loaded.predict("open notepad"), self.model.predict("open notepad"))
+
+
+if __name__ == "__main__":
+    unittest.main()
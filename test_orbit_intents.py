@@ -0,0 +1,67 @@
+import unittest
+
+from orbit_intents import ORBIT_INTENTS, AhoCorasick, IntentMatcher
+
+
+def automaton(*patterns):
+    matcher = AhoCorasick()
+    for pattern in patterns:
+        matcher.add(pattern, pattern)
+    matcher.build()
+    return matcher
+
+
+class AhoCorasickTest(unittest.TestCase):
+    def test_patterns_only_match_whole_words(self):
+        matcher = automaton('add', 'new')
+        self.assertEqual(list(matcher.find("address the newsletter")), [])
+        self.assertEqual(list(matcher.find("renew and add")), [(10, 13, 'add', 'add')])
+
+    def test_multi_word_and_overlapping_patterns(self):
+        matcher = automaton('what', 'what is', 'is')
+        found = [(start, end, pattern) for start, end, pattern, _ in matcher.find("so what is it")]
+        self.assertEqual(found, [(3, 7, 'what'), (3, 10, 'what is'), (8, 10, 'is')])
+
+    def test_symbols_match_inside_words(self):
+        matcher = automaton('+', '*')
+        self.assertEqual([pattern for _, _, pattern, _ in matcher.find("2+2*3")], ['+', '*'])
+
+    def test_failure_links_recover_a_shorter_match(self):
+        matcher = automaton('tell me', 'me')
+        self.assertEqual([pattern for _, _, pattern, _ in matcher.find("tell mexico and me")], ['me'])
+
+
+class IntentMatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.matcher = IntentMatcher(ORBIT_INTENTS)
+
+    def test_keyword_inside_a_longer_word_does_not_fire(self):
+        self.assertEqual(self.matcher.intents_in("address the envelope"), [])
+        self.assertEqual(self.matcher.intents_in("add milk to my list"), ['task'])
+
+    def test_multi_word_keywords(self):
+        self.assertEqual(self.matcher.intents_in("tell me a joke"), ['information'])
+        match = self.matcher.best("what is 12 * 7")
+        self.assertEqual(match.intent, 'calculate')
+        self.assertEqual(match.keywords, ['what is', '*'])
+
+    def test_every_keyword_group_must_hit(self):
+        self.assertEqual(self.matcher.intents_in("open notepad"), ['application'])
+        self.assertNotIn('application', self.matcher.intents_in("open the door"))
+        self.assertIn('reminder', self.matcher.intents_in("remind me to call mum tomorrow"))
+        self.assertNotIn('reminder', self.matcher.intents_in("remind me to call mum"))
+
+    def test_longest_match_wins(self):
+        # 'what is' and '*' cover more of the query than information's 'what'
+        self.assertEqual(self.matcher.intents_in("what is 12 * 7"), ['calculate', 'information'])
+        self.assertEqual(self.matcher.best("what is 12 * 7").intent, 'calculate')
+
+    def test_ties_go_to_the_first_intent_in_the_table(self):
+        matcher = IntentMatcher([('first', ['play']), ('second', ['play'])])
+        self.assertEqual(matcher.intents_in("play"), ['first', 'second'])
+        self.assertEqual(matcher.best("play").intent, 'first')
+        self.assertIsNone(matcher.best("stop"))
+
+
+if __name__ == "__main__":
+    unittest.main()
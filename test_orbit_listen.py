@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+
+from orbit_listen import (FRAME_SECONDS, SAMPLE_RATE, Listener, RingBuffer, VoiceActivityDetector, WavFileSource,
+                          synthesize_test_wav)
+
+# (start, length) in seconds of the voice-like bursts in the test recording
+UTTERANCES = ((1.0, 1.2), (3.5, 0.8), (5.5, 2.0))
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_read_by_stream_position(self):
+        ring = RingBuffer(10)
+        self.assertEqual(ring.write(np.arange(4, dtype=np.int16)), 4)
+        self.assertEqual(ring.write(np.arange(4, 12, dtype=np.int16)), 12)
+        self.assertEqual(ring.oldest, 2)
+        # Wraps around the end of the array
+        np.testing.assert_array_equal(ring.read(5, 12), np.arange(5, 12))
+        np.testing.assert_array_equal(ring.read(2, 4), [2, 3])
+
+    def test_overwritten_samples_cannot_be_read(self):
+        ring = RingBuffer(10)
+        ring.write(np.arange(15, dtype=np.int16))
+        with self.assertRaises(IndexError):
+            ring.read(4, 8)
+        with self.assertRaises(IndexError):
+            ring.read(10, 16)
+
+    def test_write_larger_than_capacity_keeps_the_end(self):
+        ring = RingBuffer(4)
+        self.assertEqual(ring.write(np.arange(10, dtype=np.int16)), 10)
+        np.testing.assert_array_equal(ring.read(6, 10), [6, 7, 8, 9])
+
+
+class VoiceActivityDetectorTest(unittest.TestCase):
+    def frames(self, rms, count, seed=0):
+        rng = np.random.default_rng(seed)
+        size = int(SAMPLE_RATE * FRAME_SECONDS)
+        return [rng.normal(0, rms, size).astype(np.int16) for _ in range(count)]
+
+    def test_noise_alone_is_not_speech(self):
+        vad = VoiceActivityDetector()
+        events = [vad.update(frame) for frame in self.frames(60, 200)]
+        self.assertEqual([event for event in events if event], [])
+        self.assertAlmostEqual(vad.noise, 60, delta=10)
+
+    def test_loud_burst_starts_and_ends_a_segment(self):
+        vad = VoiceActivityDetector()
+        frames = self.frames(60, 20) + self.frames(3000, 20, seed=1) + self.frames(60, 40, seed=2)
+        events = [(index, event) for index, frame in enumerate(frames) if (event := vad.update(frame))]
+        self.assertEqual([event for _, event in events], ['start', 'end'])
+        self.assertEqual(events[0][0], 20 + vad.start_frames - 1)
+        self.assertEqual(events[1][0], 40 + vad.end_frames - 1)
+
+
+class ListenerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = synthesize_test_wav(os.path.join(directory.name, 'speech.wav'), utterances=UTTERANCES,
+                                        seconds=10.0)
+
+    def run_listener(self, **options):
+        listener = Listener(WavFileSource(self.path, realtime=False), **options).start()
+        listener.thread.join(30)
+        self.assertTrue(listener.finished.is_set())
+        segments = []
+        while True:
+            segment = listener.listen(timeout=0)
+            if segment is None:
+                return listener, segments
+            segments.append(segment)
+
+    def test_finds_each_utterance_with_pre_roll(self):
+        listener, segments = self.run_listener()
+        self.assertEqual(len(segments), len(UTTERANCES))
+        for segment, (start, length) in zip(segments, UTTERANCES):
+            self.assertAlmostEqual(segment.started, start - 0.3, delta=0.15)
+            self.assertAlmostEqual(segment.ended, start + length + 0.2, delta=0.2)
+            self.assertEqual(len(segment.samples), round((segment.ended - segment.started) * SAMPLE_RATE))
+        metrics = listener.metrics()
+        self.assertEqual(metrics['segments'], 3)
+        self.assertEqual(metrics['dropped'], 0)
+
+    def test_segment_audio_comes_from_the_ring_buffer(self):
+        _, segments = self.run_listener()
+        with wave.open(self.path, 'rb') as f:
+            audio = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        first = segments[0]
+        start = round(first.started * SAMPLE_RATE)
+        np.testing.assert_array_equal(first.samples, audio[start:start + len(first.samples)])
+
+    def test_long_speech_is_cut_at_max_seconds(self):
+        _, segments = self.run_listener(max_seconds=1.0)
+        self.assertGreater(len(segments), len(UTTERANCES))
+        # Cuts fall on frame boundaries
+        self.assertTrue(all(segment.duration <= 1.0 + FRAME_SECONDS for segment in segments))
+
+    def test_gate_holds_back_detection(self):
+        listener, segments = self.run_listener(gate=lambda: False)
+        self.assertEqual(segments, [])
+        self.assertEqual(listener.metrics()['gated'], listener.metrics()['frames'])
+
+    def test_on_segment_receives_segments_instead_of_the_queue(self):
+        received = []
+        _, segments = self.run_listener(on_segment=received.append)
+        self.assertEqual(segments, [])
+        self.assertEqual(len(received), len(UTTERANCES))
+
+
+if __name__ == "__main__":
+    unittest.main()
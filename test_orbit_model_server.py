@@ -0,0 +1,130 @@
+import os
+import signal
+import socket
+import threading
+import time
+import unittest
+
+from orbit_ai import ChatSession, FakeModel
+from orbit_model_server import ModelServer, RemoteModel
+
+PROMPT = "What is the capital of France?"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class FakeModelTest(unittest.TestCase):
+    def test_replies_depend_only_on_the_prompt(self):
+        model = FakeModel()
+        self.assertEqual(model.generate(PROMPT, max_tokens=12), FakeModel().generate(PROMPT, max_tokens=12))
+        self.assertNotEqual(model.generate(PROMPT, max_tokens=12), model.generate("Hello", max_tokens=12))
+        self.assertEqual(len(model.reply(PROMPT, 12)), 12)
+
+    def test_callback_stops_after_its_token(self):
+        seen = []
+
+        def callback(token_id, token):
+            seen.append(token)
+            return token_id < 2
+
+        reply = FakeModel().generate(PROMPT, max_tokens=20, callback=callback)
+        self.assertEqual(reply, ''.join(seen))
+        self.assertEqual(len(seen), 3)
+
+    def test_chat_session_keeps_history(self):
+        model = FakeModel()
+        with model.chat_session("Be brief."):
+            model.generate(PROMPT, max_tokens=4)
+            self.assertEqual([turn['role'] for turn in model._history], ['system', 'user', 'assistant'])
+            self.assertEqual(model._history[0]['content'], "Be brief.")
+        self.assertIsNone(model._history)
+
+
+class ModelServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.port = free_port()
+        cls.server = ModelServer('fake')
+        cls.thread = threading.Thread(target=cls.server.serve, kwargs={'port': cls.port}, daemon=True)
+        cls.thread.start()
+        cls.model = RemoteModel(port=cls.port, timeout=10).connect('fake', autostart=False, wait=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.httpd.shutdown()
+        cls.thread.join(5)
+
+    def test_health(self):
+        health = self.model.health()
+        self.assertEqual(health['state'], 'ready')
+        self.assertEqual(health['model'], 'fake')
+        self.assertEqual(health['pid'], os.getpid())
+
+    def test_generate_matches_local_model(self):
+        self.assertEqual(self.model.generate(PROMPT, max_tokens=10), FakeModel().generate(PROMPT, max_tokens=10))
+        self.assertTrue(self.model.last_metrics['done'])
+        self.assertEqual(self.model.last_metrics['tokens'], 10)
+
+    def test_streaming_and_callback_stop(self):
+        tokens = list(self.model.generate(PROMPT, max_tokens=10, streaming=True))
+        self.assertEqual(tokens, FakeModel().reply(PROMPT, 10))
+        seen = []
+        self.model.generate(PROMPT, max_tokens=10, callback=lambda i, token: seen.append(token) or i < 1)
+        self.assertEqual(seen, FakeModel().reply(PROMPT, 10)[:2])
+
+    def test_chat_session_uses_server_session(self):
+        with self.model.chat_session("Be brief."):
+            self.assertIsNotNone(self.model.session)
+            self.model.generate(PROMPT, max_tokens=4)
+            self.assertIn(self.model.session, self.server.sessions)
+        self.assertIsNone(self.model.session)
+
+    def test_conversation_is_compacted_on_the_server_only(self):
+        session = ChatSession("Be brief.", n_ctx=2048)
+        try:
+            for turn in range(12):
+                session.respond(self.model, f"Question {turn}: {PROMPT}", max_tokens=200)
+            server_session = self.server.sessions[self.model.session]
+        finally:
+            session.close()
+        self.assertEqual(session.compactions, 0)
+        self.assertEqual(session.resets, 1)
+        self.assertGreater(server_session.compactions, 0)
+
+    def test_invalid_request(self):
+        with self.assertRaises(RuntimeError):
+            self.model.generate(None)
+
+
+class RemoteModelRestartTest(unittest.TestCase):
+    def test_restarts_server_that_went_away(self):
+        model = RemoteModel(port=free_port(), timeout=10).connect('fake', autostart=True, wait=30)
+        first = model.health()['pid']
+        self.addCleanup(lambda: os.kill(model.health()['pid'], signal.SIGTERM) if model.health() else None)
+        self.assertNotEqual(first, os.getpid())
+
+        os.kill(first, signal.SIGTERM)
+        deadline = time.time() + 10
+        while model.health() is not None and time.time() < deadline:
+            time.sleep(0.1)
+        self.assertIsNone(model.health())
+
+        self.assertEqual(model.generate(PROMPT, max_tokens=6), FakeModel().generate(PROMPT, max_tokens=6))
+        self.assertNotEqual(model.health()['pid'], first)
+
+    def test_no_wait_without_a_server(self):
+        with self.assertRaises(ConnectionError):
+            RemoteModel(port=free_port(), timeout=2).connect('fake', autostart=False, wait=0)
+
+    def test_no_restart_without_autostart(self):
+        model = RemoteModel(port=free_port(), timeout=2)
+        with self.assertRaises(ConnectionRefusedError):
+            model.generate(PROMPT)
+
+
+if __name__ == "__main__":
+    unittest.main()
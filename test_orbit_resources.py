@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+from orbit_resources import NLTKResources
+
+
+class FakeNLTKData:
+    """Stands in for the NLTK data directory; download(name) installs the paths listed for name"""
+
+    def __init__(self, provides):
+        self.provides = provides
+        self.installed = set()
+        self.downloads = []
+
+    def find(self, path):
+        if path not in self.installed:
+            raise LookupError(path)
+        return path
+
+    def download(self, name, quiet=False):
+        self.downloads.append(name)
+        self.installed.update(self.provides.get(name, []))
+        return True
+
+
+class NLTKResourcesTest(unittest.TestCase):
+    def patch_nltk(self, provides):
+        data = FakeNLTKData(provides)
+        for target, replacement in (('nltk.data.find', data.find), ('nltk.download', data.download)):
+            patcher = mock.patch(target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return data
+
+    def test_no_downloads_by_default(self):
+        data = self.patch_nltk({'stopwords': ['corpora/stopwords']})
+        resources = NLTKResources()
+        with self.assertRaises(LookupError):
+            resources.get('stop_words')
+        self.assertEqual(data.downloads, [])
+        self.assertIn('stopwords', resources.missing())
+
+    def test_download_stops_at_first_name_that_works(self):
+        data = self.patch_nltk({'punkt_tab': ['tokenizers/punkt_tab'], 'punkt': ['tokenizers/punkt']})
+        resources = NLTKResources(allow_download=True)
+        resources.ensure('punkt')
+        self.assertEqual(data.downloads, ['punkt_tab'])
+
+    def test_download_falls_back_to_older_name(self):
+        data = self.patch_nltk({'punkt': ['tokenizers/punkt']})
+        self.assertTrue(NLTKResources().download('punkt'))
+        self.assertEqual(data.downloads, ['punkt_tab', 'punkt'])
+
+    def test_availability_is_checked_once(self):
+        data = self.patch_nltk({})
+        data.installed.add('corpora/words')
+        resources = NLTKResources()
+        with mock.patch('nltk.data.find', wraps=data.find) as find:
+            self.assertTrue(resources.available('words'))
+            self.assertTrue(resources.available('words'))
+        self.assertEqual(find.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import tempfile
+import time
+import unittest
+
+from orbit_ai import HIGH, LOW, NORMAL
+from orbit_audio import AudioCache, FakePlayer
+from orbit_speech import FakeEngine, SpeechWorker, split_sentences
+
+LONG_TEXT = "Here is a long answer that keeps going for quite a while " * 5
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.005)
+
+
+class SpeechWorkerTest(unittest.TestCase):
+    def start_worker(self, **options):
+        self.engine = FakeEngine(word_delay=0.01)
+        worker = SpeechWorker(lambda: self.engine, **options).start()
+        worker.ready.wait()
+        self.addCleanup(self.stop_worker, worker)
+        return worker
+
+    def stop_worker(self, worker):
+        worker.close()
+        worker.thread.join(5)
+
+    def test_speaks_in_order(self):
+        worker = self.start_worker(merge_chars=0)
+        first = worker.say("Good morning.")
+        second = worker.say("Word of the day: serendipity.")
+        self.assertTrue(worker.wait_idle(5))
+        self.assertEqual([text for text, _, _ in self.engine.spoken], [first.text, second.text])
+        self.assertTrue(all(completed for _, _, completed in self.engine.spoken))
+        self.assertEqual(worker.metrics()['spoken'], 2)
+
+    def test_interrupt_stops_speech_and_keeps_high_priority(self):
+        worker = self.start_worker()
+        answer = worker.say(LONG_TEXT)
+        wait_for(lambda: answer.started is not None)
+        follow_up = worker.say("And a follow-up nobody will hear.")
+        reminder = worker.say("Reminder: stand up and stretch.", priority=HIGH)
+        self.assertTrue(worker.interrupt())
+        self.assertTrue(worker.wait_idle(5))
+
+        self.assertTrue(answer.interrupted)
+        self.assertTrue(follow_up.dropped)
+        self.assertFalse(reminder.dropped)
+        self.assertFalse(reminder.interrupted)
+        text, words, completed = self.engine.spoken[0]
+        self.assertEqual(text, answer.text)
+        self.assertFalse(completed)
+        self.assertLess(words, len(LONG_TEXT.split()))
+        self.assertEqual(self.engine.spoken[-1], (reminder.text, len(reminder.text.split()), True))
+
+        metrics = worker.metrics()
+        self.assertEqual(metrics['interrupted'], 1)
+        self.assertEqual(metrics['dropped'], 1)
+        self.assertEqual(metrics['spoken'], 1)
+
+    def test_interrupt_when_idle_cuts_nothing(self):
+        worker = self.start_worker()
+        self.assertFalse(worker.interrupt())
+
+    def test_short_lines_are_merged(self):
+        worker = self.start_worker()
+        opening = worker.say("Here is your list for today.")
+        wait_for(lambda: opening.started is not None)
+        items = [worker.say(f"Item {i}.", priority=LOW) for i in range(5)]
+        self.assertTrue(worker.wait_idle(5))
+
+        self.assertEqual(self.engine.spoken[-1][0], ' '.join(item.text for item in items))
+        self.assertEqual(len(self.engine.spoken), 2)
+        self.assertEqual({item.started for item in items}, {items[0].started})
+        self.assertEqual(worker.metrics()['merged'], 4)
+
+    def test_merging_respects_priority_and_length(self):
+        worker = self.start_worker(merge_chars=20)
+        opening = worker.say("Here is your list for today.")
+        wait_for(lambda: opening.started is not None)
+        worker.say("One.", priority=LOW)
+        worker.say("Two.", priority=NORMAL)
+        worker.say("A line too long to merge.", priority=NORMAL)
+        self.assertTrue(worker.wait_idle(5))
+        self.assertEqual([text for text, _, _ in self.engine.spoken][1:],
+                         ["Two.", "A line too long to merge.", "One."])
+
+    def test_full_queue_drops_least_important_newest(self):
+        # Not started, so everything stays queued
+        worker = SpeechWorker(lambda: FakeEngine(), max_queue=2)
+        first = worker.say("First.")
+        second = worker.say("Second.")
+        third = worker.say("Third.")
+        self.assertTrue(third.dropped)
+        self.assertTrue(third.wait(0))
+
+        urgent = worker.say("Urgent.", priority=HIGH)
+        self.assertFalse(urgent.dropped)
+        self.assertTrue(second.dropped)
+        self.assertFalse(first.dropped)
+
+        metrics = worker.metrics()
+        self.assertEqual(metrics['dropped'], 2)
+        self.assertEqual(metrics['depth'], 2)
+
+    def test_empty_text_is_dropped(self):
+        worker = SpeechWorker(lambda: FakeEngine())
+        self.assertTrue(worker.say("   ").dropped)
+
+    def test_engine_failure_drops_speech(self):
+        def broken():
+            raise RuntimeError("no speech driver")
+        worker = SpeechWorker(broken).start()
+        self.addCleanup(self.stop_worker, worker)
+        utterance = worker.say("Hello.")
+        self.assertTrue(utterance.wait(5))
+        self.assertTrue(utterance.dropped)
+        self.assertEqual(worker.metrics()['error'], "no speech driver")
+
+    def test_say_sentences_queues_each_sentence(self):
+        worker = self.start_worker(merge_chars=0)
+        text = "The first sentence is here. The second one follows it! And a third?"
+        utterances = worker.say_sentences(text)
+        self.assertEqual([u.text for u in utterances], split_sentences(text))
+        self.assertEqual(len(utterances), 3)
+        self.assertTrue(worker.wait_idle(5))
+        self.assertEqual(len(self.engine.spoken), 3)
+
+    def test_recurring_phrase_plays_from_cache(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        player = FakePlayer()
+        worker = self.start_worker(audio_cache=AudioCache(directory.name), player=player)
+
+        worker.say("Reminder set for 5 minute(s)").wait(5)
+        self.assertEqual(player.played, [])
+        wait_for(lambda: len(self.engine.saved) == 3)
+        self.assertEqual(sorted(self.engine.saved), ["5", "Reminder set for", "minute(s)"])
+
+        worker.say("Reminder set for 5 minute(s)").wait(5)
+        self.assertEqual(len(player.played), 1)
+        self.assertEqual(len(self.engine.spoken), 1)
+        self.assertEqual(worker.metrics()['cached'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()